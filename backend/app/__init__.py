@@ -16,6 +16,9 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     ma.init_app(app)
 
+    from app.services import settlements
+    settlements.configure(app.config.get('SETTLEMENTS_PATH', settlements.DEFAULT_PATH))
+
 
 
     from app.api import bp as api_bp
@@ -28,7 +31,15 @@ def create_app(config_class=Config):
         regeocode_ids_command, 
         backfill_images,
         convert_currencies_command,
-        rescrape_duplicates_command
+        revalidate_command,
+        build_price_bounds_command,
+        rescrape_duplicates_command,
+        scrape_worker_command,
+        reparse_command,
+        geocode_worker_command,
+        load_gazetteer_command,
+        backfill_districts_command,
+        load_settlements_command
     )
     app.cli.add_command(scrape_meget_command)
     app.cli.add_command(scrape_bon_ua_command)
@@ -36,6 +47,14 @@ def create_app(config_class=Config):
     app.cli.add_command(regeocode_ids_command)
     app.cli.add_command(backfill_images)
     app.cli.add_command(convert_currencies_command)
+    app.cli.add_command(revalidate_command)
+    app.cli.add_command(build_price_bounds_command)
     app.cli.add_command(rescrape_duplicates_command)
+    app.cli.add_command(scrape_worker_command)
+    app.cli.add_command(reparse_command)
+    app.cli.add_command(geocode_worker_command)
+    app.cli.add_command(load_gazetteer_command)
+    app.cli.add_command(backfill_districts_command)
+    app.cli.add_command(load_settlements_command)
 
     return app
\ No newline at end of file
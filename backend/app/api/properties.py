@@ -1,9 +1,10 @@
 from flask import jsonify, request
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, or_
 from app.models import Property
 from app.api import bp
 from app.api.schemas import properties_schema, property_schema
 from app.services.cities import CITIES
+from app.services.geocode_queue import PENDING
 
 
 def _resolve_city_alias(name):
@@ -75,10 +76,12 @@ def get_property(id):
 
 @bp.route('/properties/map', methods=['GET'])
 def get_map_properties():
-    """Lightweight endpoint for map markers. Supports same filters as /properties."""
+    """Lightweight endpoint for map markers. Supports same filters as /properties.
+    Listings still waiting for the geocode worker are left out."""
     query = Property.query.filter(
         Property.latitude.isnot(None),
         Property.longitude.isnot(None),
+        or_(Property.geocode_precision.is_(None), Property.geocode_precision != PENDING),
         Property.is_active
     )
 
@@ -1,368 +1,305 @@
 import click
+import os
 import time
-from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import or_, select, update
+from flask import current_app
 from flask.cli import with_appcontext
-from app import db, create_app
-from app.models import Property
-from app.services.meget import scrape_meget_listing, get_listing_urls as meget_get_listing_urls
-from app.services.bon_ua import scrape_bon_ua_listing, get_listing_urls as bon_ua_get_listing_urls
-from app.services.cities import get_center, normalize_city, get_region_center
-from app.services.listing_validator import ListingValidator
-
-from geopy.geocoders import Photon
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+from app import db
+from app.models import PriceSketch, Property
 from app.services.address_normalizer import AddressNormalizer
-from geopy.distance import geodesic
-
-
-def get_lat_long(address, region=None, attempt=1):
-    try:
-        geolocator = Photon(user_agent="meget_scraper_v3")
-
-        candidates = AddressNormalizer.normalize(address)
-        if not candidates:
-            candidates = [address]
-
-        cleaned_addr = AddressNormalizer._basic_clean(address)
-        parts = cleaned_addr.split(',')
-        expected_city = None
-        if parts:
-            possible_city = parts[0].strip()
-            expected_city = normalize_city(possible_city)
-
-        if expected_city and len(candidates) == 1:
-            canonical = normalize_city(candidates[0])
-            if canonical == expected_city:
-                center = get_center(expected_city)
-                if center:
-                    return center[0], center[1], f"{expected_city}, Україна", "city"
-
-        if region:
-            region = region.strip()
-
-        for candidate in candidates:
-            try:
-                query_parts = [candidate]
-
-                if expected_city and expected_city not in candidate:
-                    query_parts.append(expected_city)
-                if region and region not in candidate:
-                    query_parts.append(region)
-                if "Україна" not in candidate and "Ukraine" not in candidate:
-                    query_parts.append("Україна")
-
-                query = ", ".join(query_parts)
-                query = ", ".join(p.strip() for p in query.split(",") if p.strip())
-                print(f"    Geocoding: '{query}'")
-
-                location = geolocator.geocode(query, timeout=10)
-
-                if location:
-                    # Ukraine bounding box check — reject results outside Ukraine
-                    UA_LAT = (44.0, 52.5)
-                    UA_LNG = (22.0, 40.5)
-                    if not (UA_LAT[0] <= location.latitude <= UA_LAT[1] and
-                            UA_LNG[0] <= location.longitude <= UA_LNG[1]):
-                        print(f"    ⚠️ Outside Ukraine: {location.latitude:.2f}, {location.longitude:.2f}")
-                        continue
-
-                    # Region validation
-                    if region:
-                        region_result = get_region_center(region)
-                        if region_result:
-                            _, reg_city = region_result
-                            from app.services.cities import CITIES
-                            city_info = CITIES.get(reg_city, {})
-                            all_names = [reg_city.lower()] + [a.lower() for a in city_info.get('aliases', [])]
-                            loc_addr_lower = location.address.lower()
-                            if not any(name in loc_addr_lower for name in all_names):
-                                print(f"    ⚠️ Region mismatch: {location.address}")
-                                continue
-
-                    # City-level distance check (30km)
-                    if expected_city:
-                        center = get_center(expected_city)
-                        if center:
-                            dist_km = geodesic((location.latitude, location.longitude), center).km
-                            if dist_km > 30:
-                                print(f"    ⚠️ Too far ({dist_km:.0f}km from {expected_city})")
-                                continue
-                    # Oblast-level distance check (100km)
-                    elif region:
-                        region_result = get_region_center(region)
-                        if region_result:
-                            reg_center, reg_city = region_result
-                            dist_km = geodesic((location.latitude, location.longitude), reg_center).km
-                            if dist_km > 100:
-                                print(f"    ⚠️ Too far ({dist_km:.0f}km from {reg_city}, {region})")
-                                continue
-
-                    return location.latitude, location.longitude, location.address, "exact"
-
-            except (GeocoderTimedOut, GeocoderServiceError) as e:
-                print(f"    ⚠️ Photon error: {e}")
-                continue
-
-        # Fallback to oblast center
-        if region:
-            region_result = get_region_center(region)
-            if region_result:
-                reg_center, reg_city = region_result
-                print(f"    📍 Falling back to region center: {reg_city}")
-                return reg_center[0], reg_center[1], f"{reg_city}, Україна", "city"
-
-        return None, None, None, None
-    except Exception as e:
-        print(f"⚠️ Geocoding error: {e}")
-        return None, None, None, None
-
-
-def process_url_in_thread(url, app_config, scrape_func):
-    app = create_app(app_config)
-
-    with app.app_context():
-        time.sleep(0.5)
-
-        data = scrape_func(url)
-        if not data:
-            # Listing expired (returned None): mark it inactive if it exists in DB
-            try:
-                expired = Property.query.filter_by(source_url=url).first()
-                if expired and expired.is_active:
-                    expired.is_active = False
-                    db.session.commit()
-                    return {'status': 'error', 'url': url, 'msg': 'Listing expired - marked inactive'}
-            except Exception:
-                pass
-            return {'status': 'error', 'url': url, 'msg': 'Scrape failed'}
-
-
-        # Normalize currency to USD using live NBU rates
-        from app.services.currency import convert_to_usd
-        raw_price = data.get('price', 0)
-        raw_currency = data.get('currency', 'UAH')
-        
-        # We only convert if price > 0
-        if raw_price > 0 and raw_currency != 'USD':
-            data['price'] = convert_to_usd(raw_price, raw_currency)
-            data['currency'] = 'USD'
-
-        is_valid, rejection_reason = ListingValidator.validate(data)
-
-        try:
-            existing_prop = Property.query.filter_by(source_url=url).first()
-
-            if existing_prop:
-                needs_update = False
-                changes = []
-
-                if existing_prop.price != data['price'] or existing_prop.currency != data['currency']:
-                    existing_prop.price = data['price']
-                    existing_prop.currency = data['currency']
-                    changes.append("price")
-                    needs_update = True
-
-                if existing_prop.source_website != data.get('source_website'):
-                    existing_prop.source_website = data.get('source_website')
-                    changes.append("source")
-                    needs_update = True
-
-                if data.get('address') and existing_prop.address != data['address']:
-                    print(f"DEBUG: Updating address from '{existing_prop.address}' to '{data['address']}'")
-                    existing_prop.address = data['address']
-                    existing_prop.city = data.get('city')
-                    existing_prop.district = data.get('district')
-                    changes.append("address")
-                    needs_update = True
-                else:
-                    print(f"DEBUG: Skipping UPDATE string check. DB address: {existing_prop.address} | New: {data.get('address')}")
-                    
-                # Force a new geocode attempt for the new address
-                if "address" in changes:
-                    lat, lng, canonical_addr, precision = get_lat_long(
-                        data['address'], region=data.get('region')
-                    )
-                    if lat and lng:
-                        existing_prop.latitude = lat
-                        existing_prop.longitude = lng
-                        existing_prop.geocode_precision = precision
-                        if canonical_addr:
-                            existing_prop.address = canonical_addr
-                        changes.append("geolocation")
-                    else:
-                        existing_prop.latitude = None
-                        existing_prop.longitude = None
-                        existing_prop.geocode_precision = None
-                
-                # Only attempt backfill if the address string wasn't just changed, and we lack coords
-                elif not existing_prop.latitude and existing_prop.address:
-                    lat, lng, canonical_addr, precision = get_lat_long(
-                        existing_prop.address, region=data.get('region')
-                    )
-                    if lat and lng:
-                        existing_prop.latitude = lat
-                        existing_prop.longitude = lng
-                        existing_prop.geocode_precision = precision
-                        if canonical_addr:
-                            existing_prop.address = canonical_addr
-                        changes.append("geolocation (backfill)")
-                        needs_update = True
-
-                if not existing_prop.images and data['images']:
-                    existing_prop.images = data['images']
-                    changes.append("images")
-                    needs_update = True
-
-                if needs_update:
-                    if not is_valid:
-                        changes.append(f"flagged: {rejection_reason}")
-                    
-                    print(f"DEBUG: Committing to DB. needs_update={needs_update}, is_valid={is_valid}, changes={changes}, new address={existing_prop.address}")
-                    existing_prop.updated_at = datetime.utcnow()
-                    db.session.commit()
-                    
-                    if not is_valid:
-                        return {'status': 'rejected', 'url': url, 'msg': f"Updated but flagged: {rejection_reason}"}
-                    return {'status': 'updated', 'title': data['title'], 'msg': ', '.join(changes)}
-                else:
-                    if not is_valid:
-                        return {'status': 'rejected', 'url': url, 'msg': rejection_reason}
-                    return {'status': 'skipped', 'url': url}
-            else:
-                if not is_valid:
-                    return {'status': 'rejected', 'url': url, 'msg': rejection_reason}
-
-                lat, lng, canonical_addr, precision = None, None, None, None
-                if data.get('address'):
-                    lat, lng, canonical_addr, precision = get_lat_long(
-                        data['address'], region=data.get('region')
-                    )
-
-                new_prop = Property(
-                    title=data['title'],
-                    source_url=data['source_url'],
-                    source_website=data['source_website'],
-                    price=data.get('price'),
-                    currency=data.get('currency'),
-                    address=canonical_addr if canonical_addr else data.get('address'),
-                    city=data.get('city'),
-                    district=data.get('district'),
-                    latitude=lat,
-                    longitude=lng,
-                    geocode_precision=precision,
-                    area=data.get('area'),
-                    rooms=data.get('rooms'),
-                    images=data.get('images'),
-                    description=f"Scraped from {data['source_website']}"
-                )
-                db.session.add(new_prop)
-                db.session.commit()
-                return {'status': 'new', 'title': data['title'], 'price': data['price'], 'currency': data['currency']}
-
-        except Exception as e:
-            db.session.rollback()
-            return {'status': 'error', 'url': url, 'msg': str(e)}
+from app.services.geocoding import GeocodingUnavailable, get_lat_long
+from app.services.geocode_cache import print_geocode_summary, stats as geocode_stats
+from app.services.catalog_crawler import iter_catalog
+from app.services.sitemap_discovery import SitemapWalk
+from app.services.rate_limiter import print_rate_summary
+from app.services.structured_data import print_fast_path_summary
+from app.services.address_cascade import print_cascade_summary
+from app.services.scrape_pipeline import SITES, ScrapeTask, build_pipeline, known_source_urls
+from app.services import geocode_queue, job_queue
+from app.services.parse_pool import ParsePool
+from app.services.html_archive import open_archive
+from app.services import gazetteer, price_bounds, settlements
+from app.services.districts import DISTRICT_PRECISIONS, assign_district, open_districts
+from app.services.reparse import DEFAULT_FIELDS, REPARSE_FIELDS, apply_reparsed, iter_reparsed
+from app.services.listing_validator import MIN_PRICE_USD, ListingValidator
 
 
 @click.command(name='scrape_meget')
 @click.option('--workers', default=5, help='Number of parallel threads')
-@click.option('--pages', default=1, help='Number of pages to scrape from global catalog')
+@click.option('--pages', default=1, help='Max number of pages to scrape from global catalog')
+@click.option('--discover', type=click.Choice(['catalog', 'sitemap']), default='catalog',
+              help='Find listings by paging the catalog, or by reading the sitemap (only URLs changed since the last walk)')
+@click.option('--full', is_flag=True, help='Walk all --pages catalog pages (or the whole sitemap) instead of stopping at already-known listings')
+@click.option('--force', is_flag=True, help='Ignore stored ETag/Last-Modified/content hash and re-parse every page')
+@click.option('--enqueue', is_flag=True, help='Only discover URLs and add them to the job queue for scrape-worker')
+@click.option('--parse-pool', is_flag=True, help='Parse pages in a process pool (one process per CPU core)')
 @with_appcontext
-def scrape_meget_command(workers, pages):
-    print(f"🚀 Starting Meget scraping with {workers} threads, {pages} pages...")
+def scrape_meget_command(workers, pages, discover, full, force, enqueue, parse_pool):
+    mode = "full" if full else "incremental"
+    source = "the sitemap" if discover == 'sitemap' else f"up to {pages} pages"
+    print(f"🚀 Starting Meget scraping with {workers} threads, {source} ({mode})...")
 
-    all_target_urls = set()
-    for page in range(1, pages + 1):
-        print(f"[CRAWLER] Page {page}...")
-        urls = meget_get_listing_urls(page=page)
-        if urls:
-            all_target_urls.update(urls)
-        time.sleep(1)
+    site = SITES['meget']
+    _scrape_discovered(site, _discover(site, discover, pages, full), workers, not force, enqueue, parse_pool)
 
-    url_list = list(all_target_urls)
-    _execute_scraping(url_list, workers, scrape_meget_listing)
 
 @click.command(name='scrape_bon_ua')
 @click.option('--workers', default=5, help='Number of parallel threads')
-@click.option('--pages', default=1, help='Number of pages to scrape from global catalog')
+@click.option('--pages', default=1, help='Max number of pages to scrape from global catalog')
+@click.option('--discover', type=click.Choice(['catalog', 'sitemap']), default='catalog',
+              help='Find listings by paging the catalog, or by reading the sitemap (only URLs changed since the last walk)')
+@click.option('--full', is_flag=True, help='Walk all --pages catalog pages (or the whole sitemap) instead of stopping at already-known listings')
+@click.option('--force', is_flag=True, help='Ignore stored ETag/Last-Modified/content hash and re-parse every page')
+@click.option('--enqueue', is_flag=True, help='Only discover URLs and add them to the job queue for scrape-worker')
+@click.option('--parse-pool', is_flag=True, help='Parse pages in a process pool (one process per CPU core)')
 @with_appcontext
-def scrape_bon_ua_command(workers, pages):
-    print(f"🚀 Starting Bon.ua scraping with {workers} threads, {pages} pages...")
-
-    all_target_urls = set()
-    for page in range(1, pages + 1):
-        print(f"[CRAWLER] Page {page}...")
-        urls = bon_ua_get_listing_urls(page=page)
-        if urls:
-            all_target_urls.update(urls)
-        time.sleep(1)
-
-    url_list = list(all_target_urls)
-    _execute_scraping(url_list, workers, scrape_bon_ua_listing)
-
-
-def _execute_scraping(url_list, workers, scrape_func):
-    total = len(url_list)
+def scrape_bon_ua_command(workers, pages, discover, full, force, enqueue, parse_pool):
+    mode = "full" if full else "incremental"
+    source = "the sitemap" if discover == 'sitemap' else f"up to {pages} pages"
+    print(f"🚀 Starting Bon.ua scraping with {workers} threads, {source} ({mode})...")
+
+    site = SITES['bon_ua']
+    _scrape_discovered(site, _discover(site, discover, pages, full), workers, not force, enqueue, parse_pool)
+
+
+def _discover(site, discover, pages, full):
+    """Lazy URL source for a scrape command: the paged catalog or the site's sitemap."""
+    if discover == 'sitemap':
+        return SitemapWalk(site.name, site.sitemap_fetcher(), full=full)
+    return iter_catalog(site.get_listing_urls, pages, known_filter=known_source_urls, full=full)
+
+
+def _scrape_discovered(site, urls, workers, conditional, enqueue, parse_pool):
+    """
+    Queues the discovered URLs for scrape-worker, or scrapes them now. A sitemap walk
+    is only checkpointed once its URLs are queued or scraped without errors, so URLs
+    lost to a crash or a failed fetch are discovered again by the next walk.
+    """
+    errors = []
+
+    def on_result(result):
+        if result['status'] == 'error':
+            errors.append(result['url'])
+
+    if enqueue:
+        print(f"📥 Queued {job_queue.enqueue(urls, site.name)} jobs for scrape-worker.")
+    else:
+        _execute_scraping(urls, workers, site, conditional=conditional, parse_pool=parse_pool, on_result=on_result)
+    if isinstance(urls, SitemapWalk):
+        if errors:
+            print(f"[SITEMAP] {len(errors)} listing(s) failed, checkpoint not advanced")
+        elif urls.checkpoint():
+            print(f"[SITEMAP] {site.name}: checkpoint advanced")
+
+
+def _execute_scraping(url_source, workers, site, conditional=True, on_result=None, parse_pool=False):
+    """
+    Streams URLs from `url_source` (a list or a lazy catalog generator) through the
+    fetch → parse → address → validate → geocode → write pipeline. Detail pages are fetched
+    while discovery is still running, and bounded queues keep memory flat.
+    `site=None` means the source yields ScrapeTasks that carry their own site.
+    With `parse_pool`, parsing runs in a pre-warmed process pool sized to the CPU count.
+    Returns the finished Pipeline, whose per-stage stats benchmarks read.
+    """
+    if parse_pool:
+        with ParsePool() as pool:
+            print(f"🧠 Parse pool ready: {pool.warm()} worker processes")
+            return _run_pipeline(url_source, workers, site, conditional, on_result, pool)
+    return _run_pipeline(url_source, workers, site, conditional, on_result, None)
+
+
+def _run_pipeline(url_source, workers, site, conditional, on_result, parse_pool):
+    label = site.name if site else "queued"
+    print(f"📋 Streaming {label} listings through the pipeline ({workers} fetch workers)...")
+
+    stats = {'new': 0, 'updated': 0, 'skipped': 0, 'unchanged': 0, 'rejected': 0, 'expired': 0, 'errors': 0}
+    unchanged_by = {'etag': 0, 'hash': 0}
+
+    pipeline = build_pipeline(site, workers=workers, conditional=conditional, parse_pool=parse_pool)
+    total = 0
+    for i, result in enumerate(pipeline.run(url_source), 1):
+        total = i
+        status = result['status']
+        if on_result:
+            on_result(result)
+
+        if status == 'new':
+            stats['new'] += 1
+            curr = result.get('currency', 'UAH')
+            print(f"[{i}] ✅ {result['title'][:40]}... ({result['price']} {curr})")
+        elif status == 'updated':
+            stats['updated'] += 1
+            print(f"[{i}] 🔄 {result['title'][:40]}... ({result['msg']})")
+        elif status == 'skipped':
+            stats['skipped'] += 1
+        elif status == 'unchanged':
+            stats['unchanged'] += 1
+            unchanged_by[result['reason']] += 1
+        elif status == 'rejected':
+            stats['rejected'] += 1
+            print(f"[{i}] 🚫 {result['msg']}")
+        elif status == 'expired':
+            stats['expired'] += 1
+            print(f"[{i}] 💤 {result['msg']}")
+        elif status == 'error':
+            stats['errors'] += 1
+            print(f"[{i}] ❌ {result['msg']}")
+
+    saved = price_bounds.save()
+    if saved:
+        print(f"📈 Price/m² sketches updated with {saved} new listings")
 
     if total == 0:
         print("No listings found.")
-        return
-
-    print(f"📋 {total} listings queued. Processing...")
-
-    from config import Config
-    stats = {'new': 0, 'updated': 0, 'skipped': 0, 'rejected': 0, 'errors': 0}
+        return pipeline
+
+    print(f"\n📊 Done: {stats['new']} new, {stats['updated']} updated, {stats['skipped']} skipped, "
+          f"{stats['unchanged']} unchanged, {stats['rejected']} rejected, {stats['expired']} expired, "
+          f"{stats['errors']} errors")
+    if conditional:
+        hit_rate = stats['unchanged'] / total * 100
+        print(f"♻️  Conditional fetch: {hit_rate:.1f}% unchanged "
+              f"({unchanged_by['etag']} × 304 Not Modified, {unchanged_by['hash']} × content hash match)")
+    pipeline.print_stats()
+    print_fast_path_summary()
+    print_cascade_summary()
+    print_geocode_summary()
+    print_rate_summary()
+    return pipeline
+
+
+@click.command('scrape-worker')
+@click.option('--workers', default=5, help='Number of parallel fetch threads')
+@click.option('--site', type=click.Choice(list(SITES)), default=None, help='Only process jobs of this site')
+@click.option('--batch', default=20, help='Jobs claimed per round trip')
+@click.option('--lease', default=600, help='Seconds before an unfinished claimed job can be re-claimed')
+@click.option('--poll', default=0, help='Seconds to wait when the queue is empty (0 = exit once drained)')
+@click.option('--parse-pool', is_flag=True, help='Parse pages in a process pool (one process per CPU core)')
+@with_appcontext
+def scrape_worker_command(workers, site, batch, lease, poll, parse_pool):
+    """Drains the durable scrape job queue. Any number of workers can run on any number of nodes."""
+    worker_id = job_queue.default_worker_id()
+    print(f"👷 Worker {worker_id} starting. Queue: {job_queue.queue_stats(site)}")
+
+    in_flight = {}
+
+    def claimed_tasks():
+        while True:
+            jobs = job_queue.claim(worker_id, batch_size=batch, lease_seconds=lease, site=site)
+            if not jobs:
+                if not poll:
+                    return
+                time.sleep(poll)
+                continue
+            for job in jobs:
+                in_flight[job.url] = job.id
+                yield ScrapeTask(job.url, site=SITES[job.site], job_id=job.id)
+
+    def finish(result):
+        job_id = in_flight.pop(result.get('url'), None)
+        if job_id is None:
+            return
+        if result['status'] == 'error':
+            job_queue.fail(job_id, result.get('msg'))
+        else:
+            job_queue.complete(job_id, result['status'])
 
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {
-            executor.submit(process_url_in_thread, url, Config, scrape_func): url
-            for url in url_list
-        }
+    try:
+        _execute_scraping(claimed_tasks(), workers, None, on_result=finish, parse_pool=parse_pool)
+    finally:
+        released = job_queue.release(worker_id)
+        if released:
+            print(f"↩️  Released {released} unfinished jobs back to the queue.")
+        print(f"Queue: {job_queue.queue_stats(site)}")
+
+
+@click.command('geocode-worker')
+@click.option('--workers', default=4, help='Number of parallel geocoding threads')
+@click.option('--batch', default=20, help='Jobs claimed per round trip')
+@click.option('--lease', default=300, help='Seconds before an unfinished claimed job can be re-claimed')
+@click.option('--poll', default=0, help='Seconds to wait when the queue is empty (0 = exit once drained)')
+@with_appcontext
+def geocode_worker_command(workers, batch, lease, poll):
+    """Geocodes listings the scrapers left pending. Safe to run on several nodes at once."""
+    _run_geocode_worker(workers, batch, lease, poll)
+
+
+def _run_geocode_worker(workers, batch=20, lease=300, poll=0):
+    worker_id = job_queue.default_worker_id()
+    print(f"🌍 Geocode worker {worker_id} starting. Queue: {geocode_queue.queue_stats()}")
+
+    def claimed_jobs():
+        while True:
+            jobs = geocode_queue.claim(worker_id, batch_size=batch, lease_seconds=lease)
+            if not jobs:
+                if not poll:
+                    return
+                time.sleep(poll)
+                continue
+            yield from jobs
 
-        for i, future in enumerate(as_completed(futures), 1):
-            result = future.result()
+    stats = {'found': 0, 'not_found': 0, 'requeued': 0, 'error': 0}
+    pipeline = geocode_queue.build_geocode_pipeline(workers)
+    try:
+        for i, result in enumerate(pipeline.run(claimed_jobs()), 1):
             status = result['status']
-
-            if status == 'new':
-                stats['new'] += 1
-                curr = result.get('currency', 'UAH')
-                print(f"[{i}/{total}] ✅ {result['title'][:40]}... ({result['price']} {curr})")
-            elif status == 'updated':
-                stats['updated'] += 1
-                print(f"[{i}/{total}] 🔄 {result['title'][:40]}... ({result['msg']})")
-            elif status == 'skipped':
-                stats['skipped'] += 1
-            elif status == 'rejected':
-                stats['rejected'] += 1
-                print(f"[{i}/{total}] 🚫 {result['msg']}")
-            elif status == 'error':
-                stats['errors'] += 1
-                print(f"[{i}/{total}] ❌ {result['msg']}")
-
-    print(f"\n📊 Done: {stats['new']} new, {stats['updated']} updated, {stats['skipped']} skipped, {stats['rejected']} rejected, {stats['errors']} errors")
+            stats[status] += 1
+            if status == 'error':
+                geocode_queue.fail(result['job_id'], result.get('msg'))
+                print(f"[{i}] ❌ job {result['job_id']}: {result['msg']}")
+            elif status == 'found':
+                lat, lng, _, precision = result['geo']
+                print(f"[{i}] 📍 {result['address'][:50]} → {lat:.5f}, {lng:.5f} ({precision})")
+            elif status == 'not_found':
+                print(f"[{i}] ❓ {result['address'][:50]}")
+    finally:
+        released = geocode_queue.release(worker_id)
+        if released:
+            print(f"↩️  Released {released} unfinished geocode jobs back to the queue.")
+
+    print(f"\n📊 Geocoded: {stats['found']} found, {stats['not_found']} not found, "
+          f"{stats['requeued']} requeued, {stats['error']} errors")
+    pipeline.print_stats()
+    print_geocode_summary()
+    print(f"Queue: {geocode_queue.queue_stats()}")
+    return stats
 
 
 @click.command(name='regeocode_all')
+@click.option('--refresh', is_flag=True, help='Bypass the geocoding cache and overwrite its entries')
 @with_appcontext
-def regeocode_all_command():
+def regeocode_all_command(refresh):
     props = Property.query.filter(Property.address.isnot(None)).all()
     print(f"Re-geocoding {len(props)} properties...")
+    # Normalizes each distinct address once up front; get_lat_long then hits the memo
+    AddressNormalizer.normalize_many(p.address for p in props)
 
     count = 0
+    requests_at_checkpoint = geocode_stats.snapshot().get('requests', 0)
+    unavailable = 0
     for p in props:
-        lat, lng, canonical, precision = get_lat_long(p.address)
+        try:
+            lat, lng, canonical, precision = get_lat_long(p.address, refresh=refresh)
+        except GeocodingUnavailable:
+            # Photon is down: keep what the listing has rather than clearing it
+            unavailable += 1
+            continue
         if lat and lng:
             p.latitude = lat
             p.longitude = lng
             p.geocode_precision = precision
             if canonical:
                 p.address = canonical
+            assign_district(p)
             count += 1
             if count % 10 == 0:
                 db.session.commit()
                 print(f"Updated {count}")
-                time.sleep(1)
+                # Only pause for Photon's sake if these went over the network
+                requests = geocode_stats.snapshot().get('requests', 0)
+                if requests > requests_at_checkpoint:
+                    time.sleep(1)
+                requests_at_checkpoint = requests
         else:
             p.latitude = None
             p.longitude = None
@@ -370,20 +307,29 @@ def regeocode_all_command():
 
     db.session.commit()
     print(f"Done. Updated {count}/{len(props)}.")
+    if unavailable:
+        print(f"⚠️  Geocoder unavailable for {unavailable}; their coordinates were kept. Run again later.")
+    print_geocode_summary()
 
 
 @click.command(name='regeocode_ids')
 @click.argument('ids_str')
+@click.option('--refresh', is_flag=True, help='Bypass the geocoding cache and overwrite its entries')
 @with_appcontext
-def regeocode_ids_command(ids_str):
+def regeocode_ids_command(ids_str, refresh):
     ids = [int(i.strip()) for i in ids_str.split(',')]
     print(f"Re-geocoding {len(ids)} properties: {ids}")
 
     props = Property.query.filter(Property.id.in_(ids)).all()
+    AddressNormalizer.normalize_many(p.address for p in props)
 
     for p in props:
         print(f"#{p.id}: {p.address}")
-        lat, lng, canonical, precision = get_lat_long(p.address)
+        try:
+            lat, lng, canonical, precision = get_lat_long(p.address, refresh=refresh)
+        except GeocodingUnavailable as e:
+            print(f"  ⚠️  Geocoder unavailable, kept as is: {e}")
+            continue
         if lat and lng:
             print(f"  ✅ {lat}, {lng} ({precision})")
             p.latitude = lat
@@ -391,6 +337,7 @@ def regeocode_ids_command(ids_str):
             p.geocode_precision = precision
             if canonical:
                 p.address = canonical
+            assign_district(p)
         else:
             print("  ❌ Failed")
             p.latitude = None
@@ -399,15 +346,52 @@ def regeocode_ids_command(ids_str):
 
     db.session.commit()
     print("Done.")
+    print_geocode_summary()
+
+
+@click.command('backfill-districts')
+@click.option('--overwrite', is_flag=True, help='Also replace districts taken from the listings themselves')
+@click.option('--batch', default=1000, help='Rows per commit')
+@with_appcontext
+def backfill_districts_command(overwrite, batch):
+    """Fills Property.district from coordinates using the local district boundaries."""
+    index = open_districts(current_app.config.get('DISTRICTS_PATH'))
+    if index is None:
+        print("❌ No district boundaries: DISTRICTS_PATH is empty or missing.")
+        return
+    print(f"🗺️  Loaded {len(index)} districts.")
+
+    query = Property.query.filter(Property.latitude.isnot(None), Property.longitude.isnot(None),
+                                  Property.geocode_precision.in_(DISTRICT_PRECISIONS))
+    if not overwrite:
+        query = query.filter(or_(Property.district.is_(None), Property.district == ''))
+
+    started = time.perf_counter()
+    checked = updated = 0
+    last_id = 0
+    while True:
+        # Keyset pagination: rows filled in one batch drop out of the filter, so offsets would skip rows
+        rows = query.filter(Property.id > last_id).order_by(Property.id).limit(batch).all()
+        if not rows:
+            break
+        for p in rows:
+            checked += 1
+            updated += assign_district(p, overwrite=overwrite)
+        last_id = rows[-1].id
+        db.session.commit()
+        print(f"  {checked} checked, {updated} updated")
+
+    elapsed = time.perf_counter() - started
+    print(f"Done. Updated {updated}/{checked} properties in {elapsed:.1f}s.")
 
 
 @click.command('backfill-images')
 @click.option('--limit', default=0, help='Max properties to process (0 = all)')
+@click.option('--offline', is_flag=True, help='Only use archived pages, never fetch')
 @with_appcontext
-def backfill_images(limit):
-    """Re-fetch images for properties that have none."""
-    from app.services.meget import fetch_html
-    from app.services.meget.parser import ListingParser
+def backfill_images(limit, offline):
+    """Fills in images for properties that have none, from archived pages where possible."""
+    archive = open_archive(current_app.config.get('HTML_ARCHIVE_DIR'))
 
     query = Property.query.filter(
         db.or_(Property.images.is_(None), Property.images == '[]')
@@ -420,16 +404,32 @@ def backfill_images(limit):
     print(f"Found {len(props)} properties without images.")
 
     updated = 0
+    fetched = 0
     for i, p in enumerate(props, 1):
         print(f"[{i}/{len(props)}] #{p.id}: {p.source_url}")
-        soup = fetch_html(p.source_url)
-        if not soup:
-            print("  ⚠ Could not fetch page")
-            time.sleep(1)
+        site = SITES.get(p.source_website)
+        if not site:
+            print(f"  ⚠ Unknown source website '{p.source_website}'")
             continue
 
-        parser = ListingParser(soup, p.source_url)
-        images = parser.get_images()
+        archived = archive.latest(p.source_url) if archive else None
+        if archived:
+            body = archived.body
+        elif offline:
+            print("  ⚠ Not in the archive")
+            continue
+        else:
+            page = site.fetch_page(p.source_url)
+            if not page or not page.ok:
+                print("  ⚠ Could not fetch page")
+                continue
+            body = page.body
+            fetched += 1
+            if archive:
+                archive.put(p.source_url, body, site=site.name)
+
+        data = site.parse_page(body, p.source_url)
+        images = data.get('images') if data else None
 
         if images:
             p.images = images
@@ -441,41 +441,229 @@ def backfill_images(limit):
         if i % 25 == 0:
             db.session.commit()
 
-        time.sleep(1)
-
     db.session.commit()
-    print(f"\nDone. Updated {updated}/{len(props)} properties.")
+    print(f"\nDone. Updated {updated}/{len(props)} properties ({fetched} pages fetched, the rest from the archive).")
+    if fetched:
+        print_rate_summary()
+
+
+@click.command('reparse')
+@click.option('--site', type=click.Choice(list(SITES)), default=None, help='Only re-parse pages of this site')
+@click.option('--fields', default=','.join(DEFAULT_FIELDS),
+              help=f"Comma-separated columns to update, of: {', '.join(REPARSE_FIELDS)}. "
+                   "price re-converts UAH/EUR at the current NBU rate")
+@click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Only pages archived on or after this date (YYYY-MM-DD)')
+@click.option('--processes', default=0, help='Parser processes (0 = one per CPU core, 1 = parse in this process)')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing it')
+@with_appcontext
+def reparse_command(site, fields, since, processes, dry_run):
+    """Re-runs the parsers over the archived pages and applies the changes, without network traffic."""
+    archive = open_archive(current_app.config.get('HTML_ARCHIVE_DIR'))
+    if archive is None:
+        print("❌ The HTML archive is disabled (HTML_ARCHIVE_DIR is empty).")
+        return
+
+    fields = tuple(f.strip() for f in fields.split(',') if f.strip())
+    unknown = set(fields) - set(REPARSE_FIELDS)
+    if unknown:
+        raise click.BadParameter(f"unknown field(s) {', '.join(sorted(unknown))}", param_hint='--fields')
+
+    a = archive.stats()
+    print(f"🗄️  Archive: {a['urls']} URLs, {a['fetches']} fetches, {a['blobs']} unique pages, "
+          f"{a['raw_bytes'] / 1e6:.1f} MB raw → {a['stored_bytes'] / 1e6:.1f} MB stored")
+
+    stats = {'pages': 0, 'rejected': 0, 'missing': 0, 'updated': 0}
+    changed_fields = {}
+    started = time.perf_counter()
+
+    def flush(batch):
+        rows = Property.query.filter(Property.source_url.in_([data['source_url'] for data in batch])).all()
+        by_url = {row.source_url: row for row in rows}
+        for data in batch:
+            prop = by_url.get(data['source_url'])
+            if prop is None:
+                stats['missing'] += 1
+                continue
+            changes = apply_reparsed(prop, data, fields)
+            if changes:
+                stats['updated'] += 1
+                for name in changes:
+                    changed_fields[name] = changed_fields.get(name, 0) + 1
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+
+    pool = ParsePool(processes) if processes != 1 else None
+    try:
+        batch = []
+        for page, data in iter_reparsed(archive.iter_latest(site, since), pool):
+            stats['pages'] += 1
+            if not data:
+                stats['rejected'] += 1
+                continue
+            batch.append(data)
+            if len(batch) >= 200:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        if pool:
+            pool.close()
+
+    elapsed = time.perf_counter() - started
+    rate = stats['pages'] / elapsed if elapsed else 0
+    verb = "Would update" if dry_run else "Updated"
+    print(f"\n📊 Re-parsed {stats['pages']} pages in {elapsed:.1f}s ({rate:.0f} pages/s): "
+          f"{verb} {stats['updated']}, {stats['rejected']} rejected by the parser, "
+          f"{stats['missing']} not in the database")
+    if changed_fields:
+        print("   Changed: " + ", ".join(f"{name} {count}" for name, count in sorted(changed_fields.items())))
+
+
+@click.command('load-gazetteer')
+@click.argument('csv_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', default=None, help='Gazetteer file to write (default: GAZETTEER_PATH)')
+@with_appcontext
+def load_gazetteer_command(csv_files, output):
+    """
+    Builds the offline street gazetteer from address CSVs (e.g. an OSM export with
+    addr:city, addr:street, addr:housenumber, lat, lon), replacing the previous one.
+    """
+    output = output or current_app.config.get('GAZETTEER_PATH')
+    if not output:
+        print("❌ No output path: GAZETTEER_PATH is empty.")
+        return
+    started = time.perf_counter()
+    try:
+        stats = gazetteer.load_csv(csv_files, output)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='CSV_FILES')
+    print(f"📚 Gazetteer {output}: {stats['streets']} streets, {stats['houses']} houses "
+          f"from {stats['rows']} rows ({stats['skipped']} skipped) in {time.perf_counter() - started:.1f}s")
+
+
+@click.command('load-settlements')
+@click.argument('csv_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output', default=None, help='Data file to write (default: SETTLEMENTS_PATH)')
+@with_appcontext
+def load_settlements_command(csv_files, output):
+    """
+    Builds the settlements data file from CSVs with name, oblast, lat, lon and
+    optional population and aliases columns, replacing the previous one.
+    """
+    output = output or current_app.config.get('SETTLEMENTS_PATH')
+    if not output:
+        print("❌ No output path: SETTLEMENTS_PATH is empty.")
+        return
+    try:
+        stats = settlements.build(csv_files, output)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='CSV_FILES')
+    print(f"🏘️  Settlements {output}: {stats['settlements']} from {stats['rows']} rows ({stats['skipped']} skipped), "
+          f"{os.path.getsize(output) / 1024:.0f} KB")
+    # Reload on next use, and time it: this is the startup cost of the first lookup
+    settlements.configure('')
+    settlements.configure(output)
+    settlements.open_settlements()
 
 
 @click.command('convert-currencies')
+@click.option('--latest', is_flag=True, help='Convert every listing at the newest stored NBU rates, '
+                                              'instead of the rates of the day it was scraped')
 @with_appcontext
-def convert_currencies_command():
-    """Converts all historical property prices from UAH/EUR to USD."""
-    from app.services.currency import convert_to_usd
-    
-    props = Property.query.filter(Property.currency != 'USD').all()
-    print(f"Found {len(props)} properties with non-USD currencies.")
-    
-    updated = 0
-    for i, p in enumerate(props, 1):
-        if not p.price or p.price <= 0:
-            continue
-            
-        old_price = p.price
-        old_curr = p.currency
-        
-        new_price = convert_to_usd(old_price, old_curr)
-        p.price = new_price
-        p.currency = 'USD'
-        updated += 1
-        
-        print(f"[{i}/{len(props)}] #{p.id}: {old_price} {old_curr} -> {new_price:.0f} USD")
-        
-        if i % 100 == 0:
+def convert_currencies_command(latest):
+    """Converts non-USD property prices to USD from their original price and the stored NBU rates."""
+    from app.services.currency import reconvert_prices
+
+    started = time.perf_counter()
+    stats = reconvert_prices(latest=latest)
+    print(f"💱 Converted {stats['converted']} properties to USD in {time.perf_counter() - started:.2f}s "
+          f"({stats['backfilled']} original prices saved, {stats['dated']} rate dates assigned)")
+    if stats['unconverted']:
+        print(f"⚠️ {stats['unconverted']} properties still have no USD price: no stored NBU rate for their date")
+
+
+@click.command('revalidate')
+@click.option('--chunk-size', default=50_000, help='Listings read and validated at a time')
+@click.option('--deactivate', is_flag=True, help='Also deactivate failing listings, hiding them from the API')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing it')
+@with_appcontext
+def revalidate_command(chunk_size, deactivate, dry_run):
+    """Re-runs ListingValidator over every stored listing (e.g. after changing its thresholds), flagging failures."""
+    import pandas as pd
+
+    columns = (Property.id, Property.title, Property.price, Property.area, Property.description,
+               Property.city, Property.rooms, Property.validation_error, Property.is_active)
+    stats = {'rows': 0, 'failing': 0, 'flagged': 0, 'cleared': 0, 'deactivated': 0}
+    failing_by_rule = {}
+    started = time.perf_counter()
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(Property.id > last_id).order_by(Property.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        frame = pd.DataFrame.from_records(rows, columns=[c.key for c in columns])
+        reasons = ListingValidator.validate_many(frame)
+
+        failing = reasons.notna()
+        was_flagged = frame['validation_error'].notna()
+        changed = reasons.fillna('') != frame['validation_error'].fillna('')
+        stats['rows'] += len(frame)
+        stats['failing'] += int(failing.sum())
+        stats['flagged'] += int((failing & ~was_flagged).sum())
+        stats['cleared'] += int((was_flagged & ~failing).sum())
+        for reason in reasons[failing]:
+            rule = reason.split(':')[0].split(' (')[0]
+            failing_by_rule[rule] = failing_by_rule.get(rule, 0) + 1
+
+        # Bulk UPDATEs by primary key, only for rows whose outcome changed
+        flags = [{'id': int(i), 'validation_error': r} for i, r in zip(frame['id'][changed], reasons[changed])]
+        if flags:
+            db.session.execute(update(Property), flags)
+        if deactivate:
+            to_deactivate = frame['id'][failing & frame['is_active'].astype(bool)]
+            if len(to_deactivate):
+                db.session.execute(update(Property), [{'id': int(i), 'is_active': False} for i in to_deactivate])
+            stats['deactivated'] += len(to_deactivate)
+        if dry_run:
+            db.session.rollback()
+        else:
             db.session.commit()
-            
-    db.session.commit()
-    print(f"\nDone. Converted {updated} properties to USD.")
+
+    elapsed = time.perf_counter() - started
+    rate = stats['rows'] / elapsed if elapsed else 0
+    verb = "Would flag" if dry_run else "Flagged"
+    print(f"\n📊 Validated {stats['rows']} listings in {elapsed:.1f}s ({rate:.0f} rows/s): "
+          f"{stats['failing']} failing. {verb} {stats['flagged']} newly, cleared {stats['cleared']}"
+          + (f", deactivated {stats['deactivated']}" if deactivate else ""))
+    for rule, count in sorted(failing_by_rule.items(), key=lambda item: -item[1]):
+        print(f"   {rule}: {count}")
+
+
+@click.command('build-price-bounds')
+@with_appcontext
+def build_price_bounds_command():
+    """Rebuilds the per-city price/m² sketches behind ListingValidator's outlier bounds from stored listings."""
+    listings = db.session.execute(
+        select(Property.city, Property.rooms, Property.price, Property.area).where(
+            Property.is_active.is_(True), Property.currency == 'USD',
+            Property.price >= MIN_PRICE_USD, Property.area.between(8, 500))
+    ).yield_per(10_000)
+    markets = price_bounds.rebuild(listings)
+    print(f"📈 Built price/m² sketches for {markets} markets")
+
+    largest = PriceSketch.query.filter_by(rooms=price_bounds.ALL_ROOMS).order_by(PriceSketch.count.desc()).limit(10)
+    for row in largest:
+        bounds = price_bounds.lookup(row.city)
+        limits = f"${bounds.low:.0f}–${bounds.high:.0f}/m²" if bounds else "fixed bounds (too few listings)"
+        print(f"   {row.city}: {row.count} listings → {limits}")
 
 
 @click.command('rescrape-duplicates')
@@ -503,4 +691,5 @@ def rescrape_duplicates_command(min_count, workers):
     ]
     print(f"Queued {len(urls)} listings for re-scraping...")
 
-    _execute_scraping(urls, workers, scrape_bon_ua_listing)
+    # These rows were parsed wrongly, so the page must be re-parsed even if it did not change
+    _execute_scraping(urls, workers, SITES['bon_ua'], conditional=False)
@@ -10,6 +10,10 @@ class Property(db.Model):
     title = db.Column(db.Text, nullable=False)
     price = db.Column(db.Float, nullable=True)
     currency = db.Column(db.String(10), default="USD")
+    # The price as listed; price/currency hold it in USD at the NBU rate of fx_rate_date (None for USD listings)
+    price_original = db.Column(db.Float, nullable=True)
+    currency_original = db.Column(db.String(10), nullable=True)
+    fx_rate_date = db.Column(db.Date, nullable=True)
 
     address = db.Column(db.Text, nullable=True)
     latitude = db.Column(db.Float, nullable=True)
@@ -27,6 +31,13 @@ class Property(db.Model):
     description = db.Column(db.Text, nullable=True)
     images = db.Column(db.JSON, nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Why ListingValidator rejects the listing as stored (set at ingest and by `flask revalidate`); None if valid
+    validation_error = db.Column(db.String(200), nullable=True)
+
+    # HTTP cache validators of the listing page, used for conditional re-fetching
+    http_etag = db.Column(db.Text, nullable=True)
+    http_last_modified = db.Column(db.String(64), nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -47,4 +58,152 @@ class Property(db.Model):
             'url': self.source_url,
             'created_at': self.created_at.isoformat(),
             'is_active': self.is_active
-        }
\ No newline at end of file
+        }
+
+
+class ScrapeJob(db.Model):
+    """A listing URL waiting to be scraped. Workers claim rows with FOR UPDATE SKIP LOCKED."""
+    __tablename__ = 'scrape_jobs'
+    __table_args__ = (
+        db.Index('ix_scrape_jobs_claim', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.Text, unique=True, nullable=False)
+    site = db.Column(db.String(50), nullable=False)
+
+    # pending -> running -> done | failed (after max_attempts)
+    status = db.Column(db.String(20), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    locked_by = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    last_result = db.Column(db.String(20), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ScrapeJob {self.id} {self.status} {self.url}>'
+
+
+class SitemapState(db.Model):
+    """Per-site checkpoint of sitemap discovery: the start time of the last complete walk."""
+    __tablename__ = 'sitemap_state'
+
+    site = db.Column(db.String(50), primary_key=True)
+    last_run_at = db.Column(db.DateTime, nullable=False)
+    last_url_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<SitemapState {self.site} {self.last_run_at}>'
+
+
+class GeocodeCache(db.Model):
+    """Photon result for a normalized (address, region) query. Misses are cached too, with a shorter TTL."""
+    __tablename__ = 'geocode_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), unique=True, nullable=False)     # sha256 of the normalized query
+    query_text = db.Column(db.Text, nullable=False)
+    region = db.Column(db.String(100), nullable=True)
+
+    outcome = db.Column(db.String(10), nullable=False)               # 'found' | 'miss'
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    canonical_address = db.Column(db.Text, nullable=True)
+    precision = db.Column(db.String(20), nullable=True)
+
+    hits = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<GeocodeCache {self.outcome} {self.query_text[:30]}>'
+
+
+class GeocodeJob(db.Model):
+    """A property waiting for coordinates. Scrapers insert listings with geocode_precision='pending' and queue one of these."""
+    __tablename__ = 'geocode_jobs'
+    __table_args__ = (
+        db.Index('ix_geocode_jobs_claim', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    property_id = db.Column(db.Integer, db.ForeignKey('properties.id', ondelete='CASCADE'), unique=True, nullable=False)
+    address = db.Column(db.Text, nullable=False)
+    region = db.Column(db.String(100), nullable=True)
+
+    # pending -> running -> done | failed (after max_attempts)
+    status = db.Column(db.String(20), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    locked_by = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+
+    last_result = db.Column(db.String(20), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<GeocodeJob {self.id} {self.status} property={self.property_id}>'
+
+
+class AddressExtraction(db.Model):
+    """An LLM address extraction, keyed by a hash of the model, prompt version and listing text. Empty answers are kept too."""
+    __tablename__ = 'address_extractions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(64), unique=True, nullable=False)
+    model = db.Column(db.String(50), nullable=False)
+    outcome = db.Column(db.String(10), nullable=False)                # 'found' | 'empty'
+    result = db.Column(db.JSON, nullable=True)                        # {"city", "street", "number", "district", "region"}
+
+    hits = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<AddressExtraction {self.outcome} {self.key[:12]}>'
+
+
+class ExchangeRate(db.Model):
+    """An official NBU rate (UAH per unit of `currency`) for the day NBU set it, kept so restarts and NBU outages don't lose it."""
+    __tablename__ = 'exchange_rates'
+    __table_args__ = (
+        db.UniqueConstraint('currency', 'rate_date', name='uq_exchange_rates_currency_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    currency = db.Column(db.String(3), nullable=False)
+    rate = db.Column(db.Float, nullable=False)
+    rate_date = db.Column(db.Date, nullable=False, index=True)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<ExchangeRate {self.currency} {self.rate} {self.rate_date}>'
+
+
+class PriceSketch(db.Model):
+    """A streaming quantile sketch of USD price/m² in one market: a city and a rooms bucket (0 = all rooms)."""
+    __tablename__ = 'price_sketches'
+    __table_args__ = (
+        db.UniqueConstraint('city', 'rooms', name='uq_price_sketches_city_rooms'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    city = db.Column(db.String(100), nullable=False)
+    rooms = db.Column(db.Integer, default=0, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    sketch = db.Column(db.JSON, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<PriceSketch {self.city} {self.rooms} n={self.count}>'
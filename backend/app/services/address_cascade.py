@@ -0,0 +1,293 @@
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from flask import current_app, has_app_context
+
+from app.services.address_normalizer import AddressNormalizer
+from app.services.cities import normalize_city
+from app.services.gazetteer import open_gazetteer
+from app.services.pipeline import StageStats
+
+TIERS = ('structured', 'regex', 'gazetteer', 'llm')
+# Cheap, context-free tiers, run by the parsers themselves (possibly in parse-pool processes)
+PARSER_TIERS = ('structured', 'regex')
+# Tiers that need the app (gazetteer file, LLM cache); the pipeline runs them after parsing
+APP_TIERS = ('gazetteer', 'llm')
+
+# The cascade stops at the first candidate at least this confident
+ACCEPT_CONFIDENCE = 0.7
+LLM_CONTEXT_CHARS = 1500
+
+_STREET_WORD = re.compile(
+    r'(?<!\w)(?:' + '|'.join(re.escape(m) for m in AddressNormalizer.STREET_MARKERS + ['площа', 'площадь', 'пл.'])
+    + r')(?!\w)',
+    re.IGNORECASE,
+)
+_HOUSE_NUMBER = re.compile(r'(?<![\w/])\d{1,4}\s?[а-яієїґa-z]?(?:/\d{1,4}[а-яієїґa-z]?)?(?!\w)', re.IGNORECASE)
+_WORD = re.compile(r'[^\W\d_]{3,}')
+
+
+class ListingText(NamedTuple):
+    """What the tiers get to look at for one listing."""
+    title: str
+    description: str = ''
+    breadcrumbs: str = ''
+    city: str | None = None
+    district: str | None = None
+    region: str | None = None
+    structured_address: str | None = None     # address the page states as such (JSON-LD, address block)
+    scan_description: bool = True             # whether the regex tier may search the description too
+
+
+class AddressCandidate(NamedTuple):
+    address: str
+    city: str | None
+    district: str | None
+    region: str | None
+    confidence: float
+    tier: str
+
+
+def score_address(address, city=None) -> float:
+    """0.3 for a known city, 0.35 for a street, 0.25 for a house number."""
+    if not address:
+        return 0.0
+    rest = ', '.join(p for p in (p.strip() for p in address.split(','))
+                     if p and not (city and normalize_city(p, settlements=False) == city) and p != city)
+    has_number = bool(_HOUSE_NUMBER.search(rest))
+    has_street = bool(_STREET_WORD.search(rest)) or (has_number and bool(_WORD.search(rest)))
+    return round(0.3 * bool(city) + 0.35 * has_street + 0.25 * has_number, 2)
+
+
+def _candidate(listing, address, tier, adjust=0.0) -> AddressCandidate:
+    city = listing.city or normalize_city(address.split(',')[0].strip(), fuzzy=True)
+    confidence = min(1.0, max(0.0, score_address(address, city) + adjust))
+    return AddressCandidate(address, city, listing.district, listing.region, round(confidence, 2), tier)
+
+
+def _structured(listing, best):
+    if not listing.structured_address:
+        return None
+    return _candidate(listing, listing.structured_address, 'structured', 0.05)
+
+
+def _regex(listing, best):
+    extracted = AddressNormalizer.extract_from_text(listing.title)
+    if extracted:
+        return _candidate(listing, extracted, 'regex')
+    if listing.scan_description:
+        # Descriptions mention nearby streets and area specs too
+        extracted = AddressNormalizer.extract_from_text(listing.description)
+        if extracted:
+            return _candidate(listing, extracted, 'regex', -0.15)
+    return None
+
+
+def _gazetteer(listing, best):
+    """Confirms the best candidate so far against the offline gazetteer."""
+    if best is None or not best.city or not has_app_context():
+        return None
+    gazetteer = open_gazetteer(current_app.config.get('GAZETTEER_PATH'))
+    if gazetteer is None:
+        return None
+    found = gazetteer.resolve(with_city(best.address, best.city))
+    if not found:
+        return None
+    precision = found[3]
+    return best._replace(confidence=max(best.confidence, 0.95 if precision == 'exact' else 0.8), tier='gazetteer')
+
+
+def _llm(listing, best):
+    return _llm_many([listing])[0]
+
+
+def _llm_many(listings) -> list[AddressCandidate | None]:
+    """The LLM tier for several listings, asked in one AIAddressParser.parse_many call (batched prompts)."""
+    if not has_app_context() or not current_app.config.get('ADDRESS_LLM_TIER'):
+        return [None] * len(listings)
+    from app.services.ai_address_parser import AIAddressParser
+
+    answers = AIAddressParser.parse_many([(item.title, item.description, item.breadcrumbs) for item in listings])
+    return [_llm_candidate(listing, data) for listing, data in zip(listings, answers)]
+
+
+def _llm_candidate(listing, data) -> AddressCandidate | None:
+    if not data:
+        return None
+    city = normalize_city(data['city'], fuzzy=True) or data['city']
+    address = ', '.join(str(part).strip() for part in (city, data.get('street'), data.get('number')) if part)
+    # A model answer is less trustworthy than the same address found verbatim on the page
+    return AddressCandidate(address, city, listing.district or data.get('district'),
+                            listing.region or data.get('region'),
+                            round(max(0.0, score_address(address, city) - 0.1), 2), 'llm')
+
+
+_TIER_FUNCS = {'structured': _structured, 'regex': _regex, 'gazetteer': _gazetteer, 'llm': _llm}
+# Tiers that answer a list of listings at once; finish_many uses these
+_BATCH_TIER_FUNCS = {'llm': _llm_many}
+
+
+def with_city(address, city) -> str:
+    if city and address and city not in address:
+        return f"{city}, {address}"
+    return address or city
+
+
+def run(listing, tiers=TIERS, best=None, threshold=ACCEPT_CONFIDENCE):
+    """
+    Runs `tiers` in order until the best candidate reaches `threshold`. Returns the best
+    candidate (possibly below the threshold, or None) and a trace of [tier, confidence
+    or None] for the tiers that ran. Tier durations go straight to cascade_stats.
+    """
+    trace = []
+    for tier in tiers:
+        if best is not None and best.confidence >= threshold:
+            break
+        started = time.perf_counter()
+        candidate = _TIER_FUNCS[tier](listing, best)
+        cascade_stats.add_duration(tier, time.perf_counter() - started)
+        trace.append([tier, candidate.confidence if candidate else None])
+        if candidate is not None and (best is None or candidate.confidence > best.confidence):
+            best = candidate
+    return best, trace
+
+
+def extract(listing) -> tuple[AddressCandidate | None, dict]:
+    """
+    The parsers' part of the cascade. Returns the best candidate and a state dict for the
+    parsed data ('address_cascade'), which `finish` picks up to run the remaining tiers
+    when the candidate is not confident enough, and to record the metrics.
+    """
+    best, trace = run(listing, PARSER_TIERS)
+    state = {'trace': trace, 'best': best._asdict() if best else None}
+    if best is None or best.confidence < ACCEPT_CONFIDENCE:
+        state['listing'] = listing._replace(description=(listing.description or '')[:LLM_CONTEXT_CHARS])._asdict()
+    return best, state
+
+
+@dataclass
+class _Unfinished:
+    data: dict
+    trace: list
+    parsed: AddressCandidate | None     # the parsers' best candidate
+    best: AddressCandidate | None
+    listing: ListingText | None         # None when the parsers' candidate was confident enough
+
+    @property
+    def open(self) -> bool:
+        return self.listing is not None and (self.best is None or self.best.confidence < ACCEPT_CONFIDENCE)
+
+
+def finish(data):
+    """Completes the cascade for parsed `data` (in place) and records per-tier metrics. Needs an app context."""
+    finish_many([data])
+
+
+def finish_many(items):
+    """
+    finish() for several parsed listings. Each tier runs for the listings that still
+    need it, and the LLM tier asks about all of them in one batched call, rather than
+    one blocking Ollama request per listing.
+    """
+    entries = []
+    for data in items:
+        state = data.pop('address_cascade', None)
+        if not state:
+            continue
+        parsed = AddressCandidate(**state['best']) if state['best'] else None
+        listing = ListingText(**state['listing']) if 'listing' in state else None
+        entries.append(_Unfinished(data, list(state['trace']), parsed, parsed, listing))
+
+    for tier in APP_TIERS:
+        pending = [entry for entry in entries if entry.open]
+        if not pending:
+            break
+        if tier in _BATCH_TIER_FUNCS:
+            started = time.perf_counter()
+            candidates = _BATCH_TIER_FUNCS[tier]([entry.listing for entry in pending])
+            elapsed = (time.perf_counter() - started) / len(pending)
+            for _ in pending:
+                cascade_stats.add_duration(tier, elapsed)
+        else:
+            candidates = []
+            for entry in pending:
+                started = time.perf_counter()
+                candidates.append(_TIER_FUNCS[tier](entry.listing, entry.best))
+                cascade_stats.add_duration(tier, time.perf_counter() - started)
+        for entry, candidate in zip(pending, candidates):
+            entry.trace.append([tier, candidate.confidence if candidate else None])
+            if candidate is not None and (entry.best is None or candidate.confidence > entry.best.confidence):
+                entry.best = candidate
+
+    for entry in entries:
+        best, parsed, data = entry.best, entry.parsed, entry.data
+        if best is not None and best != parsed:
+            if best.address != (parsed.address if parsed else None):
+                data['address'] = with_city(best.address, best.city)
+            for field in ('city', 'district', 'region'):
+                if not data.get(field) and getattr(best, field):
+                    data[field] = getattr(best, field)
+        cascade_stats.record(entry.trace, best.tier if best else None)
+
+
+class CascadeStats:
+    """
+    Per tier: runs, candidates found and candidates used (counted by `finish`), and run
+    durations (measured where the tier runs, so parser tiers run in parse-pool
+    processes have none here).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add_duration(self, tier, seconds):
+        with self._lock:
+            durations = self._durations.setdefault(tier, StageStats())
+        durations.add(seconds)
+
+    def record(self, trace, used_tier):
+        with self._lock:
+            self._listings += 1
+            for tier, confidence in trace:
+                self._runs[tier] += 1
+                self._found[tier] += confidence is not None
+            if used_tier:
+                self._used[used_tier] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for tier in TIERS:
+                if not self._runs[tier]:
+                    continue
+                durations = self._durations.get(tier, StageStats())
+                tiers[tier] = {'runs': self._runs[tier], 'found': self._found[tier], 'used': self._used[tier],
+                               'p50': durations.percentile(0.5), 'p95': durations.percentile(0.95)}
+            return {'listings': self._listings, 'tiers': tiers}
+
+    def reset(self):
+        with self._lock:
+            self._listings = 0
+            self._runs = Counter()
+            self._found = Counter()
+            self._used = Counter()
+            self._durations = {}
+
+
+cascade_stats = CascadeStats()
+
+
+def print_cascade_summary():
+    s = cascade_stats.snapshot()
+    if not s['listings']:
+        return
+    parts = []
+    for tier, t in s['tiers'].items():
+        timing = f", p50 {t['p50'] * 1000:.2f}ms p95 {t['p95'] * 1000:.2f}ms" if t['p50'] is not None else ''
+        parts.append(f"{tier} {t['used']} used / {t['found']} found / {t['runs']} runs{timing}")
+    print(f"🔎 Address cascade over {s['listings']} listings: " + "; ".join(parts))
@@ -1,5 +1,14 @@
 import re
+from functools import lru_cache
+
 from app.services.cities import normalize_city, get_all_aliases
+from app.services.fuzzy import TrigramIndex
+
+
+# Distinct inputs remembered per memoized method. Descriptions passed to
+# extract_from_text are long, so fewer of them are kept.
+MEMO_SIZE = 8192
+TEXT_MEMO_SIZE = 1024
 
 
 class AddressNormalizer:
@@ -52,6 +61,20 @@ class AddressNormalizer:
 
     _ALL_TRANSLATIONS = {}
 
+    # Words in a translation's value that make it a full street name ("вулиця Соборна"),
+    # so a street marker already in front of the key is replaced along with it
+    _MARKER_VALUE_WORDS = ['вулиця', 'проспект', 'провулок', 'площа', 'майдан', 'бульвар']
+    _PRECEDING_MARKERS = r'улица|ул\.?|проспект|просп\.?|переулок|пер\.?|площадь|пл\.?|бульвар|б-р|шоссе|спуск|тупик'
+    _LETTER = r'[а-яА-Яa-zA-ZїієґЇІЄҐ]'
+
+    _translation_regex = None
+    _translation_values = None
+
+    # Lowest FuzzyMatch.score accepted for a misspelt renamed street ("Магнитогорска")
+    MIN_STREET_SCORE = 0.8
+    _WORD = re.compile(r"[^\W\d_]+(?:[-'’][^\W\d_]+)*")
+    _fuzzy_renames = None
+
     @classmethod
     def _get_translations(cls):
         if not cls._ALL_TRANSLATIONS:
@@ -62,12 +85,58 @@ class AddressNormalizer:
             cls._ALL_TRANSLATIONS.update(cls.STREET_RENAMES)
         return cls._ALL_TRANSLATIONS
 
+    @classmethod
+    def _get_translation_regex(cls):
+        """
+        One alternation over every translation key, built once. Keys are tried longest
+        first, so at any position the longest key wins. Keys whose value is a full street
+        name also get a "marker + key" alternative, tried before the bare keys, so
+        "ул. Ленина" becomes "вулиця Соборна" rather than "вулиця вулиця Соборна".
+        """
+        if cls._translation_regex is None:
+            translations = cls._get_translations()
+            keys = sorted(translations, key=len, reverse=True)
+            values = {}
+            for k in keys:
+                values.setdefault(k.lower(), translations[k])
+            with_marker = [k for k in keys if any(m in translations[k].lower() for m in cls._MARKER_VALUE_WORDS)]
+
+            def alternation(ks):
+                return '|'.join(re.escape(k) for k in ks)
+
+            cls._translation_values = values
+            cls._translation_regex = re.compile(
+                rf'(?<!{cls._LETTER})'
+                rf'(?:(?:{cls._PRECEDING_MARKERS})\s+(?P<marked>{alternation(with_marker)})|(?P<key>{alternation(keys)}))'
+                rf'(?!{cls._LETTER})',
+                re.IGNORECASE,
+            )
+        return cls._translation_regex
+
     @classmethod
     def normalize(cls, address: str) -> list[str]:
-        """Returns a prioritized list of search strings for geocoding."""
+        """Returns a prioritized list of search strings for geocoding. Memoized; the list is the caller's to keep."""
         if not address:
             return []
+        return list(cls._normalize_memo(address))
+
+    @classmethod
+    def normalize_many(cls, addresses) -> list[list[str]]:
+        """
+        normalize() for each address, in order. Each distinct address is normalized once,
+        and the memo is warmed for later normalize() calls (e.g. from get_lat_long).
+        """
+        addresses = list(addresses)
+        distinct = {a: cls.normalize(a) for a in dict.fromkeys(addresses)}
+        return [list(distinct[a]) for a in addresses]
 
+    @classmethod
+    @lru_cache(maxsize=MEMO_SIZE)
+    def _normalize_memo(cls, address: str) -> tuple[str, ...]:
+        return tuple(cls._normalize(address))
+
+    @classmethod
+    def _normalize(cls, address: str) -> list[str]:
         candidates = []
         cleaned = cls._basic_clean(address)
 
@@ -76,7 +145,7 @@ class AddressNormalizer:
             return [cleaned]
 
         city = parts[0]
-        city_ua = normalize_city(city) or city
+        city_ua = normalize_city(city, fuzzy=True) or city
 
         raw_rest = ", ".join(parts[1:])
 
@@ -99,6 +168,9 @@ class AddressNormalizer:
         translated_full = cls._translate_full_string(cleaned)
         if translated_full != cleaned:
             candidates.append(translated_full)
+        corrected = cls._correct_renamed_streets(raw_rest)
+        if corrected != raw_rest:
+            candidates.append(f"{city_ua}, {cls._process_street_part(corrected)}")
 
         if len(parts) >= 3:
             street_segment = cls._process_street_part(parts[-2])
@@ -126,32 +198,39 @@ class AddressNormalizer:
 
     @classmethod
     def _translate_full_string(cls, text: str) -> str:
-        translations = cls._get_translations()
-        
-        # Sort keys by length descending to replace "улица Ленина" before "улица"
-        sorted_keys = sorted(translations.keys(), key=len, reverse=True)
-        
-        for k in sorted_keys:
-            v = translations[k]
-            # Use lookbehind/lookahead for word characters instead of \b to handle trailing dots like "ул."
-            pattern = re.compile(r'(?<![а-яА-Яa-zA-ZїієґЇІЄҐ])' + re.escape(k) + r'(?![а-яА-Яa-zA-ZїієґЇІЄҐ])', re.IGNORECASE)
-            
-            if pattern.search(text):
-                # If we are replacing a name that includes a marker (validation from dict values)
-                if any(marker in v.lower() for marker in ['вулиця', 'проспект', 'провулок', 'площа', 'майдан', 'бульвар']):
-                     # Check if there is a preceding marker in text that will be redundant
-                     preceding_marker_pattern = re.compile(r'(?<![а-яА-Яa-zA-ZїієґЇІЄҐ])(улица|ул\.?|проспект|просп\.?|переулок|пер\.?|площадь|пл\.?|бульвар|б-р|шоссе|спуск|тупик)\s+' + re.escape(k) + r'(?![а-яА-Яa-zA-ZїієґЇІЄҐ])', re.IGNORECASE)
-                     
-                     if preceding_marker_pattern.search(text):
-                         # Replace "marker k" with "v" directly
-                         text = preceding_marker_pattern.sub(v, text)
-                         continue
-
-                text = pattern.sub(v, text)
-                
+        regex = cls._get_translation_regex()
+        values = cls._translation_values
+        return regex.sub(lambda m: values[(m.group('marked') or m.group('key')).lower()], text)
+
+    @classmethod
+    def _correct_renamed_streets(cls, text: str) -> str:
+        """
+        Replaces a misspelt old street name (one or two words) with its STREET_RENAMES
+        key, so translation can then rename it: "ул. Магнитогорска" -> "ул. Магнитогорская".
+        """
+        words = list(cls._WORD.finditer(text))
+        for i, word in enumerate(words):
+            if len(word.group()) < 5 or word.group().lower() in cls.STREET_MARKERS:
+                continue
+            spans = [(word.start(), words[i + 1].end())] if i + 1 < len(words) else []
+            spans.append((word.start(), word.end()))
+            for start, end in spans:
+                renamed = cls._match_renamed_street(text[start:end])
+                if renamed:
+                    return text[:start] + renamed + text[end:]
         return text
 
     @classmethod
+    @lru_cache(maxsize=MEMO_SIZE)
+    def _match_renamed_street(cls, name: str) -> str | None:
+        """The STREET_RENAMES key `name` is a misspelling of; None for exact or no matches."""
+        if cls._fuzzy_renames is None:
+            cls._fuzzy_renames = TrigramIndex({k: k for k in cls.STREET_RENAMES})
+        match = cls._fuzzy_renames.lookup(name, min_score=cls.MIN_STREET_SCORE)
+        return match.value if match and match.distance else None
+
+    @classmethod
+    @lru_cache(maxsize=MEMO_SIZE)
     def _basic_clean(cls, text: str) -> str:
         text = re.sub(r'\s+(область|район|р-н)\b\.?', '', text, flags=re.IGNORECASE)
         text = re.sub(r'\b(м-н|ж/м|массив|микрорайон)\b\.?', '', text, flags=re.IGNORECASE)
@@ -177,22 +256,54 @@ class AddressNormalizer:
         'квартира', 'місто', 'будинку', 'поверху',
     }
 
+    _MEMOIZED = {
+        'normalize': '_normalize_memo', 'basic_clean': '_basic_clean', 'extract_from_text': 'extract_from_text',
+        'renamed_street': '_match_renamed_street',
+    }
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        """{'normalize': {'hits', 'misses', 'maxsize', 'currsize'}, ...} for each memoized method."""
+        return {name: getattr(cls, attr).cache_info()._asdict() for name, attr in cls._MEMOIZED.items()}
+
+    @classmethod
+    def clear_cache(cls):
+        for attr in cls._MEMOIZED.values():
+            getattr(cls, attr).cache_clear()
+
+    _extract_patterns = None
+
     @classmethod
+    def _get_extract_patterns(cls):
+        if cls._extract_patterns is None:
+            markers_pattern = "|".join([re.escape(m) for m in cls.STREET_MARKERS])
+
+            # Pattern: Marker + Name + Number
+            pattern_a = re.compile(
+                r'(?:' + markers_pattern + r')\s+'
+                r'([А-Яа-яїієґA-Z][\w\-\.]+(?:\s+[А-Яа-яїієґA-Z][\w\-\.]+){0,2})'
+                r'[\s,]*'
+                r'((?:буд\.|д\.)?\s*\d+[а-яА-Яa-zA-Z]?(?:/\d+)?)',
+                re.IGNORECASE
+            )
+            # Pattern: Name + Marker + Number
+            pattern_b = re.compile(
+                r'([А-Яа-яїієґA-Z][\w\-\.]+(?:\s+[А-Яа-яїієґA-Z][\w\-\.]+){0,2})\s+'
+                r'(?:' + markers_pattern + r')[\s,]*'
+                r'((?:буд\.|д\.)?\s*\d+[а-яА-Яa-zA-Z]?(?:/\d+)?)',
+                re.IGNORECASE
+            )
+            cls._extract_patterns = pattern_a, pattern_b
+        return cls._extract_patterns
+
+    @classmethod
+    @lru_cache(maxsize=TEXT_MEMO_SIZE)
     def extract_from_text(cls, text: str) -> str | None:
         """Extract a likely address from a block of text (description)."""
         if not text:
             return None
 
-        markers_pattern = "|".join([re.escape(m) for m in cls.STREET_MARKERS])
-
-        # Pattern: Marker + Name + Number
-        pattern_a = re.compile(
-            r'(?:' + markers_pattern + r')\s+'
-            r'([А-Яа-яїієґA-Z][\w\-\.]+(?:\s+[А-Яа-яїієґA-Z][\w\-\.]+){0,2})'
-            r'[\s,]*'
-            r'((?:буд\.|д\.)?\s*\d+[а-яА-Яa-zA-Z]?(?:/\d+)?)',
-            re.IGNORECASE
-        )
+        pattern_a, pattern_b = cls._get_extract_patterns()
 
         match = pattern_a.search(text)
         if match:
@@ -204,13 +315,6 @@ class AddressNormalizer:
             else:
                 return cls._basic_clean(match.group(0))
 
-        # Pattern: Name + Marker + Number
-        pattern_b = re.compile(
-            r'([А-Яа-яїієґA-Z][\w\-\.]+(?:\s+[А-Яа-яїієґA-Z][\w\-\.]+){0,2})\s+'
-            r'(?:' + markers_pattern + r')[\s,]*'
-            r'((?:буд\.|д\.)?\s*\d+[а-яА-Яa-zA-Z]?(?:/\d+)?)',
-            re.IGNORECASE
-        )
         match = pattern_b.search(text)
         if match:
             translations = cls._get_translations()
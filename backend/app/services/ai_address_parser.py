@@ -1,55 +1,125 @@
+import hashlib
 import json
 import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from flask import has_app_context
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import AddressExtraction
+from app.services.rate_limiter import AdaptiveRateLimiter, CircuitOpenError
 
 
-def _get_ollama_url():
+def _get_ollama_host():
+    if os.environ.get('OLLAMA_HOST'):
+        return os.environ['OLLAMA_HOST'].rstrip('/')
     # If inside Docker, use host.docker.internal
     if os.path.exists('/.dockerenv') or os.environ.get('DOCKER_CONTAINER'):
-        return "http://host.docker.internal:11434/api/generate"
-    return "http://localhost:11434/api/generate"
+        return "http://host.docker.internal:11434"
+    return "http://localhost:11434"
+
+OLLAMA_HOST = _get_ollama_host()
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', "gemma3:4b")
+# Concurrent generate requests; match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_CONCURRENCY = int(os.getenv('OLLAMA_CONCURRENCY', 2))
+OLLAMA_TIMEOUT = (3, 60)        # connect, read
+# Listings per prompt in parse_many; a batch the model answers badly is retried one by one
+BATCH_SIZE = 4
+# Part of the cache key: bump when the prompt changes so old extractions are not reused
+PROMPT_VERSION = 1
 
-OLLAMA_URL = _get_ollama_url()
-OLLAMA_MODEL = "gemma3:4b"
+DESCRIPTION_CHARS = 1500
+FIELDS = ('city', 'street', 'number', 'district', 'region')
+
+_FAILED = object()
 
 
 class AIAddressParser:
+    """
+    Address extraction with a local Ollama model, for listings the rule-based parsers
+    could not place. Answers are cached in the database by a hash of the listing text,
+    requests are limited to OLLAMA_CONCURRENCY at a time, and the circuit breaker of
+    `limiter` stops calling Ollama while it is down, retrying with a growing backoff.
+    """
     _ollama_available = None
+    # Only its circuit breaker matters: the rate is high enough never to hold a request back
+    limiter = AdaptiveRateLimiter(initial_rate=100, min_rate=100, max_rate=100, burst=OLLAMA_CONCURRENCY,
+                                  latency_target=OLLAMA_TIMEOUT[1], failure_threshold=3, cooldown=30,
+                                  max_cooldown=900)
+    _slots = threading.BoundedSemaphore(OLLAMA_CONCURRENCY)
+    _stats = Counter()
+    _stats_lock = threading.Lock()
+
+    @classmethod
+    def _count(cls, name, n=1):
+        with cls._stats_lock:
+            cls._stats[name] += n
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Counters: cache_hits, cache_misses, requests, batches, errors, skipped (circuit open)."""
+        with cls._stats_lock:
+            return dict(cls._stats)
+
+    @classmethod
+    def reset(cls):
+        cls._ollama_available = None
+        cls.limiter.reset()
+        with cls._stats_lock:
+            cls._stats.clear()
 
     @classmethod
     def _check_ollama(cls) -> bool:
-        if cls._ollama_available is not None:
-            return cls._ollama_available
+        """Whether Ollama serves OLLAMA_MODEL. Probed once it is reachable; failed probes go through the breaker."""
+        if cls._ollama_available:
+            return True
 
         try:
-            resp = requests.get("http://localhost:11434/api/tags", timeout=3)
-            if resp.status_code == 200:
-                models = [m['name'] for m in resp.json().get('models', [])]
-                if any(OLLAMA_MODEL in m for m in models):
-                    cls._ollama_available = True
-                    print(f"✅ Ollama ready with model {OLLAMA_MODEL}")
-                    return True
-                else:
-                    print(f"⚠️ Ollama running but model '{OLLAMA_MODEL}' not found. Available: {models}")
-                    cls._ollama_available = False
-                    return False
+            with cls.limiter.slot(OLLAMA_HOST) as slot:
+                resp = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=3)
+                # Anything but the model list means Ollama is not serving
+                slot.record(resp if resp.status_code == 200 else None)
+                if resp.status_code == 200:
+                    models = [m['name'] for m in resp.json().get('models', [])]
+        except CircuitOpenError:
+            return False
         except requests.ConnectionError:
             print("⚠️ Ollama not running. Start it with: ollama serve")
-            cls._ollama_available = False
+            return False
         except Exception as e:
             print(f"⚠️ Ollama check failed: {e}")
-            cls._ollama_available = False
+            return False
 
-        return False
+        if resp.status_code != 200:
+            return False
+        if not any(OLLAMA_MODEL in m for m in models):
+            print(f"⚠️ Ollama running but model '{OLLAMA_MODEL}' not found. Available: {models}")
+            cls.limiter.trip(OLLAMA_HOST, f"model '{OLLAMA_MODEL}' not found")
+            return False
+        cls._ollama_available = True
+        print(f"✅ Ollama ready with model {OLLAMA_MODEL}")
+        return True
 
-    @classmethod
-    def parse(cls, title: str, description: str, breadcrumbs_text: str = "") -> dict | None:
-        if not cls._check_ollama():
-            return None
+    @staticmethod
+    def _sample(title, description, breadcrumbs_text="") -> tuple[str, str, str]:
+        """The parts of a listing the prompt uses, which are also what the cache key covers."""
+        return (title or "").strip(), (breadcrumbs_text or "").strip(), (description or "")[:DESCRIPTION_CHARS]
 
-        desc_sample = description[:1500] if description else ""
+    @staticmethod
+    def _key(sample) -> str:
+        text = '\x1f'.join((OLLAMA_MODEL, str(PROMPT_VERSION), *sample))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-        prompt = f"""Extract the property address from this Ukrainian real estate listing.
+    @staticmethod
+    def _prompt(sample) -> str:
+        title, breadcrumbs_text, desc_sample = sample
+        return f"""Extract the property address from this Ukrainian real estate listing.
 
 Title: {title}
 Breadcrumbs: {breadcrumbs_text}
@@ -63,6 +133,28 @@ Rules:
 Return ONLY valid JSON:
 {{"city": "string or null", "street": "string or null", "number": "string or null", "district": "string or null", "region": "string or null"}}"""
 
+    @staticmethod
+    def _batch_prompt(samples) -> str:
+        listings = "\n\n".join(
+            f"### Listing {i}\nTitle: {title}\nBreadcrumbs: {breadcrumbs_text}\nDescription: {desc_sample}"
+            for i, (title, breadcrumbs_text, desc_sample) in enumerate(samples, 1)
+        )
+        return f"""Extract the property address from each of these {len(samples)} Ukrainian real estate listings.
+
+{listings}
+
+Rules:
+1. Extract: city, street, house number, region (oblast), district (raion).
+2. Translate everything to Ukrainian (e.g., "Киев" -> "Київ", "ул." -> "вулиця").
+3. Set null for missing fields.
+4. Answer every listing, in order.
+
+Return ONLY valid JSON:
+{{"results": [{{"city": "string or null", "street": "string or null", "number": "string or null", "district": "string or null", "region": "string or null"}}, ...]}}"""
+
+    @classmethod
+    def _generate(cls, prompt, num_predict=200):
+        """Ollama's parsed JSON answer, or _FAILED when Ollama could not be asked or did not answer."""
         payload = {
             "model": OLLAMA_MODEL,
             "prompt": prompt,
@@ -70,36 +162,128 @@ Return ONLY valid JSON:
             "stream": False,
             "options": {
                 "temperature": 0.1,
-                "num_predict": 200
+                "num_predict": num_predict
             }
         }
 
         try:
-            response = requests.post(OLLAMA_URL, json=payload, timeout=60)
+            with cls.limiter.slot(OLLAMA_HOST) as slot, cls._slots:
+                cls._count('requests')
+                response = requests.post(f"{OLLAMA_HOST}/api/generate", json=payload, timeout=OLLAMA_TIMEOUT)
+                slot.record(response)
 
             if response.status_code == 200:
-                result = response.json()
-                text = result.get("response", "")
+                text = response.json().get("response", "")
 
                 # Clean and parse JSON
                 clean_text = text.replace('```json', '').replace('```', '').strip()
-                data = json.loads(clean_text)
+                return json.loads(clean_text)
 
-                if not data.get('city'):
-                    return None
-                return data
-
-            else:
-                print(f"⚠️ Ollama Error {response.status_code}: {response.text[:200]}")
-                return None
+            print(f"⚠️ Ollama Error {response.status_code}: {response.text[:200]}")
+            cls._count('errors')
+            return _FAILED
 
+        except CircuitOpenError:
+            cls._count('skipped')
+            return _FAILED
         except json.JSONDecodeError as e:
+            # Not an answer, so not cached as an empty one: a later run asks again
             print(f"⚠️ AI JSON parse error: {e}")
-            return None
-        except requests.ConnectionError:
+            cls._count('errors')
+            return _FAILED
+        except (requests.ConnectionError, requests.Timeout):
             print("⚠️ Ollama connection lost")
-            cls._ollama_available = None
-            return None
+            cls._count('errors')
+            return _FAILED
         except Exception as e:
             print(f"⚠️ AI Request Error: {e}")
+            cls._count('errors')
+            return _FAILED
+
+    @staticmethod
+    def _clean(data):
+        """The extraction if it names a city, else None (an answer, just an empty one)."""
+        if not isinstance(data, dict) or not data.get('city'):
             return None
+        return {field: data.get(field) for field in FIELDS}
+
+    @classmethod
+    def _extract(cls, samples) -> list:
+        """Extractions for a batch of samples, in order; _FAILED for those without an answer."""
+        if len(samples) > 1:
+            cls._count('batches')
+            data = cls._generate(cls._batch_prompt(samples), num_predict=200 * len(samples))
+            results = data.get('results') if isinstance(data, dict) else None
+            if isinstance(results, list) and len(results) == len(samples):
+                return [cls._clean(item) for item in results]
+            if data is _FAILED and cls.limiter.circuit(OLLAMA_HOST) != 'closed':
+                return [_FAILED] * len(samples)
+        extracted = []
+        for sample in samples:
+            data = cls._generate(cls._prompt(sample))
+            extracted.append(data if data is _FAILED else cls._clean(data))
+        return extracted
+
+    @classmethod
+    def parse(cls, title: str, description: str, breadcrumbs_text: str = "") -> dict | None:
+        return cls.parse_many([(title, description, breadcrumbs_text)])[0]
+
+    @classmethod
+    def parse_many(cls, listings, batch_size=BATCH_SIZE, workers=OLLAMA_CONCURRENCY) -> list[dict | None]:
+        """
+        parse() for (title, description, breadcrumbs_text) tuples, in order. Cached answers
+        are read in one query; the rest are deduplicated, grouped `batch_size` per prompt
+        and sent from up to `workers` threads (still at most OLLAMA_CONCURRENCY requests).
+        """
+        samples = [cls._sample(*listing) for listing in listings]
+        keys = [cls._key(sample) for sample in samples]
+        results = _cache_lookup(set(keys))
+        cls._count('cache_hits', sum(1 for key in keys if key in results))
+
+        missing = list(dict.fromkeys(key for key in keys if key not in results))
+        cls._count('cache_misses', len(missing))
+        if missing and cls._check_ollama():
+            sample_by_key = dict(zip(keys, samples))
+            batches = [missing[i:i + batch_size] for i in range(0, len(missing), max(1, batch_size))]
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(batches)))) as pool:
+                answers = pool.map(lambda batch: cls._extract([sample_by_key[key] for key in batch]), batches)
+                for batch, extracted in zip(batches, answers):
+                    for key, data in zip(batch, extracted):
+                        if data is _FAILED:
+                            continue
+                        results[key] = data
+                        _cache_store(key, data)
+        return [dict(results[key]) if results.get(key) else None for key in keys]
+
+
+def _cache_lookup(keys) -> dict:
+    """{key: extraction or None} for the cached keys. Own session, like geocode_cache; bypassed without an app context."""
+    if not keys or not has_app_context():
+        return {}
+    try:
+        with Session(db.engine) as session:
+            rows = session.execute(
+                select(AddressExtraction.key, AddressExtraction.result).where(AddressExtraction.key.in_(keys))
+            ).all()
+            if rows:
+                session.execute(update(AddressExtraction)
+                                .where(AddressExtraction.key.in_([row.key for row in rows]))
+                                .values(hits=AddressExtraction.hits + 1))
+                session.commit()
+            return {row.key: row.result for row in rows}
+    except SQLAlchemyError as e:
+        print(f"⚠️ AI extraction cache lookup failed: {e}")
+        return {}
+
+
+def _cache_store(key, data):
+    if not has_app_context():
+        return
+    try:
+        with Session(db.engine) as session:
+            session.add(AddressExtraction(key=key, model=OLLAMA_MODEL, outcome='found' if data else 'empty',
+                                          result=data, hits=0))
+            session.commit()
+    except SQLAlchemyError:
+        # Another worker cached the same listing concurrently
+        pass
@@ -1,24 +1,148 @@
+import gzip
+import io
+import logging
 import xml.etree.ElementTree as ET
-from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class SitemapEntry(NamedTuple):
+    kind: str           # 'sitemap' (entry of a sitemap index) or 'url'
+    loc: str
+    lastmod: datetime | None
+
+
+def parse_lastmod(value) -> datetime | None:
+    """W3C datetime from <lastmod> (date only, or with time and offset) as an aware UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _as_utc(moment: datetime | None) -> datetime | None:
+    if moment is None or moment.tzinfo is not None:
+        return moment
+    return moment.replace(tzinfo=timezone.utc)
+
+
+def _local_name(tag) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_entries(content):
+    """
+    Streams <sitemap>/<url> entries out of a sitemap or sitemap index document with
+    iterparse, clearing each element once read. Gzip payloads are recognised by their
+    magic bytes (not the file name) and decompressed on the fly.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    stream = io.BytesIO(content)
+    if content[:2] == GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream)
+
+    loc = lastmod = None
+    for _, elem in ET.iterparse(stream, events=('end',)):
+        name = _local_name(elem.tag)
+        if name == 'loc':
+            loc = (elem.text or '').strip()
+        elif name == 'lastmod':
+            lastmod = parse_lastmod(elem.text)
+        elif name in ('url', 'sitemap'):
+            if loc:
+                yield SitemapEntry('url' if name == 'url' else 'sitemap', loc, lastmod)
+            loc = lastmod = None
+            elem.clear()
+
 
 class BaseSitemapFetcher:
-    def __init__(self, fetch_func):
+    """
+    Streaming sitemap discoverer. Sub-sitemaps of an index are fetched by `workers`
+    threads, at most `workers` ahead of the consumer, and parsed in order as they
+    arrive, so URLs are yielded while the rest of the index is still downloading.
+
+    With `since`, sub-sitemaps and URLs whose <lastmod> is older are skipped; entries
+    without a lastmod are always kept. Sitemaps that could not be fetched or parsed
+    are collected in `failed`, so callers know the walk was incomplete.
+    """
+
+    def __init__(self, fetch_func, workers=4, sitemap_url=None, url_filter=None):
         self.fetch = fetch_func
-        
-    def _parse_xml(self, xml_content):
-        """Extract all URLs from a standard sitemap.xml"""
+        self.workers = workers
+        self.sitemap_url = sitemap_url
+        self.url_filter = url_filter
+        self.failed = []
+        self.sitemaps_read = 0
+
+    def _load(self, sitemap_url, since, url_filter):
+        """
+        (sitemap_url, sub-sitemap URLs, listing URLs) of one document, keeping only the
+        entries that pass `since` and `url_filter`; (sitemap_url, None, None) if it could
+        not be fetched or parsed.
+        """
+        content = self.fetch(sitemap_url)
+        if not content:
+            return sitemap_url, None, None
+        sitemaps, urls = [], []
         try:
-            root = ET.fromstring(xml_content)
-            # Handle XML namespaces usually present in sitemaps
-            urls = []
-            for child in root:
-                for subchild in child:
-                    if 'loc' in subchild.tag:
-                        urls.append(subchild.text)
-            return urls
-        except Exception as e:
-            print(f"Error parsing XML: {e}")
-            return []
+            # Parse fully in the worker thread so a broken document is caught here
+            for entry in iter_entries(content):
+                if since and entry.lastmod and entry.lastmod < since:
+                    continue
+                if entry.kind == 'sitemap':
+                    sitemaps.append(entry.loc)
+                elif not url_filter or any(pattern in entry.loc for pattern in url_filter):
+                    urls.append(entry.loc)
+        except (ET.ParseError, OSError, EOFError) as e:
+            logger.warning(f"Error parsing sitemap {sitemap_url}: {e}")
+            return sitemap_url, None, None
+        return sitemap_url, sitemaps, urls
+
+    def iter_urls(self, sitemap_url=None, since: datetime | None = None, url_filter=None):
+        """
+        Yields listing URLs from `sitemap_url` (a urlset or a sitemap index, nested to any
+        depth) that contain `url_filter` (a substring or a tuple of them). Both default
+        to the values given to the constructor.
+        """
+        sitemap_url = sitemap_url or self.sitemap_url
+        url_filter = url_filter or self.url_filter
+        if isinstance(url_filter, str):
+            url_filter = (url_filter,)
+        since = _as_utc(since)
+        self.failed = []
+        self.sitemaps_read = 0
+        queue = deque([sitemap_url])
+        seen_sitemaps = {sitemap_url}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sitemap') as executor:
+            in_flight = deque()
+            while queue or in_flight:
+                while queue and len(in_flight) < self.workers:
+                    in_flight.append(executor.submit(self._load, queue.popleft(), since, url_filter))
+
+                loaded_url, sitemaps, urls = in_flight.popleft().result()
+                if urls is None:
+                    self.failed.append(loaded_url)
+                    continue
+                self.sitemaps_read += 1
+
+                for loc in sitemaps:
+                    if loc not in seen_sitemaps:
+                        seen_sitemaps.add(loc)
+                        queue.append(loc)
+                yield from urls
 
     def get_listing_urls(self, sitemap_url, filter_url_pattern=None):
         """
@@ -26,23 +150,6 @@ class BaseSitemapFetcher:
         Handles both sitemap indexes (recursively) and standard urlsets.
         """
         print(f"Fetching sitemap: {sitemap_url}")
-        content = self.fetch(sitemap_url)
-        if not content:
-            return []
-            
-        urls = self._parse_xml(content)
-        
-        # Check if this is a sitemap index (ends with .xml but contains other sitemaps)
-        if urls and urls[0].endswith('.xml'):
-            print(f"Detected sitemap index with {len(urls)} sub-sitemaps.")
-            all_leaf_urls = []
-            for sub_sitemap in urls:
-                all_leaf_urls.extend(self.get_listing_urls(sub_sitemap, filter_url_pattern))
-            return all_leaf_urls
-            
-        # Standard URL set
-        if filter_url_pattern:
-            urls = [u for u in urls if filter_url_pattern in u]
-            
+        urls = list(self.iter_urls(sitemap_url, url_filter=filter_url_pattern))
         print(f"Found {len(urls)} valid URLs in {sitemap_url}")
         return urls
@@ -1,11 +1,12 @@
-from .network import fetch_html
+from .network import fetch_html, fetch_page, sitemap_fetcher
 from .parser import BonUaParser, get_listing_urls
+from app.services.structured_data import extract_structured
 
-def scrape_bon_ua_listing(url):
-    html = fetch_html(url)
-    if not html:
-        return None
-    parser = BonUaParser(html, url)
+
+def parse_listing_page(body, url, backend=None, targeted=True, fast_path=True):
+    # Fast path: JSON-LD/OpenGraph fields are read from the raw HTML before any soup is built
+    structured = extract_structured(body) if fast_path else None
+    parser = BonUaParser(body, url, backend=backend, targeted=targeted, structured=structured)
     return parser.parse()
 
-__all__ = ['fetch_html', 'BonUaParser', 'get_listing_urls', 'scrape_bon_ua_listing']
+__all__ = ['fetch_html', 'fetch_page', 'sitemap_fetcher', 'BonUaParser', 'get_listing_urls', 'parse_listing_page']
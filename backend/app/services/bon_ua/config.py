@@ -1,2 +1,7 @@
-BASE_URL = "https://bon.ua"
-LISTINGS_URL = "https://bon.ua/nedvizhimost/prodazha-kvartir"
+import os
+
+# Overridable so benchmarks can point the scraper at a local replay server
+BASE_URL = os.getenv('BON_UA_BASE_URL', "https://bon.ua")
+LISTINGS_URL = f"{BASE_URL}/nedvizhimost/prodazha-kvartir"
+SITEMAP_URL = os.getenv('BON_UA_SITEMAP_URL', f"{BASE_URL}/sitemap.xml")
+DETAIL_URL_PATTERN = '/obyavlenie/'
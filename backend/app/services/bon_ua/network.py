@@ -1,30 +1,67 @@
 import cloudscraper
-import time
+from .config import DETAIL_URL_PATTERN, SITEMAP_URL
+from app.services.base_sitemap import BaseSitemapFetcher
+from app.services.http_cache import FetchResult, conditional_headers
+from app.services.rate_limiter import rate_limiter, CircuitOpenError
 
-def fetch_html(url, retries=3, timeout=15):
+def fetch_page(url, validators=None, retries=3, timeout=15, raw=False):
+    """
+    Fetches a page through cloudscraper, rotating browser profiles between retries.
+    Sends conditional headers when validators are known; a 304 is returned as-is.
+    Pacing and backoff between retries come from the shared per-host rate limiter.
+    The body is decoded text, or the undecoded bytes with `raw`. A 404/410 is returned
+    at once; after failed retries (or an open circuit) the last failure is returned.
+    """
     configs = [
         {'browser': 'firefox', 'platform': 'linux', 'mobile': False},
         {'browser': 'firefox', 'platform': 'windows', 'mobile': False},
         {'browser': 'chrome', 'platform': 'windows', 'mobile': False},
         {'custom': 'ScraperBot/1.0'}
     ]
+    headers = conditional_headers(validators)
+    result = FetchResult(0, error='no attempts')
 
     for attempt in range(retries):
         try:
             cfg = configs[attempt % len(configs)]
             scraper = cloudscraper.create_scraper(browser=cfg)
-            response = scraper.get(url, timeout=timeout)
-            
-            if response.status_code == 200:
-                return response.text
-            elif response.status_code == 404:
-                print(f"[{attempt+1}/{retries}] 404 Not Found: {url}")
-                return None
+            with rate_limiter.slot(url) as slot:
+                response = scraper.get(url, timeout=timeout, headers=headers)
+                slot.record(response)
+
+            if response.status_code in (200, 304):
+                body = (response.content if raw else response.text) if response.status_code == 200 else None
+                return FetchResult.from_response(response, body=body)
+            elif response.status_code in (404, 410):
+                print(f"[{attempt+1}/{retries}] {response.status_code} Not Found: {url}")
+                return FetchResult(response.status_code)
             else:
                 print(f"[{attempt+1}/{retries}] Status {response.status_code} for {url}")
+                result = FetchResult(response.status_code)
+        except CircuitOpenError as e:
+            print(f"[{attempt+1}/{retries}] Skipping {url}: {e}")
+            return FetchResult(0, error=str(e))
         except Exception as e:
             print(f"[{attempt+1}/{retries}] Error fetching {url}: {e}")
-            
-        time.sleep(2 * (attempt + 1))
-        
+            result = FetchResult(0, error=str(e))
+
+    return result
+
+
+def fetch_html(url, retries=3, timeout=15):
+    page = fetch_page(url, retries=retries, timeout=timeout)
+    if page and page.ok:
+        return page.body
     return None
+
+
+def fetch_raw(url):
+    """Undecoded response body (e.g. a gzipped sitemap), or None."""
+    page = fetch_page(url, raw=True)
+    if page and page.ok:
+        return page.body
+    return None
+
+
+def sitemap_fetcher():
+    return BaseSitemapFetcher(fetch_raw, sitemap_url=SITEMAP_URL, url_filter=DETAIL_URL_PATTERN)
@@ -1,11 +1,15 @@
+import json
 import re
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
 from .network import fetch_html
 from .config import BASE_URL, LISTINGS_URL
+from app.services.html_backend import RegionFilter, class_tokens, make_soup
+from app.services.structured_data import StructuredListing, offer_price
 
 from app.services.cities import normalize_city
 from app.services.address_normalizer import AddressNormalizer
+from app.services import address_cascade
+from app.services.address_cascade import ListingText
 
 
 def get_listing_urls(page=1):
@@ -19,7 +23,7 @@ def get_listing_urls(page=1):
     if not html:
         return []
         
-    soup = BeautifulSoup(html, 'html.parser')
+    soup = make_soup(html, regions=_CATALOG_CARDS)
     cards = soup.select('div.msg-inner')
     
     urls = []
@@ -42,9 +46,48 @@ def get_listing_urls(page=1):
     return urls
 
 
+_CATALOG_CARDS = RegionFilter(lambda name, attrs: name == 'div' and 'msg-inner' in class_tokens(attrs))
+
+# Containers whose subtrees BonUaParser reads; everything else on the page is never built
+_LISTING_CONTAINERS = {'card-body', 'card-container', 'card-content-wrapper'}
+_IMAGE_CONTAINERS = {'gallery', 'slider', 'fotorama', 'item-image'}
+
+
+def _listing_regions(name, attrs):
+    if name == 'h1':
+        return True
+    if name == 'script':
+        return attrs.get('type') == 'application/ld+json'
+    if name == 'meta':
+        return attrs.get('property') == 'og:image'
+    if name == 'img' and 'data-src' in attrs:
+        return True
+    classes = class_tokens(attrs)
+    if classes & _LISTING_CONTAINERS or classes & _IMAGE_CONTAINERS:
+        return True
+    # Breadcrumbs are matched with [class*="bread"]
+    return 'bread' in ' '.join(classes)
+
+
+LISTING_REGIONS = RegionFilter(_listing_regions)
+# With structured data already read from the raw HTML, the JSON-LD and meta tags aren't needed again
+DOM_REGIONS = RegionFilter(lambda name, attrs: name not in ('script', 'meta') and _listing_regions(name, attrs))
+
+
 class BonUaParser:
-    def __init__(self, html, url):
-        self.soup = BeautifulSoup(html, 'html.parser')
+    def __init__(self, html, url, backend=None, targeted=True, structured: StructuredListing | None = None):
+        # `targeted` builds only the regions the getters below read (see _listing_regions);
+        # parse() output is identical to parsing the full document.
+        # `structured` holds JSON-LD/OpenGraph fields extracted beforehand (see
+        # structured_data.extract_structured); getters use them and only walk the DOM
+        # for the fields it lacks. The names of the fields it supplied are
+        # reported in parse()['structured_fields'].
+        self.structured = structured
+        self.structured_fields = set()
+        # Address cascade state for the pipeline (see address_cascade.finish)
+        self.cascade_state = None
+        regions = (DOM_REGIONS if structured else LISTING_REGIONS) if targeted else None
+        self.soup = make_soup(html, backend, regions=regions)
         self.url = url
 
         # On a bon.ua listing page the TRUE listing content lives in div.card-body.
@@ -82,6 +125,10 @@ class BonUaParser:
         price = 0.0
         currency = "UAH"
 
+        if self.structured and self.structured.price:
+            self.structured_fields.add('price')
+            return self.structured.price, self.structured.currency
+
         # Primary: div.card-price is the current listing's price, shown outside msg-inner
         scope = self.main_section or self.soup
         price_el = scope.select_one('div.card-price')
@@ -100,35 +147,34 @@ class BonUaParser:
                         currency = "EUR"
                     return price, currency
 
-        # JSON-LD structured data fallback (reliable and not scoped to msg-inner)
-        import json
-        for script in self.soup.find_all('script', type='application/ld+json'):
-            try:
-                data = json.loads(script.string or '')
-                offers = data.get('offers', {})
-                if isinstance(offers, list):
-                    offers = offers[0] if offers else {}
-                if offers and 'price' in offers:
-                    price = float(str(offers['price']).replace(' ', ''))
-                    curr = offers.get('priceCurrency', 'UAH').upper()
-                    currency = curr if curr in ('USD', 'EUR', 'UAH') else 'UAH'
-                    if price > 0:
-                        return price, currency
-            except Exception:
-                pass
+        # JSON-LD structured data fallback (reliable and not scoped to msg-inner).
+        # Already tried on the raw HTML when the parser was given structured data.
+        if self.structured is None:
+            for script in self.soup.find_all('script', type='application/ld+json'):
+                try:
+                    found = offer_price(json.loads(script.string or ''))
+                except ValueError:
+                    continue
+                if found:
+                    return found
 
         return price, currency
 
     def get_specs(self):
-        rooms = None
-        area = None
+        rooms = self.structured.rooms if self.structured else None
+        area = self.structured.area if self.structured else None
+        if rooms:
+            self.structured_fields.add('rooms')
+        if area:
+            self.structured_fields.add('area')
 
         # Verbal replacements for rooms
         verbal = {'одно': 1, 'дво': 2, 'три': 3, 'чотири': 4, "п'яти": 5, 'шести': 6}
-        for k, v in verbal.items():
-            if f'{k}кімнатн' in self.title.lower() or f'{k}комнатн' in self.title.lower():
-                rooms = v
-                break
+        if not rooms:
+            for k, v in verbal.items():
+                if f'{k}кімнатн' in self.title.lower() or f'{k}комнатн' in self.title.lower():
+                    rooms = v
+                    break
 
         if not rooms:
             m = re.search(
@@ -159,16 +205,17 @@ class BonUaParser:
                             rooms = candidate
                         break
 
-        for li in scope.select('li, table tr'):
-            text = li.get_text(" ", strip=True)
-            if 'Загальна площа' in text or 'Площа' in text:
-                m = re.search(r'(\d+(?:[\.,]\d+)?)', text.replace('Загальна площа', '').replace('Площа', ''))
-                if m:
-                    try:
-                        area = float(m.group(1).replace(',', '.'))
-                        break
-                    except ValueError:
-                        pass
+        if not area:
+            for li in scope.select('li, table tr'):
+                text = li.get_text(" ", strip=True)
+                if 'Загальна площа' in text or 'Площа' in text:
+                    m = re.search(r'(\d+(?:[\.,]\d+)?)', text.replace('Загальна площа', '').replace('Площа', ''))
+                    if m:
+                        try:
+                            area = float(m.group(1).replace(',', '.'))
+                            break
+                        except ValueError:
+                            pass
 
         if not area:
             area_match = re.search(r'(\d+(?:[\.,]\d+)?)\s*(?:кв\.?м|м2)', self.page_text, re.IGNORECASE)
@@ -210,20 +257,36 @@ class BonUaParser:
             if normalized and not city:
                 city = normalized
 
+        if not city and self.structured and self.structured.locality:
+            city = normalize_city(self.structured.locality)
+
         # Try to pull from text if breadcrumbs fail
         if not city:
             for word in self.title.split():
-                normalized = normalize_city(word.strip('.,!?-'))
+                normalized = normalize_city(word.strip('.,!?-'), settlements=False)
                 if normalized:
                     city = normalized
                     break
 
-        # Only scan the title for address — scanning full page_text causes false positives
-        # (e.g., "Загальна площа: 72 м²" parsed as a street address)
-        if not address:
-            cleaned_title = re.sub(r'(Продажа|Продам).*?(квартиры|квартиру)', '', self.title, flags=re.IGNORECASE)
-            address = AddressNormalizer.extract_from_text(cleaned_title)
-            
+        structured_address = None
+        if self.structured and self.structured.street_address:
+            structured_address = (AddressNormalizer.extract_from_text(self.structured.street_address)
+                                  or self.structured.street_address)
+
+        # Only the title is scanned for the regex tier — scanning full page_text causes false
+        # positives (e.g., "Загальна площа: 72 м²" parsed as a street address); the page text
+        # is still there as context should the pipeline go on to the LLM
+        cleaned_title = re.sub(r'(Продажа|Продам).*?(квартиры|квартиру)', '', self.title, flags=re.IGNORECASE)
+        best, self.cascade_state = address_cascade.extract(ListingText(
+            title=cleaned_title, description=self.page_text, breadcrumbs=' / '.join(crumbs_text),
+            city=city, district=district, region=region,
+            structured_address=structured_address, scan_description=False,
+        ))
+        if best:
+            address = best.address
+            if best.tier == 'structured':
+                self.structured_fields.add('address')
+
         if city and address and city not in address:
             address = f"{city}, {address}"
         elif city and not address:
@@ -234,12 +297,16 @@ class BonUaParser:
     def get_images(self):
         seen = set()
         images = []
-        # Usually properties have main images in class="fotorama" or data-fancybox
-        img_tags = self.soup.select('.gallery img, .slider img, .fotorama img, .item-image img, img[data-src]')
-        
-        for img in img_tags:
-            src = img.get('src') or img.get('data-src') or img.get('data-newsrc')
-            if not src: 
+        if self.structured and self.structured.images:
+            sources = self.structured.images
+            self.structured_fields.add('images')
+        else:
+            # Usually properties have main images in class="fotorama" or data-fancybox
+            img_tags = self.soup.select('.gallery img, .slider img, .fotorama img, .item-image img, img[data-src]')
+            sources = [img.get('src') or img.get('data-src') or img.get('data-newsrc') for img in img_tags]
+
+        for src in sources:
+            if not src:
                 continue
             
             # Skip tiny icons
@@ -253,9 +320,13 @@ class BonUaParser:
                 
         # If no images found, try og:image
         if not images:
-            og_img = self.soup.find('meta', property='og:image')
-            if og_img and og_img.get('content'):
-                images.append(urljoin(self.url, og_img.get('content')))
+            if self.structured:
+                og_content = self.structured.og_image
+            else:
+                og_img = self.soup.find('meta', property='og:image')
+                og_content = og_img.get('content') if og_img else None
+            if og_content:
+                images.append(urljoin(self.url, og_content))
 
         return images
 
@@ -282,5 +353,7 @@ class BonUaParser:
             "region": region,
             "area": area,
             "rooms": rooms,
-            "images": images
+            "images": images,
+            **({"structured_fields": sorted(self.structured_fields)} if self.structured else {}),
+            **({"address_cascade": self.cascade_state} if self.cascade_state else {}),
         }
@@ -0,0 +1,38 @@
+def iter_catalog(get_listing_urls, max_pages, known_filter=None, full=False):
+    """
+    Walks catalog index pages 1..max_pages and yields listing URLs as each page arrives,
+    so detail scraping can start while discovery is still running.
+
+    In incremental mode (`full=False`) paging stops at the first page that yields
+    no unseen URLs. A URL is unseen if it was not collected earlier in this run and
+    `known_filter(urls)` (returns the subset already stored) does not report it.
+    Catalogs are sorted newest first, so everything past that page is already known.
+    An empty page (end of catalog or failed fetch) also ends an incremental crawl;
+    a full crawl skips it and keeps going. Request pacing is left to the fetcher's
+    per-host rate limiter.
+    """
+    seen = set()
+
+    for page in range(1, max_pages + 1):
+        print(f"[CRAWLER] Page {page}...")
+        urls = get_listing_urls(page=page) or []
+        if not urls and not full:
+            print(f"[CRAWLER] Page {page} is empty, stopping.")
+            break
+
+        fresh = [u for u in urls if u not in seen]
+        seen.update(fresh)
+
+        # Check before yielding: downstream stages may store these URLs concurrently
+        unseen = fresh
+        if not full:
+            known = known_filter(fresh) if known_filter and fresh else set()
+            unseen = [u for u in fresh if u not in known]
+            print(f"[CRAWLER] Page {page}: {len(urls)} links, {len(unseen)} unseen")
+
+        yield from fresh
+
+        if not full and not unseen:
+            print(f"[CRAWLER] No new listings on page {page}, stopping incremental crawl.")
+            break
+
@@ -1,3 +1,10 @@
+from functools import lru_cache
+
+from app.services.fuzzy import FuzzyMatch, TrigramIndex, fold
+from app.services.settlements import open_settlements
+
+# Major cities, always available. Smaller settlements come from the lazily loaded
+# settlements data file (see settlements.py and `flask load-settlements`).
 CITIES = {
     'Київ': {
         'lat': 50.4501, 'lng': 30.5234,
@@ -147,22 +154,79 @@ for canonical, info in CITIES.items():
         _CENTER_MAP[alias] = center
 
 
-def normalize_city(name: str) -> str | None:
+# Lowest FuzzyMatch.score normalize_city accepts: one edit in a four-letter name ("Kiyv")
+MIN_CITY_SCORE = 0.75
+
+_FUZZY_CITIES = TrigramIndex(_ALIAS_MAP)
+
+_VOWELS = set('аеиіоуюяї')
+
+
+@lru_cache(maxsize=4096)
+def match_city(name: str) -> FuzzyMatch | None:
+    """
+    Closest major city to a misspelt or transliterated name ("Kiyv", "Днепропетровськ"),
+    with its edit distance and a 0..1 confidence score; None if nothing is close.
+    """
+    return _FUZZY_CITIES.lookup(name)
+
+
+def _derived_name(name: str, matched: str) -> bool:
+    """
+    Whether `name` is `matched` (less a final vowel) with letters added that include a
+    vowel: a place named after the city ("Полтавка", "Херсонес"), not a misspelling.
+    """
+    name, matched = fold(name), fold(matched)
+    stem = matched[:-1] if matched[-1:] in _VOWELS else matched
+    return len(name) > len(matched) and name.startswith(stem) and bool(_VOWELS & set(name[len(matched):]))
+
+
+def normalize_city(name: str, settlements: bool = True, fuzzy: bool = False) -> str | None:
+    """
+    Canonical (Ukrainian) name of a city or, with `settlements`, of any settlement in
+    the settlements data. Pass settlements=False when guessing from free text, where
+    ordinary words can be village names.
+
+    With `fuzzy` (and `settlements`), a name found nowhere is matched to a major city
+    within a few typos ("Kiyv"). Use it only for the city part of a typed address:
+    elsewhere an unknown village would be turned into the city it resembles.
+    """
     if not name:
         return None
-    return _ALIAS_MAP.get(name.strip().lower())
+    canonical = _ALIAS_MAP.get(name.strip().lower())
+    if canonical or not settlements:
+        return canonical
+    index = open_settlements()
+    canonical = index.canonical_name(name) if index else None
+    if canonical:
+        return canonical
+    if not fuzzy:
+        return None
+    match = match_city(name.strip())
+    if not match or match.score < MIN_CITY_SCORE or _derived_name(name.strip(), match.matched):
+        return None
+    return match.value
 
 
-def get_center(name: str) -> tuple[float, float] | None:
+def get_center(name: str, region: str | None = None) -> tuple[float, float] | None:
+    """
+    Coordinates of a city or settlement. A name shared by several settlements is
+    only resolved when `region` tells them apart.
+    """
     if not name:
         return None
-    canonical = normalize_city(name)
+    canonical = _ALIAS_MAP.get(name.strip().lower())
     if canonical:
         return _CENTER_MAP.get(canonical)
-    return _CENTER_MAP.get(name)
+    if name in _CENTER_MAP:
+        return _CENTER_MAP[name]
+    index = open_settlements()
+    settlement = index.resolve(name, region) if index else None
+    return (settlement.lat, settlement.lng) if settlement else None
 
 
 def get_all_aliases() -> dict[str, str]:
+    """Aliases of the major cities only; AddressNormalizer compiles these into its translations."""
     return dict(_ALIAS_MAP)
 
 
@@ -185,9 +249,15 @@ _REGION_MAP = _build_region_map()
 
 
 def get_region_center(region_name: str) -> tuple[tuple[float, float], str] | None:
+    """((lat, lng), city) for an oblast: its most populous settlement, or a major city matched by name prefix."""
     if not region_name:
         return None
 
+    index = open_settlements()
+    settlement = index.region_center(region_name) if index else None
+    if settlement:
+        return (settlement.lat, settlement.lng), settlement.name
+
     cleaned = region_name.lower().replace('область', '').strip()
     for suffix in _REGION_SUFFIXES:
         if cleaned.endswith(suffix):
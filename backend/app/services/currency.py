@@ -1,69 +1,275 @@
-import requests
-from cachetools import TTLCache, cached
 import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import requests
+from flask import current_app, has_app_context
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased
+
+from app import db
+from app.models import ExchangeRate, Property
 
 logger = logging.getLogger(__name__)
 
-# Cache exchange rates for 12 hours (43200 seconds)
-# NBU updates rates once a day.
-rates_cache = TTLCache(maxsize=1, ttl=43200)
+NBU_RATES_URL = os.getenv('NBU_RATES_URL', "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?json")
 
-@cached(cache=rates_cache)
-def get_nbu_rates() -> dict:
+CURRENCIES = ('USD', 'EUR')
+# NBU updates rates once a day. Older rates are still served, but refreshed in the background.
+REFRESH_AFTER = timedelta(hours=12)
+# After a failed refresh, how long to keep serving the last known rates before asking NBU again
+RETRY_AFTER = timedelta(minutes=10)
+# Only used while no real rate has ever been stored (a new database and NBU down)
+FALLBACK_RATES = {'USD': 41.0, 'EUR': 44.0}
+
+_rates = None               # {'USD': 41.5, 'EUR': 44.2}, the rates in use
+_as_of = None               # the NBU date of those rates
+_next_check = None          # when to ask NBU again
+_refresh_thread = None
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+
+
+def fetch_nbu_rates() -> tuple[dict, date]:
+    """The current official rates from the National Bank of Ukraine and the date they are set for. Raises on failure."""
+    response = requests.get(NBU_RATES_URL, timeout=10)
+    response.raise_for_status()
+    rates = {}
+    rate_date = None
+    for item in response.json():
+        if item.get('cc') in CURRENCIES:
+            rates[item['cc']] = float(item['rate'])
+            if item.get('exchangedate'):
+                rate_date = datetime.strptime(item['exchangedate'], '%d.%m.%Y').date()
+    if not rates:
+        raise ValueError("NBU API returned none of " + ', '.join(CURRENCIES))
+    return rates, rate_date or date.today()
+
+
+def _load_latest():
+    """(rates, rate date, fetched_at) from the newest stored rate of each currency, or None."""
+    if not has_app_context():
+        return None
+    try:
+        with Session(db.engine) as session:
+            rows = [session.execute(
+                select(ExchangeRate).where(ExchangeRate.currency == cc)
+                .order_by(ExchangeRate.rate_date.desc(), ExchangeRate.fetched_at.desc()).limit(1)
+            ).scalar_one_or_none() for cc in CURRENCIES]
+    except SQLAlchemyError as e:
+        logger.error(f"Failed to read stored exchange rates: {e}")
+        return None
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return None
+    return ({row.currency: row.rate for row in rows}, max(row.rate_date for row in rows),
+            min(row.fetched_at for row in rows))
+
+
+def _store(rates, rate_date):
+    if not has_app_context():
+        return
+    now = datetime.utcnow()
+    try:
+        with Session(db.engine) as session:
+            for cc, rate in rates.items():
+                row = session.execute(
+                    select(ExchangeRate).where(ExchangeRate.currency == cc, ExchangeRate.rate_date == rate_date)
+                ).scalar_one_or_none()
+                row = row or ExchangeRate(currency=cc, rate_date=rate_date)
+                row.rate = rate
+                row.fetched_at = now
+                session.add(row)
+            session.commit()
+    except SQLAlchemyError:
+        # Another process stored the same day's rates concurrently
+        pass
+
+
+def _with_fallbacks(rates) -> dict:
+    for cc in CURRENCIES:
+        if cc not in rates:
+            logger.warning(f"No {cc} rate known yet. Using fallback {FALLBACK_RATES[cc]}.")
+            rates[cc] = FALLBACK_RATES[cc]
+    return rates
+
+
+def refresh_rates() -> dict:
     """
-    Fetches official exchange rates from the National Bank of Ukraine.
-    Returns a dictionary of currency code to UAH rate.
-    Example: {'USD': 41.5, 'EUR': 44.2}
+    Asks NBU for today's rates and stores them. If NBU fails, the last known rates stay
+    in use (read from the exchange_rates table if this process has none yet) and NBU is
+    asked again after RETRY_AFTER. Returns the rates in use.
     """
+    global _rates, _as_of, _next_check
     try:
-        url = "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?json"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        rates = {}
-        for item in data:
-            if item.get('cc') in ['USD', 'EUR']:
-                rates[item['cc']] = item['rate']
-        
-        if 'USD' not in rates:
-            logger.warning("NBU API did not return USD rate. Using fallback.")
-            rates['USD'] = 41.0
-            
-        if 'EUR' not in rates:
-            logger.warning("NBU API did not return EUR rate. Using fallback.")
-            rates['EUR'] = 44.0
-            
-        return rates
+        fetched, rate_date = fetch_nbu_rates()
     except Exception as e:
-        logger.error(f"Failed to fetch NBU rates: {e}")
-        # Fallback rates in case NBU API is down
-        return {'USD': 41.0, 'EUR': 44.0}
+        loaded = _load_latest() if _rates is None else None
+        with _lock:
+            if loaded and _rates is None:
+                _rates, _as_of = loaded[0], loaded[1]
+            _rates = _with_fallbacks(dict(_rates or {}))
+            _next_check = datetime.utcnow() + RETRY_AFTER
+            logger.error(f"Failed to fetch NBU rates: {e}. Using rates of {_as_of or 'fallback'}.")
+            return _rates
 
+    _store(fetched, rate_date)
+    with _lock:
+        # A currency missing from the answer keeps its last known rate
+        _rates = _with_fallbacks({**(_rates or {}), **fetched})
+        _as_of = rate_date
+        _next_check = datetime.utcnow() + REFRESH_AFTER
+        return _rates
 
-def convert_to_usd(price: float, currency: str) -> float:
+
+def _refresh_in_background():
+    global _refresh_thread
+    app = current_app._get_current_object() if has_app_context() else None
+
+    def refresh():
+        if app is None:
+            refresh_rates()
+            return
+        with app.app_context():
+            refresh_rates()
+
+    with _lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return
+        _refresh_thread = threading.Thread(target=refresh, name='nbu-rates', daemon=True)
+        _refresh_thread.start()
+
+
+def _current() -> tuple[dict, date | None]:
+    """The rates in use and their NBU date (None on the fallback rates); see get_nbu_rates."""
+    global _rates, _as_of, _next_check
+    if _rates is None:
+        with _load_lock:
+            if _rates is None:
+                loaded = _load_latest()
+                if loaded is None:
+                    refresh_rates()
+                else:
+                    with _lock:
+                        _rates, _as_of = _with_fallbacks(loaded[0]), loaded[1]
+                        _next_check = loaded[2] + REFRESH_AFTER
+    if datetime.utcnow() >= _next_check:
+        _refresh_in_background()
+    with _lock:
+        return _rates, _as_of
+
+
+def get_nbu_rates() -> dict:
     """
-    Converts a given price in a given currency (UAH, EUR, USD) to USD
-    using the latest official NBU exchange rates.
+    Official exchange rates from the National Bank of Ukraine, as a dictionary of
+    currency code to UAH rate. Example: {'USD': 41.5, 'EUR': 44.2}
+
+    Stale-while-revalidate: the rates in memory, or else the newest ones stored in the
+    exchange_rates table, are returned at once; when they are older than REFRESH_AFTER
+    a background thread fetches new ones. NBU is only waited for when no rate has ever
+    been stored.
+    """
+    return dict(_current()[0])
+
+
+def reset():
+    """Forgets the rates held in memory (the stored ones stay); the next lookup starts cold."""
+    global _rates, _as_of, _next_check
+    with _lock:
+        _rates = _as_of = _next_check = None
+
+
+def to_usd(price: float, currency: str) -> tuple[float, date | None]:
+    """
+    convert_to_usd() and the NBU date of the rate it used: None for USD prices, and for
+    conversions at the fallback rates.
     """
     if not price or price <= 0:
-        return 0.0
-        
+        return 0.0, None
+
     currency = currency.upper().strip()
     if currency == 'USD':
-        return float(price)
-        
-    rates = get_nbu_rates()
+        return float(price), None
+
+    rates, as_of = _current()
     usd_rate = rates['USD']
-    
+
     if currency == 'UAH':
-        return float(price / usd_rate)
+        return float(price / usd_rate), as_of
     elif currency == 'EUR':
         # Convert EUR -> UAH -> USD
         eur_rate = rates['EUR']
         uah_value = price * eur_rate
-        return float(uah_value / usd_rate)
+        return float(uah_value / usd_rate), as_of
     else:
         # Unknown currency, assume UAH fallback or just return as is
         logger.warning(f"Unknown currency '{currency}', assuming UAH for conversion fallback.")
-        return float(price / usd_rate)
+        return float(price / usd_rate), as_of
+
+
+def convert_to_usd(price: float, currency: str) -> float:
+    """
+    Converts a given price in a given currency (UAH, EUR, USD) to USD
+    using the latest official NBU exchange rates.
+    """
+    return to_usd(price, currency)[0]
+
+
+def reconvert_prices(latest=False) -> dict:
+    """
+    Recomputes the USD price of every non-USD listing from its original price and the
+    stored NBU rates, in a few set-based UPDATEs joined to exchange_rates on the rate
+    date. Listings converted before the original was kept get it copied from price first.
+    A listing without an fx_rate_date gets the newest rate date on or before the day it
+    was first scraped (the oldest stored one for older listings); `latest` re-dates all
+    of them to the newest stored rates. With the dates kept, a re-run gives the same
+    prices. Works in the caller's session and commits.
+    """
+    get_nbu_rates()                     # stores today's rates if none are stored yet
+    result = {}
+
+    result['backfilled'] = db.session.execute(
+        update(Property)
+        .where(Property.price_original.is_(None), Property.currency != 'USD', Property.price > 0)
+        .values(price_original=Property.price, currency_original=Property.currency)
+    ).rowcount
+
+    usd_dates = select(ExchangeRate.rate_date).where(ExchangeRate.currency == 'USD')
+    if latest:
+        rate_date = usd_dates.with_only_columns(func.max(ExchangeRate.rate_date)).scalar_subquery()
+    else:
+        on_or_before = (usd_dates.with_only_columns(func.max(ExchangeRate.rate_date))
+                        .where(ExchangeRate.rate_date <= func.date(Property.created_at)).scalar_subquery())
+        rate_date = func.coalesce(on_or_before,
+                                  usd_dates.with_only_columns(func.min(ExchangeRate.rate_date)).scalar_subquery())
+    foreign = Property.currency_original.isnot(None) & (Property.currency_original != 'USD')
+    undated = update(Property).where(foreign)
+    if not latest:
+        undated = undated.where(Property.fx_rate_date.is_(None))
+    result['dated'] = db.session.execute(undated.values(fx_rate_date=rate_date)).rowcount
+
+    # One UPDATE ... FROM per source currency; UAH (and unknown codes, as in to_usd) need only the USD rate
+    usd = aliased(ExchangeRate)
+    joined = (usd.currency == 'USD', usd.rate_date == Property.fx_rate_date, Property.price_original > 0)
+    converted = db.session.execute(
+        update(Property)
+        .where(foreign, Property.currency_original.notin_(CURRENCIES), *joined)
+        .values(price=Property.price_original / usd.rate, currency='USD')
+    ).rowcount
+    for cc in CURRENCIES:
+        if cc == 'USD':
+            continue
+        source = aliased(ExchangeRate)
+        converted += db.session.execute(
+            update(Property)
+            .where(Property.currency_original == cc, source.currency == cc,
+                   source.rate_date == Property.fx_rate_date, *joined)
+            .values(price=Property.price_original * source.rate / usd.rate, currency='USD')
+        ).rowcount
+    result['converted'] = converted
+    db.session.commit()
+
+    result['unconverted'] = Property.query.filter(Property.currency != 'USD', Property.price > 0).count()
+    return result
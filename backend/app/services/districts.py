@@ -0,0 +1,142 @@
+import json
+import math
+import os
+import threading
+from typing import NamedTuple
+
+from flask import current_app, has_app_context
+
+DEFAULT_CELL_DEGREES = 0.01        # ~1.1 km north-south, ~0.7 km east-west at Ukrainian latitudes
+
+NAME_PROPERTIES = ('name:uk', 'name', 'district')
+
+
+class District(NamedTuple):
+    name: str
+    city: str | None
+    polygons: list          # [[outer ring, *holes], ...]; a ring is a list of (lng, lat)
+    bbox: tuple             # (min_lng, min_lat, max_lng, max_lat)
+
+
+def _point_in_ring(lng, lat, ring) -> bool:
+    """Even-odd ray casting."""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _point_in_polygon(lng, lat, polygon) -> bool:
+    outer, *holes = polygon
+    return _point_in_ring(lng, lat, outer) and not any(_point_in_ring(lng, lat, hole) for hole in holes)
+
+
+def _district_from_feature(feature) -> District | None:
+    props = feature.get('properties') or {}
+    geometry = feature.get('geometry') or {}
+    name = next((props[key] for key in NAME_PROPERTIES if props.get(key)), None)
+    if not name:
+        return None
+    if geometry.get('type') == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry.get('type') == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return None
+    polygons = [[[(float(p[0]), float(p[1])) for p in ring] for ring in polygon] for polygon in polygons if polygon]
+    if not polygons:
+        return None
+    lngs = [p[0] for polygon in polygons for p in polygon[0]]
+    lats = [p[1] for polygon in polygons for p in polygon[0]]
+    return District(name, props.get('city'), polygons, (min(lngs), min(lats), max(lngs), max(lats)))
+
+
+class DistrictIndex:
+    """
+    Point-in-polygon lookup over district boundaries. A uniform grid maps each cell to
+    the districts whose bounding box overlaps it, so a lookup only ray-casts against
+    the one or two polygons near the point instead of every district.
+    """
+
+    def __init__(self, districts, cell=DEFAULT_CELL_DEGREES):
+        self.districts = list(districts)
+        self.cell = cell
+        self._grid = {}
+        for index, district in enumerate(self.districts):
+            min_lng, min_lat, max_lng, max_lat = district.bbox
+            for x in range(self._cell(min_lng), self._cell(max_lng) + 1):
+                for y in range(self._cell(min_lat), self._cell(max_lat) + 1):
+                    self._grid.setdefault((x, y), []).append(index)
+
+    @classmethod
+    def from_geojson(cls, path, cell=DEFAULT_CELL_DEGREES):
+        """Loads a FeatureCollection of (Multi)Polygons named by a name:uk, name or district property."""
+        with open(path, encoding='utf-8') as f:
+            collection = json.load(f)
+        districts = (_district_from_feature(feature) for feature in collection.get('features', []))
+        return cls([d for d in districts if d], cell)
+
+    def _cell(self, degrees) -> int:
+        return math.floor(degrees / self.cell)
+
+    def lookup(self, lat, lng) -> District | None:
+        if lat is None or lng is None:
+            return None
+        for index in self._grid.get((self._cell(lng), self._cell(lat)), ()):
+            district = self.districts[index]
+            min_lng, min_lat, max_lng, max_lat = district.bbox
+            if not (min_lng <= lng <= max_lng and min_lat <= lat <= max_lat):
+                continue
+            if any(_point_in_polygon(lng, lat, polygon) for polygon in district.polygons):
+                return district
+        return None
+
+    def __len__(self):
+        return len(self.districts)
+
+
+# Only these geocodes place a listing inside a district; a 'city' fallback is the
+# city's (or oblast's) centre, which says nothing about where the listing is
+DISTRICT_PRECISIONS = ('exact', 'street')
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def open_districts(path) -> DistrictIndex | None:
+    """Process-wide index for the GeoJSON at `path`; None when disabled (empty path) or missing."""
+    if not path or not os.path.exists(path):
+        return None
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = DistrictIndex.from_geojson(path)
+        return _indexes[path]
+
+
+def _current_index() -> DistrictIndex | None:
+    if not has_app_context():
+        return None
+    return open_districts(current_app.config.get('DISTRICTS_PATH'))
+
+
+def assign_district(prop, overwrite=False) -> bool:
+    """
+    Fills `prop.district` from its coordinates, if they are precise enough (see
+    DISTRICT_PRECISIONS). A district taken from the listing itself is kept unless
+    `overwrite`. Returns True if the district changed.
+    """
+    if prop.district and not overwrite:
+        return False
+    if prop.geocode_precision not in DISTRICT_PRECISIONS:
+        return False
+    index = _current_index()
+    district = index.lookup(prop.latitude, prop.longitude) if index else None
+    if district is None or district.name == prop.district:
+        return False
+    prop.district = district.name
+    return True
@@ -0,0 +1,119 @@
+from collections import Counter
+from typing import NamedTuple
+
+# RU/UA spelling variants folded together before matching: "Днепропетровськ" ~ "Днепропетровск"
+_FOLD = str.maketrans({
+    'ё': 'е', 'є': 'е', 'э': 'е', 'ї': 'і', 'ы': 'и', 'ґ': 'г', 'ъ': None,
+    "'": None, '’': None, 'ʼ': None, '`': None, '-': ' ',
+})
+
+MAX_CANDIDATES = 64
+
+
+class FuzzyMatch(NamedTuple):
+    value: str          # what the matched name maps to (e.g. the canonical city)
+    matched: str        # the indexed name that was matched
+    distance: int
+    score: float        # 1.0 for an exact match, lower per edit relative to the name's length
+
+
+def fold(text) -> str:
+    return ' '.join((text or '').lower().translate(_FOLD).split())
+
+
+def trigrams(text) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance(length) -> int:
+    """Edits allowed for a name of `length` characters: none for very short names."""
+    if length < 4:
+        return 0
+    if length <= 6:
+        return 1
+    if length <= 12:
+        return 2
+    return 3
+
+
+def bounded_distance(a, b, limit) -> int | None:
+    """Optimal string alignment distance (adjacent transpositions count as one edit), or None above `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > limit:
+            return None
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else None
+
+
+class TrigramIndex:
+    """
+    Approximate lookup over a fixed set of names. Candidates are the names sharing
+    the most padded trigrams with the query; each is then checked with a bounded edit
+    distance, allowing more edits for longer names (see max_distance). The first
+    letter must match, which rules out most false positives among short names.
+    """
+
+    def __init__(self, names):
+        """`names` maps each name (e.g. an alias) to the value a match returns (e.g. the canonical name)."""
+        self._keys = []
+        self._values = []
+        self._exact = {}
+        self._postings = {}
+        self._first_letters = set()
+        for name, value in names.items():
+            key = fold(name)
+            if not key or key in self._exact:
+                continue
+            self._exact[key] = len(self._keys)
+            self._first_letters.add(key[0])
+            for gram in trigrams(key):
+                self._postings.setdefault(gram, []).append(len(self._keys))
+            self._keys.append(key)
+            self._values.append(value)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def lookup(self, name, min_score=0.0) -> FuzzyMatch | None:
+        """Closest indexed name within the allowed edit distance, or None."""
+        query = fold(name)
+        if not query:
+            return None
+        if query in self._exact:
+            i = self._exact[query]
+            return FuzzyMatch(self._values[i], self._keys[i], 0, 1.0)
+        limit = max_distance(len(query))
+        if not limit or query[0] not in self._first_letters:
+            return None
+
+        overlap = Counter()
+        for gram in trigrams(query):
+            overlap.update(self._postings.get(gram, ()))
+        best = None
+        for i, _ in overlap.most_common(MAX_CANDIDATES):
+            key = self._keys[i]
+            if key[0] != query[0]:
+                continue
+            distance = bounded_distance(query, key, best.distance - 1 if best else limit)
+            if distance is None:
+                continue
+            score = 1 - distance / max(len(query), len(key))
+            best = FuzzyMatch(self._values[i], key, distance, round(score, 3))
+            if distance == 1:
+                break
+        if best is None or best.score < min_score:
+            return None
+        return best
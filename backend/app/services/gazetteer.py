@@ -0,0 +1,254 @@
+import csv
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+
+from app.services.address_normalizer import AddressNormalizer
+from app.services.cities import normalize_city
+
+_SCHEMA = """
+CREATE TABLE streets (
+    id INTEGER PRIMARY KEY,
+    city TEXT NOT NULL,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    token_key TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL
+);
+CREATE TABLE houses (
+    street_id INTEGER NOT NULL REFERENCES streets (id),
+    number TEXT NOT NULL,
+    lat REAL NOT NULL,
+    lng REAL NOT NULL,
+    PRIMARY KEY (street_id, number)
+) WITHOUT ROWID;
+"""
+# Created after the bulk insert, which is faster than maintaining them row by row
+_INDEXES = """
+CREATE INDEX ix_streets_city_key ON streets (city, key);
+CREATE INDEX ix_streets_city_token_key ON streets (city, token_key);
+"""
+
+# Street type words, dropped from lookup keys so "вул. Хрещатик" and "Хрещатик вулиця" meet
+STREET_TYPES = {
+    'вулиця', 'вул', 'улица', 'ул', 'проспект', 'просп', 'пр-т', 'пр', 'провулок', 'пров', 'переулок', 'пер',
+    'бульвар', 'бульв', 'б-р', 'узвіз', 'спуск', 'набережна', 'наб', 'набережная', 'шосе', 'шоссе',
+    'майдан', 'площа', 'пл', 'площадь', 'тупик', 'алея', 'аллея', 'проїзд', 'проезд',
+}
+_APOSTROPHES = re.compile(r"[ʼ’`']")
+_PUNCT = re.compile(r'[^\w\s\'-]')
+_HOUSE_PREFIX = re.compile(r'^(?:буд|будинок|д|дом)\.?\s*')
+_LATIN_LETTERS = str.maketrans({'a': 'а', 'b': 'б', 'v': 'в', 'g': 'г', 'd': 'д', 'e': 'е'})
+_STREET_AND_HOUSE = re.compile(r'^(?P<street>.*?)[\s,]+(?P<house>(?:буд\.?|д\.)?\s*\d+\s?[а-яіїєґa-z]?(?:[/-]\d+[а-яіїєґa-z]?)?)$',
+                               re.IGNORECASE)
+
+CSV_COLUMNS = {
+    'city': ('addr:city', 'city'),
+    'street': ('addr:street', 'street'),
+    'housenumber': ('addr:housenumber', 'housenumber', 'house'),
+    'lat': ('lat', 'latitude', 'y'),
+    'lng': ('lon', 'lng', 'longitude', 'x'),
+}
+
+
+def street_tokens(name) -> list[str]:
+    """Lower-cased words of a street name without punctuation or street type words."""
+    text = _APOSTROPHES.sub("'", (name or '').lower()).replace('ё', 'е')
+    text = _PUNCT.sub(' ', text)
+    return [t for t in text.split() if t not in STREET_TYPES]
+
+
+def street_key(name) -> str:
+    return ' '.join(street_tokens(name))
+
+
+def token_key(name) -> str:
+    """Order-insensitive key: "Шевченка Тараса" and "Тараса Шевченка" share it."""
+    return ' '.join(sorted(street_tokens(name)))
+
+
+def normalize_house(number) -> str:
+    """'буд. 12 А' -> '12а', '45a' (Latin) -> '45а'."""
+    text = _HOUSE_PREFIX.sub('', (number or '').strip().lower())
+    return text.replace(' ', '').translate(_LATIN_LETTERS)
+
+
+def split_address(candidate) -> tuple[str, str, str | None] | None:
+    """'Київ, вулиця Хрещатик, 1' -> ('Київ', 'вулиця Хрещатик', '1'); None without a street part."""
+    parts = [p.strip() for p in candidate.split(',') if p.strip()]
+    if len(parts) < 2:
+        return None
+    city = normalize_city(parts[0], fuzzy=True) or parts[0]
+    rest = ' '.join(parts[1:])
+    match = _STREET_AND_HOUSE.match(rest)
+    if match:
+        return city, match.group('street'), normalize_house(match.group('house'))
+    return city, rest, None
+
+
+def _column(header, field):
+    for name in CSV_COLUMNS[field]:
+        if name in header:
+            return name
+    raise ValueError(f"CSV has no column for {field} (expected one of {', '.join(CSV_COLUMNS[field])})")
+
+
+def load_csv(csv_paths, db_path) -> dict:
+    """
+    Builds a gazetteer file at `db_path` from address CSVs (e.g. an OSM addr:* export
+    with addr:city, addr:street, addr:housenumber, lat, lon). A street's point is the
+    mean of its addresses. The file is built aside and swapped in atomically.
+    """
+    streets = {}                            # (city, key) -> [name, lat sum, lng sum, count]
+    houses = defaultdict(dict)              # (city, key) -> {number: (lat, lng)}
+    rows = skipped = 0
+    for csv_path in csv_paths:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            cols = {field: _column(reader.fieldnames or [], field) for field in CSV_COLUMNS}
+            for row in reader:
+                rows += 1
+                try:
+                    lat, lng = float(row[cols['lat']]), float(row[cols['lng']])
+                except (TypeError, ValueError):
+                    skipped += 1
+                    continue
+                city = (row[cols['city']] or '').strip()
+                name = (row[cols['street']] or '').strip()
+                key = street_key(name)
+                if not city or not key:
+                    skipped += 1
+                    continue
+                city = normalize_city(city) or city
+                street = streets.setdefault((city, key), [name, 0.0, 0.0, 0])
+                street[1] += lat
+                street[2] += lng
+                street[3] += 1
+                number = normalize_house(row[cols['housenumber']])
+                if number:
+                    houses[(city, key)][number] = (lat, lng)
+
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        for street_id, ((city, key), (name, lat_sum, lng_sum, count)) in enumerate(streets.items(), 1):
+            conn.execute(
+                'INSERT INTO streets (id, city, name, key, token_key, lat, lng) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (street_id, city, name, key, token_key(name), lat_sum / count, lng_sum / count),
+            )
+            conn.executemany(
+                'INSERT INTO houses (street_id, number, lat, lng) VALUES (?, ?, ?, ?)',
+                [(street_id, number, lat, lng) for number, (lat, lng) in houses[(city, key)].items()],
+            )
+        conn.executescript(_INDEXES)
+        conn.commit()
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return {
+        'rows': rows, 'skipped': skipped, 'streets': len(streets),
+        'houses': sum(len(numbers) for numbers in houses.values()),
+    }
+
+
+class Gazetteer:
+    """
+    Read-only street and house-number index for offline address resolution.
+    `resolve` tries each AddressNormalizer candidate against the streets of its city:
+    exact key, then the order-insensitive token key, then a unique key prefix
+    ("Лесі Укр" -> "Лесі Українки"). Each thread gets its own SQLite connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def find_street(self, city, street) -> tuple | None:
+        """(id, name, lat, lng) of the street best matching `street` in `city`."""
+        key = street_key(street)
+        if not key:
+            return None
+        conn = self._conn()
+        row = conn.execute('SELECT id, name, lat, lng FROM streets WHERE city = ? AND key = ?', (city, key)).fetchone()
+        if row:
+            return row
+        row = conn.execute('SELECT id, name, lat, lng FROM streets WHERE city = ? AND token_key = ?',
+                           (city, token_key(street))).fetchone()
+        if row:
+            return row
+        if len(key) >= 4:
+            rows = conn.execute(
+                'SELECT id, name, lat, lng FROM streets WHERE city = ? AND key >= ? AND key < ? LIMIT 2',
+                (city, key, key + '\uffff'),
+            ).fetchall()
+            if len(rows) == 1:
+                return rows[0]
+        return None
+
+    @staticmethod
+    def _candidates(address):
+        # The address as scraped usually matches already; the normalizer's candidates
+        # (translations, renamed streets) cost far more than a lookup, so they come second
+        yield address
+        yield from AddressNormalizer.normalize(address)
+
+    def resolve(self, address) -> tuple | None:
+        """
+        (lat, lng, canonical_address, precision) for `address`: 'exact' when the house
+        number is known, 'street' (the street's centre) otherwise. None if no candidate
+        matched a street.
+        """
+        street_match = None
+        for candidate in self._candidates(address):
+            parsed = split_address(candidate)
+            if not parsed:
+                continue
+            city, street, house = parsed
+            found = self.find_street(city, street)
+            if not found:
+                continue
+            street_id, name, lat, lng = found
+            if house:
+                point = self._conn().execute(
+                    'SELECT lat, lng FROM houses WHERE street_id = ? AND number = ?', (street_id, house)
+                ).fetchone()
+                if point:
+                    return point[0], point[1], f"{city}, {name}, {house}", 'exact'
+            if street_match is None:
+                street_match = (lat, lng, f"{city}, {name}", 'street')
+        return street_match
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_gazetteers = {}
+_gazetteers_lock = threading.Lock()
+
+
+def open_gazetteer(path) -> Gazetteer | None:
+    """Process-wide gazetteer for `path`; None when disabled (empty path) or not loaded yet."""
+    if not path or not os.path.exists(path):
+        return None
+    with _gazetteers_lock:
+        if path not in _gazetteers:
+            _gazetteers[path] = Gazetteer(path)
+        return _gazetteers[path]
@@ -0,0 +1,141 @@
+import hashlib
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import GeocodeCache
+from app.services.address_normalizer import AddressNormalizer
+
+DEFAULT_TTL_DAYS = 90
+DEFAULT_MISS_TTL_DAYS = 7
+
+_SPACES = re.compile(r'\s+')
+_SPACE_BEFORE_PUNCT = re.compile(r'\s+([,.;])')
+
+MISS = (None, None, None, None)
+
+
+def normalize_query(text) -> str:
+    """Case-folded, whitespace-collapsed form of an address or region, used as the cache key."""
+    text = _SPACE_BEFORE_PUNCT.sub(r'\1', _SPACES.sub(' ', (text or '').strip()))
+    return text.casefold()
+
+
+def cache_key(address, region=None) -> str:
+    return hashlib.sha256(f"{normalize_query(address)}|{normalize_query(region)}".encode('utf-8')).hexdigest()
+
+
+class GeocodeCacheStats:
+    """Process-wide counters: cache hits (positive and negative), misses, stores, Photon requests
+    and addresses answered by the offline gazetteer."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def add(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = GeocodeCacheStats()
+
+
+def _ttl(found) -> timedelta:
+    if found:
+        days = current_app.config.get('GEOCODE_CACHE_TTL_DAYS', DEFAULT_TTL_DAYS)
+    else:
+        days = current_app.config.get('GEOCODE_MISS_TTL_DAYS', DEFAULT_MISS_TTL_DAYS)
+    return timedelta(days=days)
+
+
+def lookup(address, region=None):
+    """
+    The cached (lat, lng, canonical_address, precision) for a query, MISS for a cached
+    negative result, or None if there is no fresh entry. Needs an app context;
+    without one the cache is bypassed.
+
+    Uses its own short-lived session, so it never commits or expires the caller's
+    pending work (e.g. a regeocode loop editing Property rows).
+    """
+    if not address or not has_app_context():
+        return None
+    key = cache_key(address, region)
+    try:
+        with Session(db.engine) as session:
+            row = session.execute(
+                select(GeocodeCache).where(GeocodeCache.key == key, GeocodeCache.expires_at > datetime.utcnow())
+            ).scalar_one_or_none()
+            if row is None:
+                stats.add('misses')
+                return None
+            session.execute(update(GeocodeCache).where(GeocodeCache.id == row.id).values(hits=GeocodeCache.hits + 1))
+            session.commit()
+            if row.outcome == 'found':
+                stats.add('hits')
+                return row.latitude, row.longitude, row.canonical_address, row.precision
+            stats.add('negative_hits')
+            return MISS
+    except SQLAlchemyError as e:
+        print(f"⚠️ Geocode cache lookup failed: {e}")
+        return None
+
+
+def store(address, region, result):
+    """Caches a geocoding result; a result without coordinates is cached as a miss with the shorter TTL."""
+    if not address or not has_app_context():
+        return
+    lat, lng, canonical, precision = result
+    found = lat is not None and lng is not None
+    now = datetime.utcnow()
+    key = cache_key(address, region)
+    try:
+        with Session(db.engine) as session:
+            row = session.execute(select(GeocodeCache).where(GeocodeCache.key == key)).scalar_one_or_none()
+            row = row or GeocodeCache(key=key, hits=0)
+            row.query_text = normalize_query(address)
+            row.region = normalize_query(region) or None
+            row.outcome = 'found' if found else 'miss'
+            row.latitude, row.longitude = (lat, lng) if found else (None, None)
+            row.canonical_address = canonical if found else None
+            row.precision = precision if found else None
+            row.created_at = now
+            row.expires_at = now + _ttl(found)
+            session.add(row)
+            session.commit()
+        stats.add('stored')
+    except SQLAlchemyError:
+        # Typically another worker cached the same query concurrently; either copy will do
+        pass
+
+
+def print_geocode_summary():
+    s = stats.snapshot()
+    if s.get('gazetteer'):
+        print(f"📚 Gazetteer: {s['gazetteer']} addresses resolved offline")
+    memo = AddressNormalizer.cache_stats()['normalize']
+    if memo['hits'] + memo['misses']:
+        print(f"🧹 Address normalizer memo: {memo['hits'] / (memo['hits'] + memo['misses']) * 100:.1f}% hit rate "
+              f"({memo['hits']} hits, {memo['misses']} normalized, {memo['currsize']}/{memo['maxsize']} kept)")
+    lookups = s.get('hits', 0) + s.get('negative_hits', 0) + s.get('misses', 0)
+    if not lookups:
+        return
+    served = s.get('hits', 0) + s.get('negative_hits', 0)
+    print(f"🗺️  Geocode cache: {served / lookups * 100:.1f}% hit rate ({s.get('hits', 0)} hits, "
+          f"{s.get('negative_hits', 0)} cached misses, {s.get('misses', 0)} looked up), "
+          f"{s.get('requests', 0)} Photon requests")
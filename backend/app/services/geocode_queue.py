@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+
+from app import db
+from app.models import GeocodeJob, Property
+from app.services.districts import assign_district
+from app.services.geocoding import get_lat_long
+from app.services.pipeline import Pipeline, Stage
+
+# geocode_precision of a property whose coordinates are still being looked up
+PENDING = 'pending'
+
+
+class ClaimedGeocode(NamedTuple):
+    id: int
+    property_id: int
+    address: str
+    region: str | None
+    attempts: int
+
+
+def enqueue(prop, address, region=None, max_attempts=3):
+    """
+    Marks `prop` as pending and queues it for geocoding, in the caller's transaction
+    (the property must have an id, i.e. be flushed). A job already queued for the
+    property is pointed at the new address and made pending again.
+    """
+    prop.latitude = None
+    prop.longitude = None
+    prop.geocode_precision = PENDING
+
+    now = datetime.utcnow()
+    job = GeocodeJob.query.filter_by(property_id=prop.id).first()
+    if job is None:
+        db.session.add(GeocodeJob(property_id=prop.id, address=address, region=region,
+                                  max_attempts=max_attempts, available_at=now))
+        return
+    job.address = address
+    job.region = region
+    if job.status != 'running':
+        job.status = 'pending'
+        job.attempts = 0
+        job.max_attempts = max_attempts
+        job.available_at = now
+        job.last_error = None
+
+
+def claim(worker_id, batch_size=10, lease_seconds=300) -> list[ClaimedGeocode]:
+    """Leases up to `batch_size` jobs to `worker_id`, like job_queue.claim."""
+    now = datetime.utcnow()
+    jobs = GeocodeJob.query.filter(
+        or_(
+            and_(GeocodeJob.status == 'pending', GeocodeJob.available_at <= now),
+            and_(GeocodeJob.status == 'running', GeocodeJob.lease_expires_at < now),
+        )
+    ).order_by(GeocodeJob.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for job in jobs:
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        job.attempts += 1
+        claimed.append(ClaimedGeocode(job.id, job.property_id, job.address, job.region, job.attempts))
+    db.session.commit()
+    return claimed
+
+
+def complete(claimed: ClaimedGeocode, geo) -> str:
+    """
+    Stores a geocoding result on the property and finishes the job. Returns 'found',
+    'not_found', or 'requeued' if the address changed while it was being geocoded.
+    """
+    job = db.session.get(GeocodeJob, claimed.id)
+    if job is None:
+        return 'not_found'
+    job.locked_by = None
+    job.lease_expires_at = None
+    if job.address != claimed.address:
+        # A re-scrape changed the address meanwhile: this result is stale
+        job.status = 'pending'
+        job.attempts = 0
+        db.session.commit()
+        return 'requeued'
+
+    lat, lng, canonical, precision = geo
+    found = bool(lat and lng)
+    prop = db.session.get(Property, claimed.property_id)
+    if prop is not None:
+        if found:
+            prop.latitude = lat
+            prop.longitude = lng
+            prop.geocode_precision = precision
+            if canonical:
+                prop.address = canonical
+            assign_district(prop)
+        else:
+            prop.geocode_precision = None
+
+    job.status = 'done'
+    job.last_result = 'found' if found else 'not_found'
+    job.last_error = None
+    db.session.commit()
+    return job.last_result
+
+
+def fail(job_id, error, backoff_seconds=60):
+    """Records a failed attempt, retrying with exponential backoff. After max_attempts the property stops being pending."""
+    job = db.session.get(GeocodeJob, job_id)
+    if job is None:
+        return
+    job.last_result = 'error'
+    job.last_error = (error or '')[:2000]
+    job.locked_by = None
+    job.lease_expires_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        prop = db.session.get(Property, job.property_id)
+        if prop is not None and prop.geocode_precision == PENDING:
+            prop.geocode_precision = None
+    else:
+        job.status = 'pending'
+        job.available_at = datetime.utcnow() + timedelta(seconds=backoff_seconds * 2 ** (job.attempts - 1))
+    db.session.commit()
+
+
+def release(worker_id) -> int:
+    """Returns this worker's leased jobs to the queue (graceful shutdown), refunding the attempt."""
+    jobs = GeocodeJob.query.filter_by(status='running', locked_by=worker_id).all()
+    for job in jobs:
+        job.status = 'pending'
+        job.attempts = max(0, job.attempts - 1)
+        job.locked_by = None
+        job.lease_expires_at = None
+    db.session.commit()
+    return len(jobs)
+
+
+def queue_stats() -> dict:
+    return dict(db.session.query(GeocodeJob.status, func.count(GeocodeJob.id)).group_by(GeocodeJob.status).all())
+
+
+def _on_error(item, exc, stage_name):
+    claimed = item if isinstance(item, ClaimedGeocode) else item[0]
+    return {'status': 'error', 'job_id': claimed.id, 'msg': f"{stage_name}: {exc}"}
+
+
+def build_geocode_pipeline(workers=4, geocode=get_lat_long, app=None):
+    """
+    Geocode stage with `workers` threads (Photon requests are paced by the shared
+    rate limiter), then a single writer that stores results and finishes jobs.
+    Items are ClaimedGeocode; results are dicts with 'status' and 'job_id'.
+    """
+    app = app or current_app._get_current_object()
+
+    def lookup(claimed):
+        return claimed, geocode(claimed.address, region=claimed.region)
+
+    def write(item):
+        claimed, geo = item
+        try:
+            status = complete(claimed, geo)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.close()
+        return {'status': status, 'job_id': claimed.id, 'address': claimed.address, 'geo': geo}
+
+    return Pipeline(
+        [Stage('geocode', lookup, workers), Stage('write', write, 1)],
+        queue_size=workers * 4,
+        on_error=_on_error,
+        thread_context=app.app_context,
+    )
@@ -0,0 +1,186 @@
+import os
+from urllib.parse import urlparse
+from geopy.geocoders import Photon
+from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+from geopy.distance import geodesic
+from flask import current_app, has_app_context
+from app.services import geocode_cache
+from app.services.address_normalizer import AddressNormalizer
+from app.services.cities import get_center, normalize_city, get_region_center
+from app.services.settlements import region_key
+from app.services.gazetteer import open_gazetteer
+from app.services.rate_limiter import rate_limiter
+
+PHOTON_URL = urlparse(os.getenv('PHOTON_URL', 'https://photon.komoot.io'))
+
+_geolocator = None
+
+
+class GeocodingUnavailable(Exception):
+    """Photon failed (errors, timeouts, open circuit), so there is no answer to trust yet. Retry later."""
+
+
+def _get_geolocator():
+    """One Photon client per process, so its HTTP connections are reused."""
+    global _geolocator
+    if _geolocator is None:
+        _geolocator = Photon(user_agent="meget_scraper_v3", scheme=PHOTON_URL.scheme, domain=PHOTON_URL.netloc)
+    return _geolocator
+
+
+def _get_gazetteer():
+    if not has_app_context():
+        return None
+    return open_gazetteer(current_app.config.get('GAZETTEER_PATH'))
+
+
+def get_lat_long(address, region=None, attempt=1, refresh=False):
+    """
+    Returns (lat, lng, canonical_address, precision), or four Nones if nothing usable
+    was found. Raises GeocodingUnavailable if Photon failed and neither it nor the
+    gazetteer gave a street-level answer: a miss or a city fallback then is not final.
+
+    The offline gazetteer is tried first; a house it knows is answered without any
+    network call. Otherwise results, misses included, are cached in the database (see
+    geocode_cache), so a repeated address costs no Photon requests until its entry
+    expires. `refresh` skips the cache lookup and overwrites the entry. A street the
+    gazetteer knows still beats Photon's city or region fallbacks.
+    """
+    gazetteer = _get_gazetteer()
+    local = gazetteer.resolve(address) if gazetteer and address else None
+    if local and local[3] == 'exact':
+        geocode_cache.stats.add('gazetteer')
+        return local
+
+    if not refresh:
+        cached = geocode_cache.lookup(address, region)
+        if cached is not None:
+            return _prefer_street(local, cached)
+
+    failures = []
+    result = _geocode(address, region, failures)
+    if failures and result[3] != 'exact':
+        # Photon errors or timeouts: a miss or a fallback here is not the real answer, so don't remember it
+        if local:
+            return _prefer_street(local, result)
+        raise GeocodingUnavailable(f"{len(failures)} Photon failure(s), last: {failures[-1]}")
+    geocode_cache.store(address, region, result)
+    return _prefer_street(local, result)
+
+
+def _prefer_street(local, result):
+    """Photon's result, unless it is only a city-level fallback (or nothing) and the gazetteer knows the street."""
+    if local and result[3] != 'exact':
+        geocode_cache.stats.add('gazetteer')
+        return local
+    return result
+
+
+def _geocode(address, region, failures):
+    try:
+        geolocator = _get_geolocator()
+
+        candidates = AddressNormalizer.normalize(address)
+        if not candidates:
+            candidates = [address]
+
+        cleaned_addr = AddressNormalizer._basic_clean(address)
+        parts = cleaned_addr.split(',')
+        expected_city = None
+        if parts:
+            possible_city = parts[0].strip()
+            expected_city = normalize_city(possible_city, fuzzy=True)
+
+        if expected_city and len(candidates) == 1:
+            canonical = normalize_city(candidates[0])
+            if canonical == expected_city:
+                center = get_center(expected_city, region)
+                if center:
+                    return center[0], center[1], f"{expected_city}, Україна", "city"
+
+        if region:
+            region = region.strip()
+
+        for candidate in candidates:
+            try:
+                query_parts = [candidate]
+
+                if expected_city and expected_city not in candidate:
+                    query_parts.append(expected_city)
+                if region and region not in candidate:
+                    query_parts.append(region)
+                if "Україна" not in candidate and "Ukraine" not in candidate:
+                    query_parts.append("Україна")
+
+                query = ", ".join(query_parts)
+                query = ", ".join(p.strip() for p in query.split(",") if p.strip())
+                print(f"    Geocoding: '{query}'")
+
+                geocode_cache.stats.add('requests')
+                # Paced like the scrapers' hosts, so concurrent geocode workers share one Photon budget
+                with rate_limiter.slot(PHOTON_URL.geturl()):
+                    location = geolocator.geocode(query, timeout=10)
+
+                if location:
+                    # Ukraine bounding box check — reject results outside Ukraine
+                    UA_LAT = (44.0, 52.5)
+                    UA_LNG = (22.0, 40.5)
+                    if not (UA_LAT[0] <= location.latitude <= UA_LAT[1] and
+                            UA_LNG[0] <= location.longitude <= UA_LNG[1]):
+                        print(f"    ⚠️ Outside Ukraine: {location.latitude:.2f}, {location.longitude:.2f}")
+                        continue
+
+                    # Region validation
+                    if region:
+                        region_result = get_region_center(region)
+                        if region_result:
+                            _, reg_city = region_result
+                            from app.services.cities import CITIES
+                            city_info = CITIES.get(reg_city, {})
+                            all_names = [reg_city.lower()] + [a.lower() for a in city_info.get('aliases', [])]
+                            # The oblast's own name ("київ" for "Київська область") covers its other towns
+                            if len(region_key(region)) >= 3:
+                                all_names.append(region_key(region))
+                            loc_addr_lower = location.address.lower()
+                            if not any(name in loc_addr_lower for name in all_names):
+                                print(f"    ⚠️ Region mismatch: {location.address}")
+                                continue
+
+                    # City-level distance check (30km)
+                    if expected_city:
+                        center = get_center(expected_city, region)
+                        if center:
+                            dist_km = geodesic((location.latitude, location.longitude), center).km
+                            if dist_km > 30:
+                                print(f"    ⚠️ Too far ({dist_km:.0f}km from {expected_city})")
+                                continue
+                    # Oblast-level distance check (100km)
+                    elif region:
+                        region_result = get_region_center(region)
+                        if region_result:
+                            reg_center, reg_city = region_result
+                            dist_km = geodesic((location.latitude, location.longitude), reg_center).km
+                            if dist_km > 100:
+                                print(f"    ⚠️ Too far ({dist_km:.0f}km from {reg_city}, {region})")
+                                continue
+
+                    return location.latitude, location.longitude, location.address, "exact"
+
+            except (GeocoderTimedOut, GeocoderServiceError) as e:
+                print(f"    ⚠️ Photon error: {e}")
+                failures.append(e)
+                continue
+
+        # Fallback to oblast center
+        if region:
+            region_result = get_region_center(region)
+            if region_result:
+                reg_center, reg_city = region_result
+                print(f"    📍 Falling back to region center: {reg_city}")
+                return reg_center[0], reg_center[1], f"{reg_city}, Україна", "city"
+
+        return None, None, None, None
+    except Exception as e:
+        print(f"⚠️ Geocoding error: {e}")
+        failures.append(e)
+        return None, None, None, None
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from typing import NamedTuple
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+DEFAULT_LEVEL = 10
+MAX_PACK_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    pack TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    codec TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    id INTEGER PRIMARY KEY,
+    source_url TEXT NOT NULL,
+    site TEXT,
+    fetched_at TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES blobs (digest),
+    is_text INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_fetches_url_time ON fetches (source_url, fetched_at);
+CREATE INDEX IF NOT EXISTS ix_fetches_site ON fetches (site);
+"""
+
+
+class ArchivedPage(NamedTuple):
+    source_url: str
+    site: str | None
+    fetched_at: datetime
+    digest: str
+    body: bytes | str
+
+
+class HtmlArchive:
+    """
+    Local content-addressed store of fetched pages, so parsers can be re-run without
+    touching the network.
+
+    Bodies are keyed by their sha256 and stored once, each as an independent
+    compressed frame appended to a pack file (packs/*.pack). A SQLite index maps
+    digest -> (pack, offset, length) and records every fetch as (source_url, site,
+    fetched_at, digest). Every process appends to its own packs, so several scrape
+    workers can share one archive directory.
+    """
+
+    def __init__(self, root, level=DEFAULT_LEVEL, max_pack_bytes=MAX_PACK_BYTES):
+        self.root = root
+        self.level = level
+        self.max_pack_bytes = max_pack_bytes
+        self.codec = 'zstd' if ZSTD_AVAILABLE else 'zlib'
+        os.makedirs(os.path.join(root, 'packs'), exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._pack_name = None
+        self._pack_seq = 0
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.root, 'index.sqlite'), timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return zlib.compress(raw, min(self.level, 9))
+
+    @staticmethod
+    def _decompress(codec, data: bytes) -> bytes:
+        if codec == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("Archive blob is zstd-compressed but the zstandard package is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def _writable_pack(self, incoming) -> str:
+        """Current pack of this process, rolled over once it would exceed max_pack_bytes."""
+        if self._pack_name:
+            path = os.path.join(self.root, 'packs', self._pack_name)
+            if os.path.getsize(path) + incoming <= self.max_pack_bytes:
+                return self._pack_name
+        self._pack_seq += 1
+        self._pack_name = f"{datetime.utcnow():%Y%m%d%H%M%S}-{os.getpid()}-{self._pack_seq:04d}.pack"
+        open(os.path.join(self.root, 'packs', self._pack_name), 'ab').close()
+        return self._pack_name
+
+    def put(self, url, body, site=None, fetched_at=None) -> str:
+        """Archives one fetched page body (bytes or str). Returns its digest."""
+        is_text = isinstance(body, str)
+        raw = body.encode('utf-8') if is_text else bytes(body)
+        digest = hashlib.sha256(raw).hexdigest()
+        fetched_at = (fetched_at or datetime.utcnow()).isoformat(timespec='seconds')
+
+        with self._write_lock:
+            conn = self._conn()
+            known = conn.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)).fetchone()
+            if not known:
+                frame = self._compress(raw)
+                pack = self._writable_pack(len(frame))
+                with open(os.path.join(self.root, 'packs', pack), 'ab') as f:
+                    offset = f.tell()
+                    f.write(frame)
+                # Pack bytes hit the file before the index row that points at them
+                conn.execute(
+                    'INSERT OR IGNORE INTO blobs (digest, pack, offset, length, size, codec) VALUES (?, ?, ?, ?, ?, ?)',
+                    (digest, pack, offset, len(frame), len(raw), self.codec),
+                )
+            conn.execute(
+                'INSERT INTO fetches (source_url, site, fetched_at, digest, is_text) VALUES (?, ?, ?, ?, ?)',
+                (url, site, fetched_at, digest, int(is_text)),
+            )
+            conn.commit()
+        return digest
+
+    def read(self, digest, is_text=False) -> bytes | str:
+        row = self._conn().execute(
+            'SELECT pack, offset, length, codec FROM blobs WHERE digest = ?', (digest,)
+        ).fetchone()
+        if not row:
+            raise KeyError(digest)
+        pack, offset, length, codec = row
+        with open(os.path.join(self.root, 'packs', pack), 'rb') as f:
+            f.seek(offset)
+            raw = self._decompress(codec, f.read(length))
+        return raw.decode('utf-8') if is_text else raw
+
+    def has(self, url) -> bool:
+        return self._conn().execute('SELECT 1 FROM fetches WHERE source_url = ? LIMIT 1', (url,)).fetchone() is not None
+
+    def _page(self, row) -> ArchivedPage:
+        url, site, fetched_at, digest, is_text = row
+        return ArchivedPage(url, site, datetime.fromisoformat(fetched_at), digest, self.read(digest, bool(is_text)))
+
+    def latest(self, url) -> ArchivedPage | None:
+        row = self._conn().execute(
+            'SELECT source_url, site, fetched_at, digest, is_text FROM fetches '
+            'WHERE source_url = ? ORDER BY fetched_at DESC, id DESC LIMIT 1', (url,)
+        ).fetchone()
+        return self._page(row) if row else None
+
+    def iter_latest(self, site=None, since: datetime | None = None):
+        """Most recent archived page of every URL (optionally of one site / fetched since a date), lazily."""
+        query = (
+            'SELECT f.source_url, f.site, f.fetched_at, f.digest, f.is_text FROM fetches f '
+            'WHERE f.id = (SELECT id FROM fetches g WHERE g.source_url = f.source_url '
+            'ORDER BY g.fetched_at DESC, g.id DESC LIMIT 1)'
+        )
+        params = []
+        if site:
+            query += ' AND f.site = ?'
+            params.append(site)
+        if since:
+            query += ' AND f.fetched_at >= ?'
+            params.append(since.isoformat(timespec='seconds'))
+        cursor = self._conn().cursor()
+        for row in cursor.execute(query + ' ORDER BY f.id', params):
+            yield self._page(row)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        urls, fetches = conn.execute('SELECT COUNT(DISTINCT source_url), COUNT(*) FROM fetches').fetchone()
+        blobs, raw, stored = conn.execute('SELECT COUNT(*), SUM(size), SUM(length) FROM blobs').fetchone()
+        return {'urls': urls, 'fetches': fetches, 'blobs': blobs, 'raw_bytes': raw or 0, 'stored_bytes': stored or 0}
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def open_archive(root) -> HtmlArchive | None:
+    """Process-wide archive for `root`; None when archiving is disabled (empty root)."""
+    if not root:
+        return None
+    with _archives_lock:
+        if root not in _archives:
+            _archives[root] = HtmlArchive(root)
+        return _archives[root]
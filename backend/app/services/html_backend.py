@@ -0,0 +1,56 @@
+import os
+from bs4 import BeautifulSoup
+from bs4.filter import ElementFilter
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+BACKENDS = ('lxml', 'html.parser')
+
+
+def resolve_backend(name: str | None = None) -> str:
+    """
+    Picks the BeautifulSoup tree builder: `name`, else $HTML_PARSER_BACKEND, else lxml
+    when it is installed. Falls back to the pure-Python html.parser if lxml is missing.
+    """
+    name = name or os.getenv('HTML_PARSER_BACKEND') or ('lxml' if LXML_AVAILABLE else 'html.parser')
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend '{name}', expected one of {BACKENDS}")
+    if name == 'lxml' and not LXML_AVAILABLE:
+        return 'html.parser'
+    return name
+
+
+def class_tokens(attrs) -> set[str]:
+    """CSS classes of a tag from its raw (unsplit) or parsed attribute dict."""
+    value = attrs.get('class') if attrs else None
+    if not value:
+        return set()
+    if isinstance(value, str):
+        return set(value.split())
+    return set(value)
+
+
+class RegionFilter(ElementFilter):
+    """
+    Parse-time filter that only builds the regions a parser reads. A top-level tag is
+    kept, with its whole subtree, if `wants(name, attrs)` accepts it; everything else,
+    including loose text between kept regions, is dropped before any Tag is created.
+    """
+
+    def __init__(self, wants):
+        super().__init__()
+        self.wants = wants
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.wants(name, attrs or {})
+
+    def allow_string_creation(self, string):
+        return False
+
+
+def make_soup(body, backend=None, regions: RegionFilter | None = None) -> BeautifulSoup:
+    return BeautifulSoup(body, resolve_backend(backend), parse_only=regions)
@@ -0,0 +1,118 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import NamedTuple
+
+
+# Fragments that change on every request (inline scripts with tokens/timestamps,
+# comments with render times, CSRF inputs) and must not affect the content hash.
+_VOLATILE_PATTERNS = [
+    re.compile(r'<script\b[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<noscript\b[^>]*>.*?</noscript>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<!--.*?-->', re.DOTALL),
+    re.compile(r'<input\b[^>]*type=["\']?hidden["\']?[^>]*>', re.IGNORECASE),
+    re.compile(r'<meta\b[^>]*name=["\']?csrf[^>]*>', re.IGNORECASE),
+]
+_WHITESPACE = re.compile(r'\s+')
+
+
+class PageValidators(NamedTuple):
+    """Cache validators stored per listing between scrape runs."""
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+
+
+def conditional_headers(validators: PageValidators | None) -> dict:
+    """Builds If-None-Match / If-Modified-Since headers from stored validators."""
+    headers = {}
+    if not validators:
+        return headers
+    if validators.etag:
+        headers['If-None-Match'] = validators.etag
+    if validators.last_modified:
+        headers['If-Modified-Since'] = validators.last_modified
+    return headers
+
+
+def content_hash(body: str | bytes | None) -> str | None:
+    """SHA-256 of the page with volatile markup stripped and whitespace collapsed."""
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8', errors='replace')
+
+    for pattern in _VOLATILE_PATTERNS:
+        body = pattern.sub(' ', body)
+    body = _WHITESPACE.sub(' ', body).strip()
+
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class FetchResult:
+    """
+    Raw HTTP outcome of a listing fetch. `body` is bytes or str depending on the site client.
+    A request that got no response (transport error, open circuit) has status_code 0 and an `error`.
+    """
+    status_code: int
+    body: str | bytes | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    error: str | None = None
+
+    @classmethod
+    def from_response(cls, response, body=None):
+        return cls(
+            status_code=response.status_code,
+            body=body if body is not None else response.content,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200 and self.body is not None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status_code == 304
+
+    @property
+    def gone(self) -> bool:
+        """The listing was removed (404/410), as opposed to a failure worth retrying."""
+        return self.status_code in (404, 410)
+
+    @property
+    def failed(self) -> bool:
+        """No usable answer this time: 403/429, 5xx, transport error or open circuit. Retry later."""
+        return not (self.ok or self.not_modified or self.gone)
+
+    @cached_property
+    def content_hash(self) -> str | None:
+        return content_hash(self.body) if self.ok else None
+
+    def validators(self, previous: PageValidators | None = None) -> PageValidators:
+        """Validators to persist after this fetch, keeping old values the server did not resend."""
+        previous = previous or PageValidators()
+        return PageValidators(
+            etag=self.etag or previous.etag,
+            last_modified=self.last_modified or previous.last_modified,
+            content_hash=self.content_hash or previous.content_hash,
+        )
+
+
+def check_unchanged(page: FetchResult, validators: PageValidators | None) -> dict | None:
+    """
+    Returns a `not_modified` marker dict when the page does not need to be parsed again:
+    either the server answered 304, or the normalized body hash matches the stored one.
+    """
+    if page.not_modified:
+        return {'not_modified': 'etag', **page.validators(validators)._asdict()}
+
+    if validators and validators.content_hash and page.content_hash == validators.content_hash:
+        return {'not_modified': 'hash', **page.validators(validators)._asdict()}
+
+    return None
@@ -0,0 +1,142 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import and_, func, or_
+
+from app import db
+from app.models import ScrapeJob
+
+ENQUEUE_BATCH = 500
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    url: str
+    site: str
+    attempts: int
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(urls, site, max_attempts=3) -> int:
+    """
+    Adds URLs to the queue, consuming `urls` lazily in batches. Finished or failed
+    jobs are reset to pending; jobs already pending or running are left alone.
+    Returns the number of jobs that became pending.
+    """
+    queued = 0
+    batch = []
+    for url in urls:
+        batch.append(url)
+        if len(batch) >= ENQUEUE_BATCH:
+            queued += _enqueue_batch(batch, site, max_attempts)
+            batch = []
+    if batch:
+        queued += _enqueue_batch(batch, site, max_attempts)
+    return queued
+
+
+def _enqueue_batch(urls, site, max_attempts) -> int:
+    urls = list(dict.fromkeys(urls))
+    now = datetime.utcnow()
+    existing = {
+        job.url: job for job in ScrapeJob.query.filter(ScrapeJob.url.in_(urls)).all()
+    }
+
+    queued = 0
+    for url in urls:
+        job = existing.get(url)
+        if job is None:
+            db.session.add(ScrapeJob(url=url, site=site, max_attempts=max_attempts, available_at=now))
+            queued += 1
+        elif job.status in ('done', 'failed'):
+            job.status = 'pending'
+            job.attempts = 0
+            job.max_attempts = max_attempts
+            job.available_at = now
+            job.last_error = None
+            queued += 1
+    db.session.commit()
+    return queued
+
+
+def claim(worker_id, batch_size=10, lease_seconds=600, site=None) -> list[ClaimedJob]:
+    """
+    Leases up to `batch_size` jobs to `worker_id`. Pending jobs whose backoff has elapsed
+    and running jobs whose lease expired (their worker died) are both claimable.
+    FOR UPDATE SKIP LOCKED lets any number of workers claim concurrently without
+    blocking on or double-claiming each other's rows.
+    """
+    now = datetime.utcnow()
+    query = ScrapeJob.query.filter(
+        or_(
+            and_(ScrapeJob.status == 'pending', ScrapeJob.available_at <= now),
+            and_(ScrapeJob.status == 'running', ScrapeJob.lease_expires_at < now),
+        )
+    )
+    if site:
+        query = query.filter(ScrapeJob.site == site)
+
+    jobs = query.order_by(ScrapeJob.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for job in jobs:
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        job.attempts += 1
+        claimed.append(ClaimedJob(job.id, job.url, job.site, job.attempts))
+    db.session.commit()
+    return claimed
+
+
+def complete(job_id, result_status=None):
+    job = db.session.get(ScrapeJob, job_id)
+    if job is None:
+        return
+    job.status = 'done'
+    job.last_result = result_status
+    job.last_error = None
+    job.locked_by = None
+    job.lease_expires_at = None
+    db.session.commit()
+
+
+def fail(job_id, error, backoff_seconds=60):
+    """Records a failed attempt. The job is retried with exponential backoff until max_attempts."""
+    job = db.session.get(ScrapeJob, job_id)
+    if job is None:
+        return
+    job.last_result = 'error'
+    job.last_error = (error or '')[:2000]
+    job.locked_by = None
+    job.lease_expires_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+    else:
+        job.status = 'pending'
+        job.available_at = datetime.utcnow() + timedelta(seconds=backoff_seconds * 2 ** (job.attempts - 1))
+    db.session.commit()
+
+
+def release(worker_id) -> int:
+    """Returns this worker's leased jobs to the queue (graceful shutdown), refunding the attempt."""
+    jobs = ScrapeJob.query.filter_by(status='running', locked_by=worker_id).all()
+    for job in jobs:
+        job.status = 'pending'
+        job.attempts = max(0, job.attempts - 1)
+        job.locked_by = None
+        job.lease_expires_at = None
+    db.session.commit()
+    return len(jobs)
+
+
+def queue_stats(site=None) -> dict:
+    query = db.session.query(ScrapeJob.status, func.count(ScrapeJob.id))
+    if site:
+        query = query.filter(ScrapeJob.site == site)
+    return dict(query.group_by(ScrapeJob.status).all())
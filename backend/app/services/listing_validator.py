@@ -1,5 +1,7 @@
 import re
 
+from app.services import price_bounds
+
 MIN_PRICE_USD = 2_000
 MIN_TITLE_LENGTH = 15
 
@@ -17,6 +19,23 @@ SPAM_PATTERNS = [
 ]
 
 SPAM_REGEX = re.compile('|'.join(SPAM_PATTERNS), re.IGNORECASE)
+# Every SPAM_PATTERNS match contains one of these (casefolded); a much cheaper first check for validate_many
+SPAM_HINTS = re.compile('test|тест|asdasd|qwerty|lorem|xxx|aaaa')
+
+
+def _is_spam(text) -> bool:
+    return SPAM_HINTS.search(text.casefold()) is not None and SPAM_REGEX.search(text) is not None
+
+
+def _price_per_sqm_limits(city, rooms) -> tuple[float, float, str | None]:
+    """(min, max, market): the bounds learned for the city and rooms, else the fixed ones with no market."""
+    return price_bounds.lookup(city, rooms) or (MIN_PRICE_PER_SQM_USD, MAX_PRICE_PER_SQM_USD, None)
+
+
+def _limit_text(word, limit, market) -> str:
+    return f"({word} ${limit:.0f} in {market})" if market else f"({word} ${limit})"
+
+
 class ListingValidator:
     @classmethod
     def validate(cls, data: dict) -> tuple[bool, str | None]:
@@ -38,10 +57,11 @@ class ListingValidator:
 
         if area and area > 0 and price > 0:
             price_per_sqm = price / area
-            if price_per_sqm < MIN_PRICE_PER_SQM_USD:
-                return False, f"Price/m² too low: ${price_per_sqm:.0f}/m² (min ${MIN_PRICE_PER_SQM_USD})"
-            if price_per_sqm > MAX_PRICE_PER_SQM_USD:
-                return False, f"Price/m² too high: ${price_per_sqm:.0f}/m² (max ${MAX_PRICE_PER_SQM_USD})"
+            low, high, market = _price_per_sqm_limits(data.get('city'), data.get('rooms'))
+            if price_per_sqm < low:
+                return False, f"Price/m² too low: ${price_per_sqm:.0f}/m² {_limit_text('min', low, market)}"
+            if price_per_sqm > high:
+                return False, f"Price/m² too high: ${price_per_sqm:.0f}/m² {_limit_text('max', high, market)}"
 
         desc = data.get('description', '') or ''
         if len(desc) > 10 and SPAM_REGEX.search(desc):
@@ -54,3 +74,81 @@ class ListingValidator:
                 return False, f"Area too large: {area} m²"
 
         return True, None
+
+    @classmethod
+    def validate_many(cls, columns):
+        """
+        validate() over columns instead of one dict at a time. `columns` is a DataFrame,
+        or a mapping of title, price and optionally area, description, city and rooms to
+        equal-length sequences. Returns a pandas Series of rejection reasons (the same
+        messages as validate()), None for valid rows. The rules are evaluated as boolean
+        arrays; only failing rows are formatted.
+        """
+        import numpy as np
+        import pandas as pd
+
+        frame = columns if isinstance(columns, pd.DataFrame) else pd.DataFrame(columns)
+        index = frame.index
+        title = frame['title'].astype(object).where(frame['title'].notna(), '')
+        price = pd.to_numeric(frame['price'], errors='coerce')
+        area = pd.to_numeric(frame['area'], errors='coerce') if 'area' in frame else pd.Series(np.nan, index=index)
+        desc = (frame['description'].astype(object).where(frame['description'].notna(), '')
+                if 'description' in frame else pd.Series('', index=index, dtype=object))
+        # Messages print values as validate() does, so format from the columns as given
+        titles, prices, areas = title.to_numpy(), frame['price'].to_numpy(), area.to_numpy()
+
+        reasons = np.full(len(frame), None, dtype=object)
+        pending = np.ones(len(frame), dtype=bool)          # rows no rule has rejected yet
+
+        def reject(mask, message):
+            hit = pending & np.asarray(mask, dtype=bool)
+            for i in np.flatnonzero(hit):
+                reasons[i] = message(i)
+            pending[hit] = False
+
+        def spam(texts, rows):
+            """Spam check for the pending `rows`, run once per distinct text."""
+            found = np.zeros(len(frame), dtype=bool)
+            rows = np.flatnonzero(pending & np.asarray(rows, dtype=bool))
+            if len(rows):
+                codes, distinct = pd.factorize(texts.to_numpy()[rows])
+                found[rows] = np.fromiter(map(_is_spam, distinct), dtype=bool, count=len(distinct))[codes]
+            return found
+
+        title_length = title.str.len().to_numpy()
+        reject(title_length < MIN_TITLE_LENGTH, lambda i: f"Title too short ({title_length[i]} chars)")
+        reject(spam(title, pending), lambda i: f"Spam detected in title: '{titles[i][:50]}'")
+
+        reject(price.isna() | (price <= 0), lambda i: "No price")
+        reject(price < MIN_PRICE_USD, lambda i: f"Price too low: ${prices[i]}")
+
+        per_sqm = (price / area.where(area > 0)).to_numpy()
+        low = np.full(len(frame), MIN_PRICE_PER_SQM_USD, dtype=float)
+        high = np.full(len(frame), MAX_PRICE_PER_SQM_USD, dtype=float)
+        markets = np.full(len(frame), None, dtype=object)
+        if 'city' in frame:
+            # One lookup per distinct (city, rooms)
+            rooms = frame['rooms'].to_numpy() if 'rooms' in frame else np.full(len(frame), None)
+            rows = np.flatnonzero(pending & frame['city'].notna().to_numpy() & ~np.isnan(per_sqm))
+            codes, distinct = pd.factorize(pd.Series(list(zip(frame['city'].to_numpy()[rows], rooms[rows])),
+                                                     dtype=object))
+            limits = [_price_per_sqm_limits(city, rooms) for city, rooms in distinct]
+            for target, field in ((low, 0), (high, 1), (markets, 2)):
+                target[rows] = np.array([market[field] for market in limits], dtype=target.dtype)[codes]
+
+        def limit(word, values, fixed, i):
+            # The fixed bounds are printed as validate() prints the constants
+            return _limit_text(word, values[i] if markets[i] else fixed, markets[i])
+
+        reject(per_sqm < low,
+               lambda i: f"Price/m² too low: ${per_sqm[i]:.0f}/m² {limit('min', low, MIN_PRICE_PER_SQM_USD, i)}")
+        reject(per_sqm > high,
+               lambda i: f"Price/m² too high: ${per_sqm[i]:.0f}/m² {limit('max', high, MAX_PRICE_PER_SQM_USD, i)}")
+
+        reject(spam(desc, desc.str.len() > 10), lambda i: "Spam detected in description")
+
+        has_area = area.notna() & (area != 0)
+        reject(has_area & (area < 8), lambda i: f"Area too small: {areas[i]} m²")
+        reject(has_area & (area > 500), lambda i: f"Area too large: {areas[i]} m²")
+
+        return pd.Series(reasons, index=index, dtype=object)
@@ -1,12 +1,12 @@
-from .network import get_listing_urls, fetch_html
+from .network import get_listing_urls, fetch_html, fetch_page, sitemap_fetcher
 from .parser import ListingParser
+from app.services.html_backend import make_soup
 
-def scrape_meget_listing(url):
-    soup = fetch_html(url)
-    if not soup:
-        return None
 
+def parse_listing_page(body, url, backend=None):
+    # The whole page is needed: price, area and address fall back to full-text regexes
+    soup = make_soup(body, backend)
     parser = ListingParser(soup, url)
     return parser.parse()
 
-__all__ = ['get_listing_urls', 'fetch_html', 'ListingParser', 'scrape_meget_listing']
\ No newline at end of file
+__all__ = ['get_listing_urls', 'fetch_html', 'fetch_page', 'sitemap_fetcher', 'ListingParser', 'parse_listing_page']
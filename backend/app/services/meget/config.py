@@ -1,4 +1,11 @@
-BASE_URL = "https://meget.kiev.ua/prodazha-kvartir/"
+import os
+from urllib.parse import urljoin
+
+# Overridable so benchmarks can point the scraper at a local replay server
+BASE_URL = os.getenv('MEGET_BASE_URL', "https://meget.kiev.ua/prodazha-kvartir/")
+SITE_ROOT = urljoin(BASE_URL, '/')
+SITEMAP_URL = os.getenv('MEGET_SITEMAP_URL', urljoin(SITE_ROOT, 'sitemap.xml'))
+DETAIL_URL_PATTERNS = ('/prodazha-kvartir/details/', '/sale/flat/details/')
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
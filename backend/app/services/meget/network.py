@@ -1,31 +1,61 @@
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from .config import BASE_URL, HEADERS
+from .config import BASE_URL, DETAIL_URL_PATTERNS, HEADERS, SITE_ROOT, SITEMAP_URL
+from app.services.base_sitemap import BaseSitemapFetcher
+from app.services.http_cache import FetchResult, conditional_headers
+from app.services.html_backend import RegionFilter, make_soup
+from app.services.rate_limiter import rate_limiter
 
+# Catalog pages are only scanned for detail links
+_LINKS_ONLY = RegionFilter(lambda name, attrs: name == 'a' and 'href' in attrs)
 
-def fetch_html(url):
+
+def fetch_page(url, validators=None):
+    """Fetches a page, sending If-None-Match / If-Modified-Since when validators are known."""
+    headers = {**HEADERS, **conditional_headers(validators)}
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        if response.status_code == 200:
-            return BeautifulSoup(response.content, 'html.parser')
-    except Exception:
-        pass
+        with rate_limiter.slot(url) as slot:
+            response = requests.get(url, headers=headers, timeout=10)
+            slot.record(response)
+        return FetchResult.from_response(response)
+    except Exception as e:
+        # Includes CircuitOpenError: nothing was learnt about the listing itself
+        return FetchResult(0, error=str(e))
+
+
+def fetch_html(url):
+    page = fetch_page(url)
+    if page and page.ok:
+        return make_soup(page.body)
     return None
 
 
+def fetch_raw(url):
+    """Undecoded response body (e.g. a gzipped sitemap), or None."""
+    page = fetch_page(url)
+    if page and page.ok:
+        return page.body
+    return None
+
+
+def sitemap_fetcher():
+    return BaseSitemapFetcher(fetch_raw, sitemap_url=SITEMAP_URL, url_filter=DETAIL_URL_PATTERNS)
+
+
 def get_listing_urls(page=1):
     url = f"{BASE_URL}show/{page}/" if page > 1 else BASE_URL
-    soup = fetch_html(url)
+    result = fetch_page(url)
 
-    if not soup:
+    if not result or not result.ok:
         return []
 
+    soup = make_soup(result.body, regions=_LINKS_ONLY)
+
     links = set()
     for a_tag in soup.find_all('a', href=True):
         href = a_tag['href']
-        if '/prodazha-kvartir/details/' in href or '/sale/flat/details/' in href:
-            full_url = urljoin("https://meget.kiev.ua", href)
+        if any(pattern in href for pattern in DETAIL_URL_PATTERNS):
+            full_url = urljoin(SITE_ROOT, href)
             links.add(full_url)
 
-    return list(links)
\ No newline at end of file
+    return list(links)
@@ -3,7 +3,10 @@ from urllib.parse import urljoin
 from .config import GARBAGE_CLASSES
 from .utils import clean_price_text, find_price_by_regex
 from app.services.cities import normalize_city
-from app.services.address_normalizer import AddressNormalizer
+from app.services import address_cascade
+from app.services.address_cascade import ListingText
+
+_GARBAGE_CLASS_SET = frozenset(GARBAGE_CLASSES)
 
 
 class ListingParser:
@@ -13,10 +16,14 @@ class ListingParser:
         self._cleanup()
         self.page_text = self.soup.get_text(" ", strip=True)
         self.title = self._get_title()
+        # Address cascade state for the pipeline (see address_cascade.finish)
+        self.cascade_state = None
 
     def _cleanup(self):
-        for cls in GARBAGE_CLASSES:
-            for tag in self.soup.find_all(class_=cls):
+        # One traversal matching any garbage class instead of a find_all pass per class.
+        # Nested garbage is already gone once its ancestor is decomposed.
+        for tag in self.soup.find_all(class_=_GARBAGE_CLASS_SET.__contains__):
+            if not tag.decomposed:
                 tag.decompose()
 
     def _get_title(self):
@@ -125,6 +132,7 @@ class ListingParser:
 
         # Breadcrumbs
         breadcrumbs = self.soup.find('div', class_='breadcrumbs') or self.soup.find('ul', class_='breadcrumb')
+        crumbs = []
         if breadcrumbs:
             crumbs = [a.text.strip() for a in breadcrumbs.find_all('a')]
             skip = {'Главная', 'Продажа квартир', 'Продажа недвижимости', 'Meget', 'Недвижимость'}
@@ -151,21 +159,20 @@ class ListingParser:
         # Fallback: city from title
         if not city:
             for word in self.title.split():
-                normalized = normalize_city(word.strip('.,'))
+                normalized = normalize_city(word.strip('.,'), settlements=False)
                 if normalized:
                     city = normalized
                     break
 
-        # Fallback to AddressNormalizer
-        if not address:
-            cleaned_title = re.sub(r'(Продажа|Продам).*?(квартиры|квартиру)', '', self.title, flags=re.IGNORECASE)
-            cleaned_title = re.sub(r'Объявление №\d+', '', cleaned_title)
-
-            extracted = AddressNormalizer.extract_from_text(cleaned_title)
-            if not extracted:
-                extracted = AddressNormalizer.extract_from_text(self.page_text)
-            if extracted:
-                address = extracted
+        # Address block first, then the title and page text; the pipeline may go on to
+        # the gazetteer and the LLM when neither is convincing
+        cleaned_title = re.sub(r'(Продажа|Продам).*?(квартиры|квартиру)', '', self.title, flags=re.IGNORECASE)
+        cleaned_title = re.sub(r'Объявление №\d+', '', cleaned_title)
+        best, self.cascade_state = address_cascade.extract(ListingText(
+            title=cleaned_title, description=self.page_text, breadcrumbs=' / '.join(crumbs),
+            city=city, district=district, region=region, structured_address=address or None,
+        ))
+        address = best.address if best else None
 
         # Ensure city is in address
         if city and address:
@@ -232,5 +239,6 @@ class ListingParser:
             "region": region,
             "area": area,
             "rooms": rooms,
-            "images": images
+            "images": images,
+            **({"address_cascade": self.cascade_state} if self.cascade_state else {}),
         }
\ No newline at end of file
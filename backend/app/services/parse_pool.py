@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services import meget, bon_ua
+
+# Plain functions (picklable by reference) that turn raw page bodies into listing dicts
+SITE_PARSERS = {
+    'meget': meget.parse_listing_page,
+    'bon_ua': bon_ua.parse_listing_page,
+}
+
+_WARMUP_HTML = "<html><body><h1>warmup</h1><div class='card-body'><div class='card-price'>1 грн</div></div></body></html>"
+
+
+def _warm_worker():
+    """Pool initializer: pay the import and first-parse costs before real work arrives."""
+    for site_name, parse in SITE_PARSERS.items():
+        try:
+            parse(_WARMUP_HTML, f"https://warmup.invalid/{site_name}")
+        except Exception:
+            pass
+
+
+def _ping(_):
+    return os.getpid()
+
+
+def parse_in_worker(site_name, body, url):
+    return SITE_PARSERS[site_name](body, url)
+
+
+def default_process_count() -> int:
+    """CPUs this process may run on (respects container/affinity limits), not the host total."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+class ParsePool:
+    """
+    Process pool for the CPU-bound parse stage (soup building, cleanup, get_text, regexes),
+    so parsing runs on every core instead of serializing on the GIL with the fetch threads.
+    Workers receive raw page bodies and return plain dicts.
+
+    Uses the 'spawn' start method: forking a process that already runs fetch threads
+    and holds DB connections is unsafe.
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes or default_process_count()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_worker,
+        )
+
+    def warm(self):
+        """Starts every worker process now rather than on first use. Returns the worker count."""
+        pids = set(self._executor.map(_ping, range(self.processes * 4)))
+        return len(pids)
+
+    def parse(self, site_name, body, url):
+        return self._executor.submit(parse_in_worker, site_name, body, url).result()
+
+    def map(self, site_name, pages, chunksize=4):
+        """Parses an iterable of (body, url) pairs, preserving order."""
+        pages = list(pages)
+        return list(self._executor.map(
+            parse_in_worker,
+            [site_name] * len(pages), [body for body, _ in pages], [url for _, url in pages],
+            chunksize=chunksize,
+        ))
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
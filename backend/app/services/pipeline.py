@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from queue import Empty, Queue
+from typing import Callable, NamedTuple
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable
+    workers: int = 1
+    batch: int = 1          # > 1: func takes a list of up to this many items and returns a list of outputs
+
+
+class Done:
+    """Returned by a stage function to finish an item early and emit `result` directly."""
+    __slots__ = ('result',)
+
+    def __init__(self, result):
+        self.result = result
+
+
+_STOP = object()
+
+
+class StageStats:
+    """Item count and a bounded window of per-item durations for one stage."""
+
+    def __init__(self, window=10_000):
+        self.count = 0
+        self.errors = 0
+        self.durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds, failed=False):
+        with self._lock:
+            self.count += 1
+            self.errors += failed
+            self.durations.append(seconds)
+
+    def percentile(self, q) -> float | None:
+        with self._lock:
+            values = sorted(self.durations)
+        if not values:
+            return None
+        index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+        return values[index]
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages, each served by its own worker threads,
+    connected by bounded queues. A full queue blocks the stage feeding it, so a
+    slow stage throttles discovery instead of letting work pile up in memory.
+
+    A stage function returns the item for the next stage, `Done(result)` to finish
+    it early, or None to drop it. Whatever the last stage returns is emitted as the
+    result. If a stage raises, `on_error(item, exc, stage_name)` builds the result.
+    A stage with `batch` > 1 is called with the items already waiting in its queue
+    (at least one, at most `batch`) and returns one output per item, in order; it
+    never waits for more items to arrive.
+    `thread_context` is a factory for a context manager entered once per thread
+    (e.g. a Flask app context).
+    """
+
+    def __init__(self, stages, queue_size=100, on_error=None, thread_context=None):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.on_error = on_error
+        self.thread_context = thread_context or nullcontext
+        self.stats = {stage.name: StageStats() for stage in self.stages}
+
+    def run(self, source):
+        """Feeds `source` (any iterable, consumed lazily) into the pipeline and yields results."""
+        queues = [Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = Queue(maxsize=self.queue_size)
+        outputs = queues[1:] + [results]
+        consumers = [stage.workers for stage in self.stages[1:]] + [1]
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def feed():
+            with self.thread_context():
+                try:
+                    for item in source:
+                        queues[0].put(item)
+                except Exception as e:
+                    print(f"[PIPELINE] Source failed: {e}")
+                finally:
+                    for _ in range(self.stages[0].workers):
+                        queues[0].put(_STOP)
+
+        def work(index):
+            stage = self.stages[index]
+            stats = self.stats[stage.name]
+            inbox, outbox = queues[index], outputs[index]
+            with self.thread_context():
+                stopped = False
+                while not stopped:
+                    item = inbox.get()
+                    if item is _STOP:
+                        break
+                    items = [item]
+                    while len(items) < stage.batch:
+                        try:
+                            item = inbox.get_nowait()
+                        except Empty:
+                            break
+                        if item is _STOP:
+                            stopped = True
+                            break
+                        items.append(item)
+
+                    started = time.perf_counter()
+                    try:
+                        outs = stage.func(items) if stage.batch > 1 else [stage.func(items[0])]
+                        failed = False
+                    except Exception as e:
+                        outs = [Done(self.on_error(item, e, stage.name) if self.on_error else None) for item in items]
+                        failed = True
+                    elapsed = (time.perf_counter() - started) / len(items)
+                    for out in outs:
+                        stats.add(elapsed, failed)
+                        if isinstance(out, Done):
+                            if out.result is not None:
+                                results.put(out.result)
+                        elif out is not None:
+                            outbox.put(out)
+
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last:
+                for _ in range(consumers[index]):
+                    outbox.put(_STOP)
+
+        threads = [threading.Thread(target=feed, name='pipeline-source', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [
+                threading.Thread(target=work, args=(index,), name=f'pipeline-{stage.name}-{n}', daemon=True)
+                for n in range(stage.workers)
+            ]
+        for thread in threads:
+            thread.start()
+
+        while True:
+            result = results.get()
+            if result is _STOP:
+                break
+            yield result
+
+        for thread in threads:
+            thread.join()
+
+    def print_stats(self):
+        for name, stats in self.stats.items():
+            p50, p95 = stats.percentile(0.5), stats.percentile(0.95)
+            if p50 is None:
+                continue
+            print(f"⏱️  {name}: {stats.count} items, p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms"
+                  + (f", {stats.errors} errors" if stats.errors else ""))
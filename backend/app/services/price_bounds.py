@@ -0,0 +1,210 @@
+"""
+Per-market price/m² outlier bounds learned from the listings themselves.
+
+A market is a city and a rooms bucket (1, 2, 3, 4+), plus the city as a whole for
+listings without rooms or markets with too few of them. Every valid new listing adds
+its USD price/m² to a QuantileSketch of its markets. From a sketch with MIN_SAMPLES or
+more listings, the bounds are Tukey fences on log price/m²: FENCE_IQR interquartile
+ranges below the first and above the third quartile, so a Kyiv flat at $300/m² is
+rejected while a village house at $60/m² passes. Markets with fewer listings keep
+ListingValidator's fixed bounds.
+
+Sketches are stored in price_sketches. Each app keeps the loaded sketches and their
+fences in memory, so a check is a dict lookup; new observations are merged into the
+stored rows by save(), which adds counts rather than overwriting them, so concurrent
+scrapers don't lose each other's listings.
+"""
+import logging
+import math
+import threading
+from datetime import datetime
+from typing import NamedTuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import PriceSketch
+from app.services.quantile_sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+MIN_SAMPLES = 30
+FENCE_IQR = 3.0
+MAX_ROOMS_BUCKET = 4        # 4 rooms and more share one market
+ALL_ROOMS = 0
+# Save once this many observations are pending, so a long-running worker persists as it goes
+SAVE_EVERY = 500
+
+
+class Bounds(NamedTuple):
+    low: float
+    high: float
+    market: str             # e.g. "Київ, 2 rooms"
+
+
+def rooms_bucket(rooms) -> int:
+    try:
+        rooms = int(rooms)
+    except (TypeError, ValueError):
+        return ALL_ROOMS
+    return min(rooms, MAX_ROOMS_BUCKET) if rooms > 0 else ALL_ROOMS
+
+
+def market_name(city, rooms) -> str:
+    if rooms == ALL_ROOMS:
+        return city
+    if rooms == MAX_ROOMS_BUCKET:
+        return f"{city}, {rooms}+ rooms"
+    return f"{city}, {rooms} room{'s' if rooms > 1 else ''}"
+
+
+def fences(sketch: QuantileSketch) -> tuple[float, float] | None:
+    if sketch.count < MIN_SAMPLES:
+        return None
+    q1, q3 = math.log(sketch.quantile(0.25)), math.log(sketch.quantile(0.75))
+    spread = FENCE_IQR * (q3 - q1)
+    return math.exp(q1 - spread), math.exp(q3 + spread)
+
+
+class PriceBoundsStore:
+    def __init__(self):
+        self.sketches = {}          # {(city, rooms): QuantileSketch}, stored and pending
+        self.pending = {}           # {(city, rooms): QuantileSketch}, not saved yet
+        self.bounds = {}            # {(city, rooms): Bounds}, markets with enough listings
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with Session(db.engine) as session:
+                rows = session.execute(select(PriceSketch)).scalars().all()
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to load price sketches: {e}")
+            rows = []
+        with self._lock:
+            for row in rows:
+                sketch = QuantileSketch.from_dict(row.sketch)
+                if (row.city, row.rooms) in self.pending:
+                    sketch.merge(self.pending[(row.city, row.rooms)])
+                self._set(row.city, row.rooms, sketch)
+            self.loaded = True
+
+    def _set(self, city, rooms, sketch):
+        self.sketches[(city, rooms)] = sketch
+        found = fences(sketch)
+        if found:
+            self.bounds[(city, rooms)] = Bounds(*found, market_name(city, rooms))
+        else:
+            self.bounds.pop((city, rooms), None)
+
+    def lookup(self, city, rooms) -> Bounds | None:
+        if not self.loaded:
+            self.load()
+        return self.bounds.get((city, rooms_bucket(rooms))) or self.bounds.get((city, ALL_ROOMS))
+
+    def observe(self, city, rooms, price_per_sqm):
+        if not self.loaded:
+            self.load()
+        buckets = {rooms_bucket(rooms), ALL_ROOMS}
+        with self._lock:
+            for bucket in buckets:
+                key = (city, bucket)
+                self.pending.setdefault(key, QuantileSketch()).add(price_per_sqm)
+                sketch = self.sketches.get(key) or QuantileSketch()
+                sketch.add(price_per_sqm)
+                self._set(city, bucket, sketch)
+            pending = sum(sketch.count for sketch in self.pending.values())
+        if pending >= SAVE_EVERY:
+            self.save()
+
+    def save(self) -> int:
+        """Merges pending observations into the stored sketches. Returns how many were saved."""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        now = datetime.utcnow()
+        try:
+            with Session(db.engine) as session:
+                for (city, rooms), delta in pending.items():
+                    row = session.execute(
+                        select(PriceSketch).where(PriceSketch.city == city, PriceSketch.rooms == rooms)
+                        .with_for_update()
+                    ).scalar_one_or_none()
+                    if row is None:
+                        row = PriceSketch(city=city, rooms=rooms)
+                        session.add(row)
+                        # A copy: merged picks up newer observations below, and delta is put back if the commit fails
+                        merged = QuantileSketch(delta.alpha, dict(delta.bins))
+                    else:
+                        merged = QuantileSketch.from_dict(row.sketch)
+                        merged.merge(delta)
+                    row.sketch, row.count, row.updated_at = merged.to_dict(), merged.count, now
+                    # Pick up what other processes added to the stored sketch since it was loaded
+                    with self._lock:
+                        if (city, rooms) in self.pending:
+                            merged.merge(self.pending[(city, rooms)])
+                        self._set(city, rooms, merged)
+                session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to save price sketches: {e}")
+            with self._lock:
+                for key, delta in pending.items():
+                    self.pending.setdefault(key, QuantileSketch()).merge(delta)
+            return 0
+        return sum(delta.count for key, delta in pending.items() if key[1] == ALL_ROOMS)
+
+
+def _store() -> PriceBoundsStore | None:
+    if not has_app_context():
+        return None
+    app = current_app._get_current_object()
+    store = app.extensions.get('price_bounds')
+    if store is None:
+        store = app.extensions.setdefault('price_bounds', PriceBoundsStore())
+    return store
+
+
+def lookup(city, rooms=None) -> Bounds | None:
+    """Learned price/m² bounds for the market, or None to use the fixed ones."""
+    store = _store()
+    return store.lookup(city, rooms) if store and city else None
+
+
+def observe(data: dict):
+    """Adds a valid listing's USD price/m² to the sketches of its city."""
+    store = _store()
+    city, price, area = data.get('city'), data.get('price'), data.get('area')
+    if store and city and price and area and price > 0 and area > 0:
+        store.observe(city, data.get('rooms'), price / area)
+
+
+def save() -> int:
+    store = _store()
+    return store.save() if store else 0
+
+
+def rebuild(listings) -> int:
+    """
+    Replaces every stored sketch with ones built from `listings`, (city, rooms, price,
+    area) rows. Returns the number of markets stored.
+    """
+    sketches = {}
+    for city, rooms, price, area in listings:
+        if not (city and price and area and price > 0 and area > 0):
+            continue
+        for bucket in {rooms_bucket(rooms), ALL_ROOMS}:
+            sketches.setdefault((city, bucket), QuantileSketch()).add(price / area)
+
+    now = datetime.utcnow()
+    db.session.execute(PriceSketch.__table__.delete())
+    db.session.add_all([
+        PriceSketch(city=city, rooms=rooms, count=sketch.count, sketch=sketch.to_dict(), updated_at=now)
+        for (city, rooms), sketch in sketches.items()
+    ])
+    db.session.commit()
+    current_app.extensions.pop('price_bounds', None)
+    return len(sketches)
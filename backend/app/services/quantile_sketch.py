@@ -0,0 +1,56 @@
+import math
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles of positive values with a relative error bound (DDSketch).
+    Each value is counted in a logarithmic bucket, so any quantile comes back within
+    `alpha` (relative) of the true one. Adding a value is O(1), memory grows with
+    log(max / min) rather than the number of values, and two sketches merge by adding
+    their bucket counts, which lets several processes fold their updates into one
+    stored sketch.
+    """
+
+    def __init__(self, alpha=0.01, bins=None):
+        self.alpha = alpha
+        self._gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {int(i): n for i, n in (bins or {}).items()}
+        self.count = sum(self.bins.values())
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, weight=1):
+        if not value or value <= 0 or math.isinf(value) or math.isnan(value):
+            return
+        i = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[i] = self.bins.get(i, 0) + weight
+        self.count += weight
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f"Cannot merge sketches with alpha {other.alpha} and {self.alpha}")
+        for i, n in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + n
+        self.count += other.count
+
+    def quantile(self, q) -> float | None:
+        """The value at quantile `q` (0..1), or None for an empty sketch."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if seen > rank:
+                break
+        # Bucket i holds (gamma^(i-1), gamma^i]; this point is within alpha of both ends
+        return 2 * self._gamma ** i / (self._gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {'alpha': self.alpha, 'bins': {str(i): n for i, n in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('alpha', 0.01), data.get('bins'))
@@ -0,0 +1,245 @@
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+# Responses that mean "slow down" rather than "this URL is bad"
+THROTTLE_STATUSES = {403, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised by `acquire` while a host's circuit breaker is open."""
+
+
+class _HostState:
+    def __init__(self, host, limiter, now):
+        self.host = host
+        self.lock = threading.Lock()
+        self.rate = limiter.initial_rate
+        self.tokens = float(limiter.burst)
+        self.updated = now
+        self.blocked_until = 0.0
+
+        self.consecutive_failures = 0
+        self.circuit = 'closed'
+        self.opened_at = 0.0
+        self.cooldown = limiter.cooldown
+        self.probe_in_flight = False
+
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.latency_total = 0.0
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-host token bucket whose rate adapts with AIMD, plus a per-host circuit breaker.
+
+    Every successful, fast response adds `increase` req/s to the host's rate (up to
+    `max_rate`). A 429/403, a 5xx or a transport error multiplies it by `decrease`
+    (down to `min_rate`) and drains the bucket, so the retry naturally waits longer.
+    Responses slower than `latency_target` seconds shrink the rate more gently.
+
+    After `failure_threshold` consecutive failures the circuit opens and `acquire`
+    raises CircuitOpenError for `cooldown` seconds. Then a single probe request is
+    let through: success closes the circuit, failure re-opens it with a doubled cooldown.
+    """
+
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=20.0, burst=2,
+                 increase=0.1, decrease=0.5, latency_target=3.0, latency_decrease=0.9,
+                 failure_threshold=5, cooldown=30.0, max_cooldown=600.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.latency_decrease = latency_decrease
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        self._sleep = sleep
+
+        self._hosts: dict[str, _HostState] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _state(self, url) -> _HostState:
+        host = urlparse(url).netloc or url
+        with self._hosts_lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(host, self, self._clock())
+            return state
+
+    def acquire(self, url):
+        """Blocks until the host's bucket has a token. Raises CircuitOpenError if the host is tripped."""
+        state = self._state(url)
+        while True:
+            with state.lock:
+                now = self._clock()
+
+                if state.circuit == 'open':
+                    if now - state.opened_at < state.cooldown:
+                        raise CircuitOpenError(f"Circuit open for {state.host}")
+                    state.circuit = 'half_open'
+                    state.probe_in_flight = False
+                if state.circuit == 'half_open':
+                    if state.probe_in_flight:
+                        raise CircuitOpenError(f"Circuit half-open for {state.host}, probe in flight")
+                    state.probe_in_flight = True
+                    state.requests += 1
+                    return
+
+                state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+
+                if now >= state.blocked_until and state.tokens >= 1:
+                    state.tokens -= 1
+                    state.requests += 1
+                    return
+
+                wait = max(state.blocked_until - now, (1 - state.tokens) / state.rate)
+            self._sleep(wait)
+
+    def record(self, url, status_code=None, latency=None, retry_after=None):
+        """Feeds a request outcome back into the host's rate and circuit breaker.
+        `status_code=None` means the request failed before any response."""
+        state = self._state(url)
+        with state.lock:
+            now = self._clock()
+            if latency is not None:
+                state.latency_total += latency
+
+            failed = status_code is None or status_code in THROTTLE_STATUSES or status_code >= 500
+            if failed:
+                if status_code in THROTTLE_STATUSES:
+                    state.throttled += 1
+                else:
+                    state.errors += 1
+                state.rate = max(self.min_rate, state.rate * self.decrease)
+                state.tokens = 0.0
+                state.updated = now
+                if retry_after:
+                    state.blocked_until = now + retry_after
+
+                state.consecutive_failures += 1
+                if state.circuit == 'half_open':
+                    state.cooldown = min(self.max_cooldown, state.cooldown * 2)
+                    self._open(state, now)
+                elif state.consecutive_failures >= self.failure_threshold:
+                    self._open(state, now)
+                return
+
+            state.consecutive_failures = 0
+            if state.circuit == 'half_open':
+                print(f"[RATE] {state.host}: circuit closed")
+                state.circuit = 'closed'
+                state.cooldown = self.cooldown
+                state.probe_in_flight = False
+
+            if latency is not None and latency > self.latency_target:
+                state.rate = max(self.min_rate, state.rate * self.latency_decrease)
+            else:
+                state.rate = min(self.max_rate, state.rate + self.increase)
+
+    def _open(self, state, now, reason=None):
+        state.circuit = 'open'
+        state.opened_at = now
+        state.probe_in_flight = False
+        reason = reason or f"{state.consecutive_failures} consecutive failures"
+        print(f"[RATE] {state.host}: circuit open for {state.cooldown:.0f}s after {reason}")
+
+    def trip(self, url, reason='a configuration error'):
+        """Opens the host's circuit for `max_cooldown` right away, for a failure that retries won't fix soon."""
+        state = self._state(url)
+        with state.lock:
+            state.cooldown = self.max_cooldown
+            self._open(state, self._clock(), reason)
+
+    def circuit(self, url) -> str:
+        """The host's breaker state: 'closed', 'open' or 'half_open'."""
+        state = self._state(url)
+        with state.lock:
+            return state.circuit
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Acquires a token for `url` and records the outcome when the block exits.
+        Call `slot.record(response)` inside the block; an exception escaping the
+        block is recorded as a transport failure.
+        """
+        self.acquire(url)
+        request_slot = _Slot(self, url, self._clock())
+        try:
+            yield request_slot
+        except Exception:
+            if not request_slot.recorded:
+                request_slot.record(None)
+            raise
+        if not request_slot.recorded:
+            # Block finished without reporting a response: count it as a plain success
+            self.record(url, 200, self._clock() - request_slot.started)
+
+    def snapshot(self) -> dict:
+        """Per-host rate, request counters and breaker state for run summaries."""
+        result = {}
+        with self._hosts_lock:
+            states = list(self._hosts.values())
+        for state in states:
+            with state.lock:
+                result[state.host] = {
+                    'rate': round(state.rate, 2),
+                    'requests': state.requests,
+                    'throttled': state.throttled,
+                    'errors': state.errors,
+                    'avg_latency': round(state.latency_total / state.requests, 3) if state.requests else None,
+                    'circuit': state.circuit,
+                }
+        return result
+
+    def reset(self):
+        with self._hosts_lock:
+            self._hosts.clear()
+
+
+class _Slot:
+    def __init__(self, limiter, url, started):
+        self.limiter = limiter
+        self.url = url
+        self.started = started
+        self.recorded = False
+
+    def record(self, response):
+        """Records a `requests`-style response (or None for a failed request)."""
+        self.recorded = True
+        latency = self.limiter._clock() - self.started
+        if response is None:
+            self.limiter.record(self.url, None, latency)
+            return
+        self.limiter.record(self.url, response.status_code, latency,
+                            retry_after=_parse_retry_after(response.headers.get('Retry-After')))
+
+
+def _parse_retry_after(value) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+# Shared by every fetcher in the process so threads hitting the same host share one budget
+rate_limiter = AdaptiveRateLimiter()
+
+
+def print_rate_summary():
+    for host, s in rate_limiter.snapshot().items():
+        print(f"🚦 {host}: {s['requests']} requests, {s['rate']} req/s now, "
+              f"{s['throttled']} throttled, {s['errors']} errors, circuit {s['circuit']}")
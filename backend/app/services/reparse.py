@@ -0,0 +1,56 @@
+from itertools import islice
+
+from app.services.currency import to_usd
+from app.services.parse_pool import SITE_PARSERS
+
+# Property columns `flask reparse` may rewrite from re-parsed pages
+REPARSE_FIELDS = ('title', 'price', 'area', 'rooms', 'images')
+DEFAULT_FIELDS = ('title', 'area', 'rooms', 'images')
+
+
+def iter_reparsed(pages, pool=None, batch_size=200):
+    """
+    Re-runs the site parsers over archived pages, yielding (ArchivedPage, data) pairs;
+    data is None when the parser rejects the page (expired listing, unknown site).
+    Parses in `pool` (a ParsePool) when given, in-process otherwise.
+    """
+    pages = iter(pages)
+    while batch := list(islice(pages, batch_size)):
+        parsed = [None] * len(batch)
+        for site in {p.site for p in batch if p.site in SITE_PARSERS}:
+            indexes = [i for i, p in enumerate(batch) if p.site == site]
+            bodies = [(batch[i].body, batch[i].source_url) for i in indexes]
+            if pool:
+                results = pool.map(site, bodies)
+            else:
+                results = [SITE_PARSERS[site](body, url) for body, url in bodies]
+            for i, data in zip(indexes, results):
+                parsed[i] = data
+        yield from zip(batch, parsed)
+
+
+def apply_reparsed(prop, data, fields=DEFAULT_FIELDS) -> list[str]:
+    """
+    Copies the selected re-parsed fields onto a Property, returning the names of the
+    ones that changed. Empty parser results never overwrite stored values.
+    Addresses are left alone: the stored one is the geocoder's canonical form, and
+    changing it would mean geocoding over the network.
+    """
+    changes = []
+
+    for field in ('title', 'area', 'rooms', 'images'):
+        value = data.get(field)
+        if field in fields and value not in (None, '', []) and getattr(prop, field) != value:
+            setattr(prop, field, value)
+            changes.append(field)
+
+    if 'price' in fields and data.get('price', 0) > 0:
+        currency = data.get('currency', 'UAH')
+        price, rate_date = to_usd(data['price'], currency)
+        if prop.price != price or prop.currency != 'USD' or prop.price_original != data['price']:
+            prop.price = price
+            prop.currency = 'USD'
+            prop.price_original, prop.currency_original, prop.fx_rate_date = data['price'], currency, rate_date
+            changes.append('price')
+
+    return changes
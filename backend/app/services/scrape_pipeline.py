@@ -0,0 +1,401 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, NamedTuple
+
+from flask import current_app
+
+from app import db
+from app.models import Property
+from app.services import meget, bon_ua
+from app.services import address_cascade, geocode_queue, price_bounds
+from app.services.currency import to_usd
+from app.services.districts import assign_district
+from app.services.geocoding import GeocodingUnavailable
+from app.services.html_archive import open_archive
+from app.services.http_cache import FetchResult, PageValidators, check_unchanged
+from app.services.listing_validator import ListingValidator
+from app.services.pipeline import Done, Pipeline, Stage
+from app.services.structured_data import fast_path_stats
+
+# Parsed listings whose address tiers run together, so the LLM tier can batch its prompts
+ADDRESS_BATCH = 16
+
+
+class ScraperSite(NamedTuple):
+    name: str
+    fetch_page: Callable    # (url, validators) -> FetchResult
+    parse_page: Callable    # (body, url) -> dict | None
+    get_listing_urls: Callable
+    sitemap_fetcher: Callable | None = None     # () -> BaseSitemapFetcher
+
+
+SITES = {
+    'meget': ScraperSite('meget', meget.fetch_page, meget.parse_listing_page, meget.get_listing_urls,
+                         meget.sitemap_fetcher),
+    'bon_ua': ScraperSite('bon_ua', bon_ua.fetch_page, bon_ua.parse_listing_page, bon_ua.get_listing_urls,
+                          bon_ua.sitemap_fetcher),
+}
+
+
+class KnownRow(NamedTuple):
+    id: int
+    address: str | None
+    latitude: float | None
+    geocode_precision: str | None
+    validators: PageValidators
+
+
+@dataclass
+class ScrapeTask:
+    url: str
+    site: ScraperSite | None = None
+    job_id: int | None = None       # set when the URL came from the durable job queue
+    known: KnownRow | None = None
+    page: FetchResult | None = None
+    data: dict | None = None
+    outcome: str | None = None      # 'failed' / 'expired' / 'unchanged', set by early stages
+    reason: str | None = None
+    is_valid: bool = True
+    rejection_reason: str | None = None
+    geocode_target: str | None = None
+    geocode_deferred: bool = False  # inline geocoding was unavailable: queue it for the geocode worker
+    geo: tuple = (None, None, None, None)
+
+
+def known_row(url) -> KnownRow | None:
+    row = db.session.query(
+        Property.id, Property.address, Property.latitude, Property.geocode_precision,
+        Property.http_etag, Property.http_last_modified, Property.content_hash,
+    ).filter_by(source_url=url).first()
+    # Release the connection: this thread's next DB access may be much later
+    db.session.close()
+    if not row:
+        return None
+    return KnownRow(row[0], row[1], row[2], row[3], PageValidators(row[4], row[5], row[6]))
+
+
+def known_source_urls(urls):
+    """Returns the subset of `urls` already stored, via the unique index on source_url."""
+    rows = db.session.query(Property.source_url).filter(Property.source_url.in_(list(urls))).all()
+    db.session.close()
+    return {r[0] for r in rows}
+
+
+def apply_validators(prop, data):
+    """Copies fetch validators from scraped data onto the row. Returns True if anything changed."""
+    changed = False
+    for column, key in (('http_etag', 'etag'), ('http_last_modified', 'last_modified'), ('content_hash', 'content_hash')):
+        value = data.get(key)
+        if value and getattr(prop, column) != value:
+            setattr(prop, column, value)
+            changed = True
+    return changed
+
+
+class ScrapeRun:
+    """
+    Stage functions of one scrape run: fetch → parse → address → validate → write.
+    Tasks finished early (failed, expired, unchanged) skip the middle stages and go to
+    `write`, which is the only stage that modifies the database. Only a 404/410 or a page
+    the parser reports as expired deactivates a listing; a failed fetch leaves it as is.
+
+    Listings needing coordinates are written with geocode_precision='pending' and
+    queued for `flask geocode-worker`, so scraping never waits on the geocoder.
+    Given a `geocode` function, a geocode stage resolves them inline instead.
+
+    Items fed in are URLs for `site`, or ready ScrapeTasks carrying their own site
+    (used by the queue worker, which mixes sites). With a `parse_pool` the parse
+    stage ships raw page bodies to worker processes instead of parsing in-thread.
+    With an `archive`, changed pages (and unchanged ones not archived yet) are kept
+    for offline re-parsing.
+    """
+
+    def __init__(self, site: ScraperSite | None = None, conditional=True, geocode=None, parse_pool=None,
+                 archive=None):
+        self.site = site
+        self.conditional = conditional
+        self.geocode_func = geocode
+        self.parse_pool = parse_pool
+        self.archive = archive
+
+    def fetch(self, item):
+        task = item if isinstance(item, ScrapeTask) else ScrapeTask(item, site=self.site)
+        task.known = known_row(task.url)
+        validators = task.known.validators if (self.conditional and task.known) else None
+
+        page = task.site.fetch_page(task.url, validators)
+        if page is None or page.failed:
+            # Throttled, server error, transport error or open circuit: says nothing about the listing
+            task.outcome = 'failed'
+            task.reason = (page.error or f"HTTP {page.status_code}") if page else 'no response'
+            return task
+        if page.gone:
+            task.outcome = 'expired'
+            return task
+
+        unchanged = check_unchanged(page, validators)
+        if self.archive and page.ok and page.body and (not unchanged or not self.archive.has(task.url)):
+            self.archive.put(task.url, page.body, site=task.site.name)
+        if unchanged:
+            # Page unchanged since the last run: skip parsing, validation and geocoding
+            task.outcome = 'unchanged'
+            task.reason = unchanged['not_modified']
+            task.data = unchanged
+            return task
+
+        task.page = page
+        return task
+
+    def parse(self, task):
+        if task.outcome:
+            return task
+        if self.parse_pool:
+            task.data = self.parse_pool.parse(task.site.name, task.page.body, task.url)
+        else:
+            task.data = task.site.parse_page(task.page.body, task.url)
+        if not task.data:
+            task.outcome = 'expired'
+        else:
+            if 'structured_fields' in task.data:
+                fast_path_stats.record(task.site.name, task.data.pop('structured_fields'))
+            task.data.update(task.page.validators()._asdict())
+        task.page = None
+        return task
+
+    def resolve_addresses(self, tasks):
+        """Gazetteer/LLM tiers for the addresses the parsers weren't sure of, for a batch of parsed tasks."""
+        address_cascade.finish_many([task.data for task in tasks if not task.outcome])
+        return tasks
+
+    def validate(self, task):
+        if task.outcome:
+            return task
+        data = task.data
+
+        # Normalize currency to USD using live NBU rates, keeping the listed price
+        raw_price = data.get('price', 0)
+        raw_currency = data.get('currency', 'UAH')
+        if raw_price > 0:
+            data['price_original'], data['currency_original'] = raw_price, raw_currency
+            if raw_currency != 'USD':
+                data['price'], data['fx_rate_date'] = to_usd(raw_price, raw_currency)
+                data['currency'] = 'USD'
+
+        task.is_valid, task.rejection_reason = ListingValidator.validate(data)
+        if not task.is_valid and not task.known:
+            return Done({'status': 'rejected', 'url': task.url, 'msg': task.rejection_reason})
+        if task.is_valid and not task.known:
+            price_bounds.observe(data)
+
+        known = task.known
+        if known:
+            if data.get('address') and known.address != data['address']:
+                # Force a new geocode attempt for the new address
+                task.geocode_target = data['address']
+            elif not known.latitude and known.address and known.geocode_precision != geocode_queue.PENDING:
+                # Backfill coordinates for an unchanged address
+                task.geocode_target = known.address
+        elif data.get('address'):
+            task.geocode_target = data['address']
+        return task
+
+    def geocode(self, task):
+        if task.outcome:
+            return task
+        data = task.data
+        if task.geocode_target:
+            try:
+                task.geo = self.geocode_func(task.geocode_target, region=data.get('region'))
+            except GeocodingUnavailable:
+                task.geocode_deferred = True
+        return task
+
+    def write(self, task):
+        try:
+            if task.outcome == 'failed':
+                return {'status': 'error', 'url': task.url, 'msg': f"Fetch failed: {task.reason}"}
+            if task.outcome == 'expired':
+                return self._write_expired(task)
+            if task.outcome == 'unchanged':
+                return self._write_unchanged(task)
+            if task.known:
+                return self._write_existing(task)
+            return self._write_new(task)
+        except Exception as e:
+            db.session.rollback()
+            return {'status': 'error', 'url': task.url, 'msg': str(e)}
+        finally:
+            db.session.close()
+
+    def _write_expired(self, task):
+        # Listing expired: mark it inactive if it exists in DB. Final, so a queued job is not retried.
+        if task.known:
+            expired = db.session.get(Property, task.known.id)
+            if expired and expired.is_active:
+                expired.is_active = False
+                db.session.commit()
+                return {'status': 'expired', 'url': task.url, 'msg': 'Listing expired - marked inactive'}
+        return {'status': 'expired', 'url': task.url, 'msg': 'Listing expired'}
+
+    def _write_unchanged(self, task):
+        if task.known:
+            existing_prop = db.session.get(Property, task.known.id)
+            if existing_prop and apply_validators(existing_prop, task.data):
+                db.session.commit()
+        return {'status': 'unchanged', 'url': task.url, 'reason': task.reason}
+
+    def _write_existing(self, task):
+        data = task.data
+        existing_prop = db.session.get(Property, task.known.id)
+        validators_changed = apply_validators(existing_prop, data)
+        flag_changed = existing_prop.validation_error != task.rejection_reason
+        existing_prop.validation_error = task.rejection_reason
+        needs_update = False
+        changes = []
+
+        if existing_prop.price_original is not None and data.get('price_original') is not None:
+            # Compare listed prices: a UAH price converts differently every day
+            price_changed = (existing_prop.price_original != data['price_original']
+                             or existing_prop.currency_original != data['currency_original'])
+        else:
+            price_changed = existing_prop.price != data['price'] or existing_prop.currency != data['currency']
+        if price_changed:
+            existing_prop.price = data['price']
+            existing_prop.currency = data['currency']
+            existing_prop.price_original = data.get('price_original')
+            existing_prop.currency_original = data.get('currency_original')
+            existing_prop.fx_rate_date = data.get('fx_rate_date')
+            changes.append("price")
+            needs_update = True
+
+        if existing_prop.source_website != data.get('source_website'):
+            existing_prop.source_website = data.get('source_website')
+            changes.append("source")
+            needs_update = True
+
+        address_changed = data.get('address') and existing_prop.address != data['address']
+        if address_changed:
+            existing_prop.address = data['address']
+            existing_prop.city = data.get('city')
+            existing_prop.district = data.get('district')
+            changes.append("address")
+            needs_update = True
+
+        lat, lng, canonical_addr, precision = task.geo
+        if task.geocode_target and (not self.geocode_func or task.geocode_deferred):
+            geocode_queue.enqueue(existing_prop, task.geocode_target, data.get('region'))
+            if not address_changed:
+                changes.append("geolocation (queued)")
+                needs_update = True
+        elif address_changed:
+            if lat and lng:
+                existing_prop.latitude = lat
+                existing_prop.longitude = lng
+                existing_prop.geocode_precision = precision
+                if canonical_addr:
+                    existing_prop.address = canonical_addr
+                assign_district(existing_prop)
+                changes.append("geolocation")
+            else:
+                existing_prop.latitude = None
+                existing_prop.longitude = None
+                existing_prop.geocode_precision = None
+        elif task.geocode_target and lat and lng:
+            existing_prop.latitude = lat
+            existing_prop.longitude = lng
+            existing_prop.geocode_precision = precision
+            if canonical_addr:
+                existing_prop.address = canonical_addr
+            assign_district(existing_prop)
+            changes.append("geolocation (backfill)")
+            needs_update = True
+
+        if not existing_prop.images and data['images']:
+            existing_prop.images = data['images']
+            changes.append("images")
+            needs_update = True
+
+        if needs_update:
+            if not task.is_valid:
+                changes.append(f"flagged: {task.rejection_reason}")
+            existing_prop.updated_at = datetime.utcnow()
+            db.session.commit()
+
+            if not task.is_valid:
+                return {'status': 'rejected', 'url': task.url, 'msg': f"Updated but flagged: {task.rejection_reason}"}
+            return {'status': 'updated', 'url': task.url, 'title': data['title'], 'msg': ', '.join(changes)}
+
+        if validators_changed or flag_changed:
+            db.session.commit()
+        if not task.is_valid:
+            return {'status': 'rejected', 'url': task.url, 'msg': task.rejection_reason}
+        return {'status': 'skipped', 'url': task.url}
+
+    def _write_new(self, task):
+        data = task.data
+        lat, lng, canonical_addr, precision = task.geo
+
+        new_prop = Property(
+            title=data['title'],
+            source_url=data['source_url'],
+            source_website=data['source_website'],
+            price=data.get('price'),
+            currency=data.get('currency'),
+            price_original=data.get('price_original'),
+            currency_original=data.get('currency_original'),
+            fx_rate_date=data.get('fx_rate_date'),
+            address=canonical_addr if canonical_addr else data.get('address'),
+            city=data.get('city'),
+            district=data.get('district'),
+            latitude=lat,
+            longitude=lng,
+            geocode_precision=precision,
+            area=data.get('area'),
+            rooms=data.get('rooms'),
+            images=data.get('images'),
+            description=f"Scraped from {data['source_website']}",
+            http_etag=data.get('etag'),
+            http_last_modified=data.get('last_modified'),
+            content_hash=data.get('content_hash'),
+        )
+        assign_district(new_prop)
+        db.session.add(new_prop)
+        if task.geocode_target and (not self.geocode_func or task.geocode_deferred):
+            db.session.flush()
+            geocode_queue.enqueue(new_prop, task.geocode_target, data.get('region'))
+        db.session.commit()
+        return {'status': 'new', 'url': task.url, 'title': data['title'], 'price': data['price'], 'currency': data['currency']}
+
+    def stages(self, workers):
+        """I/O-bound stages get `workers` threads; CPU-bound and DB-writing stages get fewer.
+        With a process pool, one parse thread per process keeps every process busy."""
+        parse_workers = self.parse_pool.processes if self.parse_pool else max(1, workers // 2)
+        stages = [
+            Stage('fetch', self.fetch, workers),
+            Stage('parse', self.parse, parse_workers),
+            Stage('address', self.resolve_addresses, 2, batch=ADDRESS_BATCH),
+            Stage('validate', self.validate, 1),
+        ]
+        if self.geocode_func:
+            stages.append(Stage('geocode', self.geocode, workers))
+        stages.append(Stage('write', self.write, 2))
+        return stages
+
+
+def _on_error(item, exc, stage_name):
+    url = item.url if isinstance(item, ScrapeTask) else item
+    return {'status': 'error', 'url': url, 'msg': f"{stage_name}: {exc}"}
+
+
+def build_pipeline(site: ScraperSite | None, workers=5, conditional=True, queue_size=None, app=None, parse_pool=None,
+                   geocode=None):
+    """Builds the streaming scrape pipeline; every worker thread runs inside an app context."""
+    app = app or current_app._get_current_object()
+    archive = open_archive(app.config.get('HTML_ARCHIVE_DIR'))
+    run = ScrapeRun(site, conditional=conditional, geocode=geocode, parse_pool=parse_pool, archive=archive)
+    return Pipeline(
+        run.stages(workers),
+        queue_size=queue_size or workers * 4,
+        on_error=_on_error,
+        thread_context=app.app_context,
+    )
@@ -0,0 +1,250 @@
+import csv
+import gzip
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import NamedTuple
+
+_basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DEFAULT_PATH = os.getenv('SETTLEMENTS_PATH', os.path.join(_basedir, 'data', 'settlements.tsv.gz'))
+
+FILE_COLUMNS = ('name', 'oblast', 'lat', 'lng', 'population', 'aliases')
+
+CSV_COLUMNS = {
+    'name': ('name', 'name:uk', 'settlement'),
+    'oblast': ('oblast', 'region', 'admin1'),
+    'lat': ('lat', 'latitude', 'y'),
+    'lng': ('lon', 'lng', 'longitude', 'x'),
+    'population': ('population', 'pop'),
+    'aliases': ('aliases', 'alternate_names', 'alternatenames'),
+}
+
+_REGION_WORDS = ('область', 'обл.', 'обл')
+_REGION_SUFFIXES = ('ська', 'ская', 'ський', 'ский', 'ське', 'ское', 'зька', 'зкая', 'цька', 'цкая')
+
+
+class Settlement(NamedTuple):
+    name: str
+    oblast: str
+    lat: float
+    lng: float
+    population: int
+
+
+def _key(name) -> str:
+    return ' '.join((name or '').replace('ё', 'е').replace('’', "'").replace('ʼ', "'").lower().split())
+
+
+def region_key(name) -> str:
+    """'Київська область' / 'Київська обл.' / 'київська' -> 'київ'."""
+    text = _key(name)
+    for word in _REGION_WORDS:
+        text = text.replace(word, '')
+    text = text.strip(' .,')
+    for suffix in _REGION_SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix) + 2:
+            return text[:-len(suffix)]
+    return text
+
+
+class SettlementIndex:
+    """
+    Settlements with oblast, coordinates and population, held in parallel arrays.
+    Names and aliases map to row numbers through a dict (exact lookups) and a sorted
+    key list searched with bisect (prefix lookups); oblasts map to their most populous
+    settlement. Names shared by several villages resolve through the oblast.
+    """
+
+    def __init__(self, rows):
+        self.names = []
+        self.lat = array('d')
+        self.lng = array('d')
+        self.population = array('l')
+        self.oblast_ids = array('H')
+        self.oblasts = []
+        oblast_ids = {}
+        by_key = {}
+        for name, oblast, lat, lng, population, aliases in rows:
+            row = len(self.names)
+            self.names.append(name)
+            self.lat.append(lat)
+            self.lng.append(lng)
+            self.population.append(population)
+            if oblast not in oblast_ids:
+                oblast_ids[oblast] = len(self.oblasts)
+                self.oblasts.append(oblast)
+            self.oblast_ids.append(oblast_ids[oblast])
+            for key in {_key(name), *(_key(a) for a in aliases)}:
+                if key:
+                    by_key.setdefault(key, []).append(row)
+        # Most names are unique: keep a bare int rather than a one-element list
+        self._by_key = {key: rows[0] if len(rows) == 1 else tuple(rows) for key, rows in by_key.items()}
+        self._keys = sorted(self._by_key)
+
+        self._region_centers = {}
+        for row in range(len(self.names)):
+            oblast_id = self.oblast_ids[row]
+            best = self._region_centers.get(oblast_id)
+            if best is None or self.population[row] > self.population[best]:
+                self._region_centers[oblast_id] = row
+        self._regions = {region_key(oblast): oblast_id for oblast, oblast_id in oblast_ids.items() if oblast}
+        self._region_keys = sorted(self._regions)
+
+    @classmethod
+    def from_file(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f, delimiter='\t')
+            next(reader, None)
+            return cls(
+                (name, oblast, float(lat), float(lng), int(population or 0), aliases.split('|') if aliases else ())
+                for name, oblast, lat, lng, population, aliases in reader
+            )
+
+    def __len__(self):
+        return len(self.names)
+
+    def _settlement(self, row) -> Settlement:
+        return Settlement(self.names[row], self.oblasts[self.oblast_ids[row]],
+                          self.lat[row], self.lng[row], self.population[row])
+
+    def _rows(self, key) -> tuple:
+        rows = self._by_key.get(key, ())
+        return (rows,) if isinstance(rows, int) else rows
+
+    def find(self, name, region=None) -> list[Settlement]:
+        """Every settlement called `name` (or with it as an alias), limited to `region`'s oblast if it is known."""
+        rows = self._rows(_key(name))
+        oblast_id = self._region_id(region) if region else None
+        if oblast_id is not None:
+            rows = [row for row in rows if self.oblast_ids[row] == oblast_id] or rows
+        return [self._settlement(row) for row in rows]
+
+    def resolve(self, name, region=None) -> Settlement | None:
+        """The settlement `name` refers to, or None if unknown or still ambiguous after the region."""
+        found = self.find(name, region)
+        return found[0] if len(found) == 1 else None
+
+    def canonical_name(self, name) -> str | None:
+        """The settlement name for `name` or an alias; villages sharing a name share it, so no region is needed."""
+        names = {self.names[row] for row in self._rows(_key(name))}
+        return names.pop() if len(names) == 1 else None
+
+    def complete(self, prefix, limit=10) -> list[Settlement]:
+        """Settlements whose name or alias starts with `prefix`, most populous first."""
+        prefix = _key(prefix)
+        if not prefix:
+            return []
+        rows = set()
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            rows.update(self._rows(self._keys[i]))
+            i += 1
+        best = sorted(rows, key=lambda row: -self.population[row])[:limit]
+        return [self._settlement(row) for row in best]
+
+    def _region_id(self, region) -> int | None:
+        key = region_key(region)
+        if not key:
+            return None
+        if key in self._regions:
+            return self._regions[key]
+        # Unique prefix: 'дніпропетров' for 'Дніпропетровська', 'запоріз' for 'Запорізька'
+        i = bisect_left(self._region_keys, key[:4])
+        matches = set()
+        while i < len(self._region_keys) and self._region_keys[i].startswith(key[:4]):
+            candidate = self._region_keys[i]
+            if candidate.startswith(key) or key.startswith(candidate):
+                matches.add(self._regions[candidate])
+            i += 1
+        return matches.pop() if len(matches) == 1 else None
+
+    def region_center(self, region) -> Settlement | None:
+        """The most populous settlement of the oblast named by `region`."""
+        oblast_id = self._region_id(region)
+        if oblast_id is None:
+            return None
+        return self._settlement(self._region_centers[oblast_id])
+
+
+def _column(header, field, required=True):
+    for name in CSV_COLUMNS[field]:
+        if name in header:
+            return name
+    if required:
+        raise ValueError(f"CSV has no column for {field} (expected one of {', '.join(CSV_COLUMNS[field])})")
+    return None
+
+
+def build(csv_paths, output) -> dict:
+    """
+    Writes the settlements data file (gzipped TSV, most populous first) from CSVs with
+    name, oblast, lat, lon and optional population and aliases ("|" or ","-separated).
+    The file is written aside and swapped in atomically.
+    """
+    settlements = {}                       # (name, oblast, rounded lat, rounded lng) -> row; drops repeats
+    rows = skipped = 0
+    for csv_path in csv_paths:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames or []
+            cols = {field: _column(header, field, field not in ('population', 'aliases')) for field in CSV_COLUMNS}
+            for row in reader:
+                rows += 1
+                name = (row[cols['name']] or '').strip()
+                try:
+                    lat, lng = float(row[cols['lat']]), float(row[cols['lng']])
+                except (TypeError, ValueError):
+                    skipped += 1
+                    continue
+                if not name:
+                    skipped += 1
+                    continue
+                oblast = (row[cols['oblast']] or '').strip()
+                try:
+                    population = int(float(row[cols['population']] or 0)) if cols['population'] else 0
+                except ValueError:
+                    population = 0
+                raw_aliases = (row[cols['aliases']] or '') if cols['aliases'] else ''
+                aliases = sorted({a.strip() for a in raw_aliases.replace(',', '|').split('|')
+                                  if a.strip() and a.strip() != name and '\t' not in a})
+                settlements[(name, oblast, round(lat, 3), round(lng, 3))] = (name, oblast, lat, lng, population, aliases)
+
+    tmp_path = f"{output}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        writer.writerow(FILE_COLUMNS)
+        for name, oblast, lat, lng, population, aliases in sorted(settlements.values(), key=lambda s: -s[4]):
+            writer.writerow((name, oblast, f"{lat:.5f}", f"{lng:.5f}", population, '|'.join(aliases)))
+    os.replace(tmp_path, output)
+    return {'rows': rows, 'skipped': skipped, 'settlements': len(settlements)}
+
+
+_path = DEFAULT_PATH
+_index = None
+_index_lock = threading.Lock()
+
+
+def configure(path):
+    """Points lookups at another data file ('' disables them); the index reloads on next use."""
+    global _path, _index
+    with _index_lock:
+        if path != _path:
+            _path, _index = path, None
+
+
+def open_settlements() -> SettlementIndex | None:
+    """Process-wide index, loaded on first use; None when disabled or the file is not built."""
+    global _index
+    if _index is not None:
+        return _index
+    if not _path or not os.path.exists(_path):
+        return None
+    with _index_lock:
+        if _index is None:
+            started = time.perf_counter()
+            _index = SettlementIndex.from_file(_path)
+            print(f"🏘️  Loaded {len(_index)} settlements in {time.perf_counter() - started:.2f}s")
+        return _index
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import SitemapState
+
+# Re-read this much before the last walk: many sitemaps give date-only <lastmod>
+# values, and the site's clock need not match ours
+SITEMAP_OVERLAP = timedelta(days=1)
+
+
+class SitemapWalk:
+    """
+    Detail URLs from a site's sitemap (see BaseSitemapFetcher), each once, plus the
+    checkpoint that makes the next walk incremental.
+
+    Incremental by default: only URLs whose <lastmod> is at or after the start of the
+    previous checkpointed walk, minus `overlap`. `full` ignores the checkpoint.
+    Iterating does not move the checkpoint: the caller calls checkpoint() once the URLs
+    are safe (queued, or scraped without errors). Until then, a crash or a failed fetch
+    means the next walk yields them again. A walk with a failed sub-sitemap is never
+    checkpointed, so that sitemap is retried in full next time.
+    """
+
+    def __init__(self, site_name, fetcher, full=False, overlap=SITEMAP_OVERLAP):
+        self.site_name = site_name
+        self.fetcher = fetcher
+        self.full = full
+        self.overlap = overlap
+        self.started = None
+        self.complete = False
+        self.url_count = 0
+
+    def __iter__(self):
+        state = db.session.get(SitemapState, self.site_name)
+        since = None if self.full or state is None else state.last_run_at - self.overlap
+        db.session.close()
+
+        self.started = datetime.utcnow()
+        print(f"[SITEMAP] {self.site_name}: "
+              + (f"URLs changed since {since:%Y-%m-%d %H:%M}" if since else "all URLs"))
+
+        seen = set()
+        for url in self.fetcher.iter_urls(since=since):
+            if url not in seen:
+                seen.add(url)
+                yield url
+
+        self.url_count = len(seen)
+        print(f"[SITEMAP] {self.site_name}: {len(seen)} URLs from {self.fetcher.sitemaps_read} sitemaps")
+        if self.fetcher.failed:
+            print(f"[SITEMAP] {len(self.fetcher.failed)} sitemap(s) failed, checkpoint will not advance: "
+                  f"{self.fetcher.failed[:3]}")
+            return
+        self.complete = True
+
+    def checkpoint(self) -> bool:
+        """Records the walk as the start of the next incremental one, if it read every sitemap."""
+        if not self.complete:
+            return False
+        state = db.session.get(SitemapState, self.site_name) or SitemapState(site=self.site_name)
+        state.last_run_at = self.started
+        state.last_url_count = self.url_count
+        db.session.add(state)
+        db.session.commit()
+        return True
+
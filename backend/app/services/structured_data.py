@@ -0,0 +1,192 @@
+import html
+import json
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Matched on the raw page, before (and often instead of) building a soup
+_JSON_LD = re.compile(
+    r'<script\b[^>]*\btype\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL,
+)
+_META = re.compile(r'<meta\b[^>]*>', re.IGNORECASE)
+_ATTR = re.compile(r'([\w:-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+
+CURRENCIES = ('USD', 'EUR', 'UAH')
+OG_PRICE_KEYS = ('product:price:amount', 'og:price:amount')
+OG_CURRENCY_KEYS = ('product:price:currency', 'og:price:currency')
+
+
+@dataclass
+class StructuredListing:
+    """Listing fields found in a page's JSON-LD and OpenGraph blocks. None means not present."""
+    price: float | None = None
+    currency: str | None = None
+    street_address: str | None = None
+    locality: str | None = None
+    rooms: int | None = None
+    area: float | None = None
+    images: list[str] = field(default_factory=list)
+    og_image: str | None = None
+
+
+def parse_price(value, currency=None) -> tuple[float, str] | None:
+    """(price, currency) from a schema.org/OpenGraph amount, or None if it is not a positive number."""
+    try:
+        price = float(str(value).replace(' ', '').replace('\xa0', ''))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0:
+        return None
+    currency = str(currency or 'UAH').upper()
+    return price, currency if currency in CURRENCIES else 'UAH'
+
+
+def offer_price(data) -> tuple[float, str] | None:
+    """Price of the first offer in one decoded JSON-LD object."""
+    if not isinstance(data, dict):
+        return None
+    offers = data.get('offers', {})
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if isinstance(offers, dict) and 'price' in offers:
+        return parse_price(offers['price'], offers.get('priceCurrency'))
+    return None
+
+
+def _nodes(data):
+    """Every JSON object in a decoded JSON-LD block (top level, @graph and nested), depth first."""
+    if isinstance(data, list):
+        for item in data:
+            yield from _nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                yield from _nodes(value)
+
+
+def _number(value):
+    if isinstance(value, dict):
+        value = value.get('value')
+    try:
+        return float(str(value).replace(',', '.').split()[0])
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _image_urls(value):
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [value['url']] if isinstance(value.get('url'), str) else []
+    if isinstance(value, list):
+        return [url for item in value for url in _image_urls(item)]
+    return []
+
+
+def _apply_json_ld(listing, data):
+    for node in _nodes(data):
+        if listing.price is None:
+            found = offer_price(node)
+            if not found and node.get('@type') == 'Offer' and 'price' in node:
+                found = parse_price(node['price'], node.get('priceCurrency'))
+            if found:
+                listing.price, listing.currency = found
+
+        address = node.get('address')
+        if listing.street_address is None and isinstance(address, dict):
+            listing.street_address = (address.get('streetAddress') or '').strip() or None
+            listing.locality = listing.locality or (address.get('addressLocality') or '').strip() or None
+        elif listing.street_address is None and isinstance(address, str) and address.strip():
+            listing.street_address = address.strip()
+
+        if listing.rooms is None and 'numberOfRooms' in node:
+            rooms = _number(node['numberOfRooms'])
+            if rooms and 1 <= rooms <= 10:
+                listing.rooms = int(rooms)
+        if listing.area is None and 'floorSize' in node:
+            listing.area = _number(node['floorSize']) or None
+
+        if not listing.images and 'image' in node:
+            listing.images = _image_urls(node['image'])
+
+
+def _meta_properties(page) -> dict:
+    properties = {}
+    for tag in _META.findall(page):
+        attrs = {}
+        for name, double, single, bare in _ATTR.findall(tag):
+            attrs[name.lower()] = double or single or bare
+        key = attrs.get('property') or attrs.get('name')
+        if key and 'content' in attrs:
+            properties.setdefault(key.lower(), html.unescape(attrs['content']).strip())
+    return properties
+
+
+def extract_structured(page) -> StructuredListing:
+    """
+    Reads JSON-LD and OpenGraph blocks straight from the raw HTML with regexes and
+    json.loads, without building any DOM. Malformed blocks are skipped.
+    """
+    if isinstance(page, bytes):
+        page = page.decode('utf-8', errors='replace')
+    listing = StructuredListing()
+
+    for block in _JSON_LD.findall(page):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        _apply_json_ld(listing, data)
+
+    meta = _meta_properties(page)
+    listing.og_image = meta.get('og:image') or None
+    if listing.price is None:
+        amount = next((meta[k] for k in OG_PRICE_KEYS if k in meta), None)
+        currency = next((meta[k] for k in OG_CURRENCY_KEYS if k in meta), None)
+        found = parse_price(amount, currency) if amount else None
+        if found:
+            listing.price, listing.currency = found
+    return listing
+
+
+class FastPathStats:
+    """Per-site count of parsed pages and of listing fields that came from structured data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = Counter()
+        self._hits = Counter()
+        self._fields = {}
+
+    def record(self, site, fields):
+        with self._lock:
+            self._pages[site] += 1
+            if fields:
+                self._hits[site] += 1
+                self._fields.setdefault(site, Counter()).update(fields)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                site: {'pages': pages, 'fast_path': self._hits[site], 'fields': dict(self._fields.get(site, {}))}
+                for site, pages in self._pages.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._pages.clear()
+            self._hits.clear()
+            self._fields.clear()
+
+
+fast_path_stats = FastPathStats()
+
+
+def print_fast_path_summary():
+    for site, s in fast_path_stats.snapshot().items():
+        share = s['fast_path'] / s['pages'] * 100 if s['pages'] else 0
+        fields = ', '.join(f"{name} {count}" for name, count in sorted(s['fields'].items())) or 'none'
+        print(f"⚡ {site}: structured-data fast path on {s['fast_path']}/{s['pages']} pages ({share:.0f}%); fields: {fields}")
@@ -0,0 +1,101 @@
+"""
+Currency conversion of stored listings: `flask convert-currencies` as set-based
+UPDATE ... FROM exchange_rates statements (currency.reconvert_prices) against the
+previous command, which loaded every non-USD Property and converted it row by row
+at today's rate. Seeds a scratch database with non-USD listings spread over a year
+of daily NBU rates; the row-by-row loop runs over the first --legacy-rows of them.
+
+    cd backend && python -m benchmarks.bench_convert --rows 1000000
+    cd backend && python -m benchmarks.bench_convert --database-url postgresql://.../scratch
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+
+def seed(db, rows, days=365):
+    from app.models import ExchangeRate, Property
+
+    start = date(2025, 1, 1)
+    rng = random.Random(0)
+    db.session.execute(ExchangeRate.__table__.insert(), [
+        {'currency': cc, 'rate': base + rng.uniform(-1, 1), 'rate_date': start + timedelta(days=d),
+         'fetched_at': datetime.utcnow()}
+        for d in range(days) for cc, base in (('USD', 41.0), ('EUR', 44.5))
+    ])
+    for offset in range(0, rows, 50_000):
+        db.session.execute(Property.__table__.insert(), [
+            {'title': f'Listing {i}', 'source_url': f'https://example.com/{i}', 'is_active': True,
+             'price': rng.randrange(500_000, 5_000_000) if i % 3 else rng.randrange(20_000, 200_000),
+             'currency': 'UAH' if i % 3 else 'EUR',
+             'created_at': datetime(2025, 1, 1) + timedelta(days=rng.randrange(days), seconds=i % 86400)}
+            for i in range(offset, min(rows, offset + 50_000))
+        ])
+    db.session.commit()
+
+
+def legacy_convert(db, limit) -> float:
+    """The previous convert-currencies loop, without its per-row print. Returns rows/s."""
+    from app.models import Property
+    from app.services.currency import convert_to_usd
+
+    started = time.perf_counter()
+    props = Property.query.filter(Property.currency != 'USD').limit(limit).all()
+    for i, p in enumerate(props, 1):
+        p.price = convert_to_usd(p.price, p.currency)
+        p.currency = 'USD'
+        if i % 100 == 0:
+            db.session.commit()
+    db.session.commit()
+    return len(props) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200_000, help='Non-USD listings to seed')
+    parser.add_argument('--legacy-rows', type=int, default=20_000, help='Listings the row-by-row loop converts')
+    parser.add_argument('--database-url', default=None,
+                        help='An empty scratch database (tables are created); defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.models import Property
+    from app.services import currency
+    from config import Config
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            seed(db, args.rows)
+            print(f"seeded {args.rows} listings in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            stats = currency.reconvert_prices()
+            elapsed = time.perf_counter() - started
+            print(f"set-based:  {stats['converted']} converted in {elapsed:.2f}s → "
+                  f"{stats['converted'] / elapsed:9.0f} rows/s ({stats['unconverted']} unconverted)")
+
+            started = time.perf_counter()
+            currency.reconvert_prices()
+            print(f"replay:     {time.perf_counter() - started:.2f}s")
+
+            # The old loop needs rows it has not converted yet: put the originals back
+            db.session.execute(db.update(Property).values(price=Property.price_original,
+                                                          currency=Property.currency_original))
+            db.session.commit()
+            rate = legacy_convert(db, args.legacy_rows)
+            print(f"row-by-row: {rate:9.0f} rows/s over {args.legacy_rows} "
+                  f"(~{args.rows / rate:.0f}s for all {args.rows})")
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
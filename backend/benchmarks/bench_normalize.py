@@ -0,0 +1,107 @@
+"""
+Address normalizations per second: AddressNormalizer.normalize with the compiled
+single-pass translation regex against the previous implementation, which sorted the
+keys and compiled two regexes per key on every call (both with the memo bypassed),
+and normalize_many over the corpus with the memo. Also reports addresses whose
+candidates differ between the two implementations.
+
+    cd backend && python -m benchmarks.bench_normalize --repeat 20
+    cd backend && python -m benchmarks.bench_normalize --database-url postgresql://...   # stored addresses
+"""
+import argparse
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.services.address_normalizer import AddressNormalizer
+
+CORPUS = Path(__file__).parent / 'addresses.txt'
+
+
+def legacy_translate_full_string(cls, text: str) -> str:
+    """The per-call implementation this benchmark compares against."""
+    translations = cls._get_translations()
+    sorted_keys = sorted(translations.keys(), key=len, reverse=True)
+    for k in sorted_keys:
+        v = translations[k]
+        pattern = re.compile(r'(?<![а-яА-Яa-zA-ZїієґЇІЄҐ])' + re.escape(k) + r'(?![а-яА-Яa-zA-ZїієґЇІЄҐ])', re.IGNORECASE)
+        if pattern.search(text):
+            if any(marker in v.lower() for marker in ['вулиця', 'проспект', 'провулок', 'площа', 'майдан', 'бульвар']):
+                preceding_marker_pattern = re.compile(r'(?<![а-яА-Яa-zA-ZїієґЇІЄҐ])(улица|ул\.?|проспект|просп\.?|переулок|пер\.?|площадь|пл\.?|бульвар|б-р|шоссе|спуск|тупик)\s+' + re.escape(k) + r'(?![а-яА-Яa-zA-ZїієґЇІЄҐ])', re.IGNORECASE)
+                if preceding_marker_pattern.search(text):
+                    text = preceding_marker_pattern.sub(v, text)
+                    continue
+            text = pattern.sub(v, text)
+    return text
+
+
+@contextmanager
+def legacy_translation():
+    compiled = AddressNormalizer.__dict__['_translate_full_string']
+    AddressNormalizer._translate_full_string = classmethod(legacy_translate_full_string)
+    try:
+        yield
+    finally:
+        AddressNormalizer._translate_full_string = compiled
+
+
+def load_corpus(database_url=None, limit=None) -> list[str]:
+    if database_url:
+        from sqlalchemy import create_engine, text
+        with create_engine(database_url).connect() as conn:
+            rows = conn.execute(text("SELECT address FROM properties WHERE address IS NOT NULL LIMIT :n"),
+                                {'n': limit or 100_000})
+            return [row[0] for row in rows]
+    lines = CORPUS.read_text(encoding='utf-8').splitlines()
+    return [line for line in lines if line.strip() and not line.startswith('#')][:limit]
+
+
+def bench(corpus, repeat) -> float:
+    """Uncached normalizations/s."""
+    AddressNormalizer._normalize(corpus[0])    # build lazily-compiled state outside the timing
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for address in corpus:
+            AddressNormalizer._normalize(address)
+    return len(corpus) * repeat / (time.perf_counter() - started)
+
+
+def bench_memoized(corpus, repeat) -> float:
+    AddressNormalizer.clear_cache()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        AddressNormalizer.normalize_many(corpus)
+    return len(corpus) * repeat / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10, help='Passes over the corpus per implementation')
+    parser.add_argument('--database-url', default=None, help='Read addresses from the properties table instead')
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.database_url, args.limit)
+    print(f"{len(corpus)} addresses × {args.repeat} passes")
+
+    with legacy_translation():
+        legacy_rate = bench(corpus, args.repeat)
+        legacy_out = [AddressNormalizer._normalize(address) for address in corpus]
+    rate = bench(corpus, args.repeat)
+    out = [AddressNormalizer._normalize(address) for address in corpus]
+    memo_rate = bench_memoized(corpus, args.repeat)
+
+    print(f"legacy:   {legacy_rate:9.0f} normalizations/s")
+    print(f"compiled: {rate:9.0f} normalizations/s  ({rate / legacy_rate:.1f}x)")
+    print(f"memoized: {memo_rate:9.0f} normalizations/s  ({memo_rate / legacy_rate:.1f}x, "
+          f"{len(set(corpus))} distinct, normalize_many)")
+
+    differing = [(address, old, new) for address, old, new in zip(corpus, legacy_out, out) if old != new]
+    print(f"{len(differing)} of {len(corpus)} addresses normalize differently")
+    for address, old, new in differing[:20]:
+        print(f"  {address}\n    legacy:   {old}\n    compiled: {new}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Parsed pages per second: in-thread for each HTML backend, then ParsePool
+(default backend) with 1..N worker processes.
+
+    cd backend && python -m benchmarks.bench_parse --pages 400
+"""
+import argparse
+import time
+
+from app.services.html_backend import BACKENDS, LXML_AVAILABLE
+from app.services.parse_pool import ParsePool, SITE_PARSERS, default_process_count
+from benchmarks.sample_pages import sample_corpus
+
+
+def _process_counts(max_processes):
+    counts, n = [], 1
+    while n < max_processes:
+        counts.append(n)
+        n *= 2
+    return counts + [max_processes]
+
+
+def bench_inline(site_name, corpus, **parse_kwargs):
+    parse = SITE_PARSERS[site_name]
+    started = time.perf_counter()
+    for body, url in corpus:
+        parse(body, url, **parse_kwargs)
+    return len(corpus) / (time.perf_counter() - started)
+
+
+def bench_pool(site_name, corpus, processes):
+    with ParsePool(processes) as pool:
+        pool.warm()
+        started = time.perf_counter()
+        pool.map(site_name, corpus)
+        return len(corpus) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--max-processes', type=int, default=default_process_count())
+    parser.add_argument('--site', choices=list(SITE_PARSERS), action='append')
+    args = parser.parse_args()
+
+    for site_name in args.site or list(SITE_PARSERS):
+        corpus = sample_corpus(site_name, args.pages)
+        for backend in BACKENDS:
+            if backend == 'lxml' and not LXML_AVAILABLE:
+                continue
+            rate = bench_inline(site_name, corpus, backend=backend)
+            print(f"{site_name}: in-thread {backend:<11} {rate:8.1f} pages/s")
+        if site_name == 'bon_ua':
+            rate = bench_inline(site_name, corpus, targeted=False)
+            print(f"{site_name}: in-thread full document {rate:8.1f} pages/s (targeted parsing off)")
+
+        inline = bench_inline(site_name, corpus)
+        for processes in _process_counts(args.max_processes):
+            rate = bench_pool(site_name, corpus, processes)
+            print(f"{site_name}: {processes:2d} processes {rate:8.1f} pages/s  ({rate / inline:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+End-to-end scraper throughput against local replay servers (see replay_server.py):
+catalog discovery, detail fetches, parsing, validation, geocoding (Photon stand-in),
+currency conversion (NBU stand-in) and DB writes, with no traffic leaving the machine.
+
+Each pass walks the whole catalog (or the sitemap) through `_execute_scraping`. The first pass writes
+every listing; later passes re-scrape known listings (conditional fetch / unchanged
+path). Reports URLs/s, p50/p95 per pipeline stage and DB writes/s. Listings are
+written pending and geocoded afterwards by the geocode worker, timed separately.
+
+    cd backend && python -m benchmarks.bench_scrape --site bon_ua --listings 300 \\
+        --latency 0.05 --jitter 0.02 --error-rate 0.02 --passes 2
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.replay_server import ReplayServer
+
+SITES = ('meget', 'bon_ua')
+
+
+class WriteCounter:
+    """Counts INSERT/UPDATE/DELETE statements executed on an engine."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            with self._lock:
+                self.count += len(parameters) if executemany else 1
+
+
+def _point_env_at(servers):
+    """Redirects every external endpoint to the replay servers. Must run before app modules are imported."""
+    services = servers[None].url
+    os.environ['PHOTON_URL'] = services
+    os.environ['NBU_RATES_URL'] = f"{services}/NBUStatService/v1/statdirectory/exchange?json"
+    os.environ['OLLAMA_HOST'] = services
+    if 'meget' in servers:
+        os.environ['MEGET_BASE_URL'] = f"{servers['meget'].url}/prodazha-kvartir/"
+        os.environ['MEGET_SITEMAP_URL'] = f"{servers['meget'].url}/sitemap.xml"
+    if 'bon_ua' in servers:
+        os.environ['BON_UA_BASE_URL'] = servers['bon_ua'].url
+
+
+def run_pass(site, args, write_counter):
+    from app.commands import _discover, _execute_scraping
+    from app.services.rate_limiter import rate_limiter
+    from app.services.structured_data import fast_path_stats
+
+    rate_limiter.reset()
+    fast_path_stats.reset()
+    statuses = Counter()
+    pages = -(-args.listings // args.per_page) + 1
+    # Catalog passes re-walk everything; sitemap passes after the first only see changed URLs
+    urls = _discover(site, args.discover, pages, full=args.discover == 'catalog')
+
+    writes_before = write_counter.count
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output) if not args.verbose else contextlib.nullcontext():
+        pipeline = _execute_scraping(
+            urls, args.workers, site, on_result=lambda r: statuses.update([r['status']]),
+            parse_pool=args.parse_pool,
+        )
+    elapsed = time.perf_counter() - started
+    return pipeline, statuses, elapsed, write_counter.count - writes_before
+
+
+def report(label, pipeline, statuses, elapsed, writes, server):
+    total = sum(statuses.values())
+    print(f"\n{label}: {total} URLs in {elapsed:.2f}s → {total / elapsed:.1f} URLs/s, "
+          f"{writes} DB writes ({writes / elapsed:.1f}/s)")
+    print("  results: " + ", ".join(f"{k} {v}" for k, v in sorted(statuses.items())))
+    print(f"  {'stage':<10}{'items':>7}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}")
+    for name, stats in pipeline.stats.items():
+        p50, p95 = stats.percentile(0.5), stats.percentile(0.95)
+        if p50 is None:
+            continue
+        print(f"  {name:<10}{stats.count:>7}{p50 * 1000:>9.1f}{p95 * 1000:>9.1f}{stats.errors:>8}")
+    print("  server: " + ", ".join(f"{k} {v}" for k, v in sorted(server.counts.items())))
+    server.counts.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--site', choices=SITES, action='append')
+    parser.add_argument('--listings', type=int, default=200, help='Listings served per site')
+    parser.add_argument('--per-page', type=int, default=20, help='Listings per catalog page')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--passes', type=int, default=2)
+    parser.add_argument('--discover', choices=('catalog', 'sitemap'), default='catalog')
+    parser.add_argument('--parse-pool', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.02, help='Mean injected response delay, seconds')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of responses replaced by a 503')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of responses replaced by a 429')
+    parser.add_argument('--geocode-latency', type=float, default=0.02)
+    parser.add_argument('--database-url', default=None,
+                        help='An empty scratch database (tables are created); defaults to a temporary SQLite file')
+    parser.add_argument('--archive', action='store_true', help='Archive fetched pages (temporary directory)')
+    parser.add_argument('--production-limits', action='store_true',
+                        help='Keep the production rate limiter settings instead of lifting them')
+    parser.add_argument('--verbose', action='store_true', help='Show the scraper output')
+    args = parser.parse_args()
+    site_names = args.site or list(SITES)
+
+    fault = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    servers = {name: ReplayServer(name, args.listings, args.per_page, **fault).start() for name in site_names}
+    servers[None] = ReplayServer(None, latency=args.geocode_latency, jitter=args.geocode_latency / 2).start()
+    _point_env_at(servers)
+
+    from sqlalchemy import event
+    from app import create_app, db
+    from app.services.rate_limiter import rate_limiter
+    from app.services.scrape_pipeline import SITES as SCRAPER_SITES
+    from config import Config
+
+    if not args.production_limits:
+        # Measure the pipeline, not the politeness limits
+        rate_limiter.initial_rate = rate_limiter.max_rate = 10_000.0
+        rate_limiter.burst = 1_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            HTML_ARCHIVE_DIR = os.path.join(tmp, 'archive') if args.archive else ''
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            write_counter = WriteCounter()
+            event.listen(db.engine, 'before_cursor_execute', write_counter)
+
+            for name in site_names:
+                for n in range(1, args.passes + 1):
+                    label = f"{name} pass {n} ({'cold' if n == 1 else 'known listings'})"
+                    pipeline, statuses, elapsed, writes = run_pass(SCRAPER_SITES[name], args, write_counter)
+                    report(label, pipeline, statuses, elapsed, writes, servers[name])
+
+            from app.commands import _run_geocode_worker
+            output = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(output) if not args.verbose else contextlib.nullcontext():
+                geocoded = _run_geocode_worker(args.workers)
+            elapsed = time.perf_counter() - started
+            jobs = sum(geocoded.values())
+            print(f"\ngeocode worker: {jobs} jobs in {elapsed:.2f}s → {jobs / elapsed:.1f} jobs/s "
+                  f"({geocoded['found']} found, {geocoded['error']} errors)")
+
+            services = servers[None].counts
+            print("\nservices: " + ", ".join(f"{k} {v}" for k, v in sorted(services.items())))
+            event.remove(db.engine, 'before_cursor_execute', write_counter)
+            if not args.database_url:
+                db.session.remove()
+                db.engine.dispose()
+
+    for server in servers.values():
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
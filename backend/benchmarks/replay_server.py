@@ -0,0 +1,281 @@
+"""
+Local stand-in for every host the scraper talks to, for reproducible offline runs.
+
+One ReplayServer per host role, each on its own port so the per-host rate limiter
+sees separate hosts:
+
+  site='meget'   catalog /prodazha-kvartir/[show/N/], details /prodazha-kvartir/details/ID/
+  site='bon_ua'  catalog /nedvizhimost/prodazha-kvartir?page=N, details /obyavlenie/ID
+  both sites     /sitemap.xml (index) -> /sitemap-N.xml and /sitemap-N.xml.gz, with <lastmod>
+  site=None      Photon /api/?q=..., the NBU /NBUStatService/v1/statdirectory/exchange and
+                 Ollama /api/tags, POST /api/generate (answers from the listing text by rule)
+
+Detail pages are the synthetic pages from sample_pages, served with an ETag (and 304
+on If-None-Match). Every request can be delayed (`latency` ± `jitter` seconds) and
+failed with a 503 (`error_rate`) or a 429 (`throttle_rate`).
+"""
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.sample_pages import SITE_PAGES
+
+NBU_RATES = [
+    {'r030': 840, 'txt': 'Долар США', 'rate': 41.25, 'cc': 'USD', 'exchangedate': '01.01.2026'},
+    {'r030': 978, 'txt': 'Євро', 'rate': 44.9, 'cc': 'EUR', 'exchangedate': '01.01.2026'},
+]
+SITEMAP_EPOCH = datetime(2026, 1, 1)
+
+
+class ReplayServer:
+    def __init__(self, site=None, listings=200, per_page=20, sitemap_size=500,
+                 latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, seed=0, ollama_model='gemma3:4b'):
+        self.site = site
+        self.ollama_model = ollama_model
+        self.listings = listings
+        self.per_page = per_page
+        self.sitemap_size = sitemap_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+
+        self.counts = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=f'replay-{self.site}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- fault injection ---
+
+    def _fault(self) -> int | None:
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.latency else 0.0
+            roll = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.error_rate:
+            return 503
+        if roll < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+    # --- content ---
+
+    def _detail_path(self, listing_id) -> str:
+        if self.site == 'meget':
+            return f"/prodazha-kvartir/details/{listing_id}/"
+        return f"/obyavlenie/{listing_id}"
+
+    def _detail(self, listing_id) -> bytes | None:
+        if not 0 <= listing_id < self.listings:
+            return None
+        with self._lock:
+            body = self._pages.get(listing_id)
+            if body is None:
+                body = self._pages[listing_id] = SITE_PAGES[self.site](listing_id).encode('utf-8')
+        return body
+
+    def _catalog(self, page) -> bytes:
+        first = (page - 1) * self.per_page
+        ids = range(first, min(first + self.per_page, self.listings))
+        if self.site == 'meget':
+            cards = "".join(f'<div class="offer"><a href="{self._detail_path(i)}">Квартира {i}</a></div>' for i in ids)
+        else:
+            cards = "".join(
+                f'<div class="msg-inner"><a class="w-image" href="{self._detail_path(i)}"><img src="/t/{i}.jpg"></a></div>'
+                for i in ids
+            )
+        return f"<html><body><div class='catalog'>{cards}</div></body></html>".encode('utf-8')
+
+    def _sitemap_count(self) -> int:
+        return max(1, -(-self.listings // self.sitemap_size))
+
+    def _sitemap_index(self) -> bytes:
+        entries = "".join(
+            f"<sitemap><loc>{self.url}/sitemap-{n}.xml.gz</loc></sitemap>" for n in range(1, self._sitemap_count() + 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'
+        ).encode('utf-8')
+
+    def _sitemap(self, n) -> bytes | None:
+        if not 1 <= n <= self._sitemap_count():
+            return None
+        first = (n - 1) * self.sitemap_size
+        entries = "".join(
+            f"<url><loc>{self.url}{self._detail_path(i)}</loc>"
+            f"<lastmod>{(SITEMAP_EPOCH + timedelta(hours=i)).isoformat()}+00:00</lastmod></url>"
+            for i in range(first, min(first + self.sitemap_size, self.listings))
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'
+        ).encode('utf-8')
+
+    def _photon(self, query) -> bytes:
+        from app.services.cities import CITIES
+
+        lowered = query.lower()
+        city = next(
+            (name for name, info in CITIES.items()
+             if name.lower() in lowered or any(a.lower() in lowered for a in info.get('aliases', []))),
+            'Київ',
+        )
+        info = CITIES[city]
+        # Deterministic point within a few km of the city centre
+        h = int(hashlib.md5(query.encode('utf-8')).hexdigest()[:8], 16)
+        lat = info['lat'] + ((h % 1000) - 500) / 25000
+        lng = info['lng'] + (((h // 1000) % 1000) - 500) / 25000
+        feature = {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [lng, lat]},
+            'properties': {'name': query.split(',')[0].strip(), 'city': city, 'country': 'Україна'},
+        }
+        return json.dumps({'type': 'FeatureCollection', 'features': [feature]}, ensure_ascii=False).encode('utf-8')
+
+    def _ollama_extract(self, text) -> dict:
+        from app.services.address_normalizer import AddressNormalizer
+        from app.services.cities import CITIES
+
+        text = text.split('\nRules:')[0]
+        city = next(
+            (name for name, info in CITIES.items() if name in text or any(a in text for a in info.get('aliases', []))),
+            None,
+        )
+        street, number = AddressNormalizer.extract_from_text(text), None
+        if street:
+            match = re.match(r'(.*?)[\s,]+(\d+\S*)$', street)
+            if match:
+                street, number = match.groups()
+        return {'city': city, 'street': street, 'number': number, 'district': None, 'region': None}
+
+    def _ollama(self, request) -> bytes:
+        prompt = request.get('prompt', '')
+        listings = re.split(r'^### Listing \d+$', prompt, flags=re.MULTILINE)
+        if len(listings) > 1:
+            answer = {'results': [self._ollama_extract(text) for text in listings[1:]]}
+        else:
+            answer = self._ollama_extract(prompt)
+        return json.dumps({'model': request.get('model'), 'response': json.dumps(answer, ensure_ascii=False),
+                           'done': True}, ensure_ascii=False).encode('utf-8')
+
+    def route(self, path, query) -> tuple[str, int, bytes | None, str]:
+        """(route kind, status, body, content type) for a request path and parsed query string."""
+        if self.site is None:
+            if path == '/api/tags':
+                models = {'models': [{'name': self.ollama_model}]}
+                return 'ollama_tags', 200, json.dumps(models).encode('utf-8'), 'application/json'
+            if path.startswith('/api'):
+                return 'geocode', 200, self._photon(query.get('q', [''])[0]), 'application/json'
+            if path.startswith('/NBUStatService'):
+                return 'rates', 200, json.dumps(NBU_RATES, ensure_ascii=False).encode('utf-8'), 'application/json'
+            return 'other', 404, None, 'text/plain'
+
+        if path == '/sitemap.xml':
+            return 'sitemap', 200, self._sitemap_index(), 'application/xml'
+        if path.startswith('/sitemap-'):
+            name = path[len('/sitemap-'):]
+            gzipped = name.endswith('.gz')
+            number = name.split('.')[0]
+            body = self._sitemap(int(number)) if number.isdigit() else None
+            if body is None:
+                return 'sitemap', 404, None, 'text/plain'
+            if gzipped:
+                return 'sitemap', 200, gzip.compress(body), 'application/gzip'
+            return 'sitemap', 200, body, 'application/xml'
+
+        if self.site == 'meget':
+            if path.startswith('/prodazha-kvartir/details/'):
+                listing_id = path.rstrip('/').rsplit('/', 1)[-1]
+                body = self._detail(int(listing_id)) if listing_id.isdigit() else None
+                return 'detail', 200 if body else 404, body, 'text/html; charset=utf-8'
+            if path.startswith('/prodazha-kvartir'):
+                parts = [p for p in path.split('/') if p]
+                page = int(parts[2]) if len(parts) >= 3 and parts[1] == 'show' and parts[2].isdigit() else 1
+                return 'catalog', 200, self._catalog(page), 'text/html; charset=utf-8'
+        else:
+            if path.startswith('/obyavlenie/'):
+                listing_id = path.rsplit('/', 1)[-1]
+                body = self._detail(int(listing_id)) if listing_id.isdigit() else None
+                return 'detail', 200 if body else 404, body, 'text/html; charset=utf-8'
+            if path.startswith('/nedvizhimost/prodazha-kvartir'):
+                page = query.get('page', ['1'])[0]
+                return 'catalog', 200, self._catalog(int(page) if page.isdigit() else 1), 'text/html; charset=utf-8'
+        return 'other', 404, None, 'text/plain'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                self._respond(*server.route(parsed.path, parse_qs(parsed.query)))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if server.site is None and urlparse(self.path).path == '/api/generate':
+                    self._respond('ollama', 200, server._ollama(request), 'application/json')
+                else:
+                    self._respond('other', 404, None, 'text/plain')
+
+            def _respond(self, kind, status, body, content_type):
+                fault = server._fault()
+                etag = f'"{hashlib.sha1(body).hexdigest()}"' if body and kind == 'detail' else None
+                if fault:
+                    status, body = fault, b'Service Unavailable' if fault == 503 else b'Too Many Requests'
+                    content_type = 'text/plain'
+                elif etag and self.headers.get('If-None-Match') == etag:
+                    status, body = 304, None
+
+                with server._lock:
+                    server.counts[kind] += 1
+                    server.counts[f'status_{status}'] += 1
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                if etag and status in (200, 304):
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body or b'')))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
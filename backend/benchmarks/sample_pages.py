@@ -0,0 +1,107 @@
+"""
+Synthetic listing pages shaped like the real meget.kiev.ua and bon.ua detail pages:
+the same containers the parsers look at, surrounded by the header, footer, related
+offers, banners and inline scripts that make up most of a real page's weight.
+"""
+import random
+
+STREETS = [
+    ('вул. Хрещатик', 'Київ'), ('просп. Перемоги', 'Київ'), ('вул. Сумська', 'Харків'),
+    ('ул. Пушкинская', 'Харків'), ('вул. Городоцька', 'Львів'), ('вул. Дерибасівська', 'Одеса'),
+    ('ул. Московская', 'Київ'), ('просп. Науки', 'Харків'), ('вул. Шевченка', 'Львів'),
+]
+DISTRICTS = ['Печерський р-н', 'Шевченківський р-н', 'Київський р-н', 'Галицький р-н']
+
+
+def _spaced(amount):
+    return f"{amount:,}".replace(',', ' ')
+
+
+def _filler_blocks(rng, count, css_class):
+    blocks = []
+    for i in range(count):
+        street, city = rng.choice(STREETS)
+        blocks.append(
+            f'<div class="{css_class}"><a href="/offer/{rng.randint(1000, 99999)}">'
+            f'<img src="/thumbs/{i}.jpg"><span>{city}, {street} {rng.randint(1, 150)}</span>'
+            f'<b>{rng.randint(20, 200) * 1000} $</b><p>{"Опис пропозиції. " * 12}</p></a></div>'
+        )
+    return "\n".join(blocks)
+
+
+def _script(rng):
+    return f"<script>window.__STATE__ = {{token: '{rng.getrandbits(64):x}', items: [{','.join(str(rng.randint(0, 9)) for _ in range(400))}]}};</script>"
+
+
+def meget_page(seed=0):
+    rng = random.Random(seed)
+    street, city = rng.choice(STREETS)
+    rooms = rng.randint(1, 4)
+    number = rng.randint(1, 120)
+    area = rng.randint(25, 140)
+    price = rng.randint(800, 9000) * 1000
+    images = "".join(f'<img src="/photos/{seed}/{i}.jpg">' for i in range(rng.randint(3, 12)))
+    return f"""<!DOCTYPE html><html><head><title>Продажа квартиры</title>{_script(rng)}</head><body>
+<div class="header"><nav>{'<a href="/menu">Меню</a>' * 40}</nav></div>
+<div class="bottom-header">{'<a href="/cat">Категорія</a>' * 20}</div>
+<div class="breadcrumbs"><ul><li><a href="/">Главная</a></li><li><a href="/prodazha-kvartir/">Продажа квартир</a></li>
+<li><a href="/c/">{city}</a></li><li><a href="/d/">{rng.choice(DISTRICTS)}</a></li></ul></div>
+<h1>Продам {rooms}-к квартиру, {street} {number}</h1>
+<span id="price_uah">{_spaced(price)} грн</span>
+<address class="address-sec"><h2><a href="#">{city}</a>, <a href="#">{rng.choice(DISTRICTS)}</a>, {street}, {number}</h2></address>
+<div class="photo-gallery-area">{images}</div>
+<div class="params"><div>Площадь: {area} м2</div><div>Этаж: {rng.randint(1, 25)}</div></div>
+<div class="description">{"Продається квартира в гарному стані, поруч метро та парк. " * 30}</div>
+<div class="banner">{'<img src="/banner.gif">' * 5}</div>
+<div class="gradblock-area">{'<span>реклама</span>' * 30}</div>
+<div class="similar-offers">{_filler_blocks(rng, 20, 'offer')}</div>
+<div class="simple-offers">{_filler_blocks(rng, 20, 'offer')}</div>
+<div class="popular">{_filler_blocks(rng, 15, 'offer')}</div>
+<div class="footer">{'<a href="/f">Посилання</a>' * 80}</div>
+{_script(rng)}</body></html>"""
+
+
+def bon_ua_page(seed=0):
+    rng = random.Random(seed)
+    street, city = rng.choice(STREETS)
+    rooms = rng.randint(1, 4)
+    area = rng.randint(25, 140)
+    price = rng.randint(20, 250) * 1000
+    images = "".join(f'<div class="item-image"><img data-src="/img/{seed}/{i}.jpg"></div>' for i in range(rng.randint(2, 10)))
+    related = "\n".join(
+        f'<div class="msg-inner"><a class="w-image" href="/obyavlenie/{rng.randint(10**6, 10**7)}">'
+        f'<img src="/t/{i}.jpg"></a><div class="price">{rng.randint(20, 200)} 000 $</div>'
+        f'<p>{"Схожа пропозиція. " * 10}</p></div>'
+        for i in range(rng.randint(3, 6))
+    )
+    return f"""<!DOCTYPE html><html><head><title>{rooms}-кімнатна квартира</title>
+<meta property="og:image" content="/og/{seed}.jpg">{_script(rng)}</head><body>
+<header>{'<a href="/menu">Меню</a>' * 60}</header>
+<div class="card-container"><div class="card-breadcrumbs"><a href="/">Головна</a><a href="/n">Нерухомість</a>
+<a href="/o">{city}ська область</a><a href="/c">{city}</a><a href="/d">{rng.choice(DISTRICTS)}</a></div>
+<h1 class="card-title">Продам {rooms}-кімнатну квартиру, {street} {rng.randint(1, 120)}</h1>
+<div class="card-body"><div class="card-price">{_spaced(price)} $</div>
+<ul class="params"><li>Кількість кімнат: {rooms}</li><li>Загальна площа: {area} м²</li><li>Поверх: {rng.randint(1, 25)}</li></ul>
+<div class="gallery">{images}</div>
+<div class="description">{"Квартира з ремонтом, меблями та технікою. " * 30}</div></div></div>
+<section class="related">{related}</section>
+<footer>{'<a href="/f">Посилання</a>' * 120}</footer>
+{_script(rng)}</body></html>"""
+
+
+SITE_PAGES = {
+    'meget': meget_page,
+    'bon_ua': bon_ua_page,
+}
+
+
+def sample_corpus(site_name, count, encode=False):
+    """`count` (body, url) pairs for a site; meget bodies are bytes like the real client returns."""
+    make = SITE_PAGES[site_name]
+    corpus = []
+    for seed in range(count):
+        body = make(seed)
+        if encode or site_name == 'meget':
+            body = body.encode('utf-8')
+        corpus.append((body, f"https://{site_name}.example/listing/{seed}"))
+    return corpus
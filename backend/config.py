@@ -3,11 +3,30 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+basedir = os.path.abspath(os.path.dirname(__file__))
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default-dev-key')
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Compressed archive of fetched listing pages (see `flask reparse`); empty disables it
+    HTML_ARCHIVE_DIR = os.getenv('HTML_ARCHIVE_DIR', os.path.join(basedir, 'data', 'html_archive'))
+    # Geocoding cache lifetimes; misses expire sooner so new buildings get picked up
+    GEOCODE_CACHE_TTL_DAYS = int(os.getenv('GEOCODE_CACHE_TTL_DAYS', 90))
+    GEOCODE_MISS_TTL_DAYS = int(os.getenv('GEOCODE_MISS_TTL_DAYS', 7))
+    # Offline street/house-number index built by `flask load-gazetteer`; tried before Photon
+    GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', os.path.join(basedir, 'data', 'gazetteer.sqlite'))
+    # District boundaries (GeoJSON) for filling Property.district from coordinates
+    DISTRICTS_PATH = os.getenv('DISTRICTS_PATH', os.path.join(basedir, 'data', 'districts.geojson'))
+    # Settlements (name, oblast, coordinates, aliases) built by `flask load-settlements`; extends cities.CITIES
+    SETTLEMENTS_PATH = os.getenv('SETTLEMENTS_PATH', os.path.join(basedir, 'data', 'settlements.tsv.gz'))
+    # Last tier of the address cascade: ask the local Ollama model about listings still without a street address
+    ADDRESS_LLM_TIER = os.getenv('ADDRESS_LLM_TIER', '0') == '1'
 
 class TestConfig(Config):
     TESTING = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    HTML_ARCHIVE_DIR = ''
+    GAZETTEER_PATH = ''
+    DISTRICTS_PATH = ''
+    SETTLEMENTS_PATH = ''
\ No newline at end of file
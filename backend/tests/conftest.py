@@ -0,0 +1,20 @@
+import pytest
+from app import create_app, db
+from config import TestConfig
+
+
+@pytest.fixture
+def app_config():
+    """The config class `app_ctx` builds the app from; override it in a test module to change it."""
+    return TestConfig
+
+
+@pytest.fixture
+def app_ctx(app_config):
+    """An app built from `app_config`, inside its app context, with the tables created and dropped afterwards."""
+    app = create_app(app_config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,135 @@
+from pathlib import Path
+
+import pytest
+from app import create_app
+from app.services import address_cascade, ai_address_parser, gazetteer
+from app.services.address_cascade import ListingText, cascade_stats, score_address
+from app.services.ai_address_parser import AIAddressParser
+from app.services.scrape_pipeline import ScrapeRun, ScrapeTask
+from benchmarks.replay_server import ReplayServer
+from config import TestConfig
+
+CSV = Path(__file__).parent / 'fixtures' / 'gazetteer.csv'
+
+
+class LLMTierConfig(TestConfig):
+    ADDRESS_LLM_TIER = True
+
+
+@pytest.fixture
+def app_config():
+    return LLMTierConfig
+
+
+@pytest.fixture
+def app_ctx(app_ctx, tmp_path):
+    path = str(tmp_path / 'gazetteer.sqlite')
+    gazetteer.load_csv([CSV], path)
+    app_ctx.config['GAZETTEER_PATH'] = path
+    cascade_stats.reset()
+    yield app_ctx
+    cascade_stats.reset()
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    AIAddressParser.reset()
+    with ReplayServer(None) as server:
+        monkeypatch.setattr(ai_address_parser, 'OLLAMA_HOST', server.url)
+        yield server
+    AIAddressParser.reset()
+
+
+def _finish(listing):
+    data = {'address': None, 'city': listing.city, 'district': None, 'region': None}
+    best, data['address_cascade'] = address_cascade.extract(listing)
+    if best:
+        data['address'] = best.address
+    address_cascade.finish(data)
+    return data
+
+
+@pytest.mark.parametrize('address, city, expected', [
+    ('Київ, вул. Хрещатик, 22', 'Київ', 0.9),
+    ('вул. Хрещатик', 'Київ', 0.65),          # no house number
+    ('Хрещатик 22', None, 0.6),               # no city; a bare name with a number still counts as a street
+    ('Київ', 'Київ', 0.3),
+    ('', 'Київ', 0.0),
+])
+def test_score_address(address, city, expected):
+    assert score_address(address, city) == expected
+
+
+def test_cascade_stops_at_first_confident_tier():
+    listing = ListingText(title='Квартира, вул. Сумська 61', city='Харків',
+                          structured_address='вул. Хрещатик 22')
+    best, state = address_cascade.extract(listing)
+    assert (best.address, best.tier, best.confidence) == ('вул. Хрещатик 22', 'structured', 0.95)
+    assert state['trace'] == [['structured', 0.95]]
+    assert 'listing' not in state                            # nothing left for the pipeline to do
+
+
+def test_description_matches_score_lower_and_can_be_skipped():
+    listing = ListingText(title='Продам квартиру', description='Київ, вул. Хрещатик 22, поруч метро', city='Київ')
+    best, state = address_cascade.extract(listing)
+    assert (best.tier, best.confidence) == ('regex', 0.75)
+    assert state['trace'] == [['structured', None], ['regex', 0.75]]
+
+    best, state = address_cascade.extract(listing._replace(scan_description=False))
+    assert best is None
+    assert state['listing']['title'] == 'Продам квартиру'
+
+
+def test_gazetteer_confirms_a_bare_street_name(app_ctx):
+    # No street type, no number: 0.35, below the threshold until the gazetteer knows the street
+    data = _finish(ListingText(title='Продам квартиру', city='Київ', structured_address='Хрещатик'))
+    assert data['address'] == 'Хрещатик'                    # confirmed, not rewritten
+    assert 'address_cascade' not in data
+
+    s = cascade_stats.snapshot()
+    assert s['listings'] == 1
+    assert s['tiers']['structured'] == {**s['tiers']['structured'], 'runs': 1, 'found': 1, 'used': 0}
+    assert s['tiers']['gazetteer']['used'] == 1
+    assert 'llm' not in s['tiers']                           # 0.8 from the gazetteer is enough
+
+
+def test_llm_tier_places_what_the_page_text_does_not(app_ctx, ollama):
+    listing = ListingText(title='Продам 2к квартиру', description='Київ, вул. Хрещатик 25, центр.',
+                          scan_description=False)
+    data = _finish(listing)
+    assert data['address'] == 'Київ, вул. Хрещатик, 25'
+    assert data['city'] == 'Київ'
+    assert ollama.counts['ollama'] == 1
+
+    s = cascade_stats.snapshot()
+    assert s['tiers']['llm'] == {**s['tiers']['llm'], 'runs': 1, 'found': 1, 'used': 1}
+    assert s['tiers']['llm']['p50'] is not None
+    assert s['tiers']['regex']['found'] == 0
+
+
+def test_pipeline_batches_llm_prompts(app_ctx, ollama):
+    descriptions = ['Київ, вул. Хрещатик 25, центр.', 'Харків, вул. Сумська 61, біля парку.', 'Гарний ремонт.']
+    tasks = []
+    for n, description in enumerate(descriptions):
+        listing = ListingText(title='Продам квартиру', description=description, scan_description=False)
+        data = {'address': None, 'city': None, 'district': None, 'region': None}
+        _, data['address_cascade'] = address_cascade.extract(listing)
+        tasks.append(ScrapeTask(url=f'u{n}', data=data))
+    tasks.append(ScrapeTask(url='gone', outcome='expired'))
+
+    assert ScrapeRun().resolve_addresses(tasks) == tasks
+    assert [task.data and task.data['address'] for task in tasks] == [
+        'Київ, вул. Хрещатик, 25', 'Харків, вул. Сумська, 61', None, None]
+    assert ollama.counts['ollama'] == 1                     # three listings, one prompt
+    assert cascade_stats.snapshot()['tiers']['llm']['runs'] == 3
+    assert 'address' in [stage.name for stage in ScrapeRun().stages(4)]
+
+def test_llm_tier_off_by_default():
+    app = create_app(TestConfig)
+    with app.app_context():
+        best, state = address_cascade.extract(ListingText(title='Продам квартиру', description='Гарний ремонт'))
+        assert best is None
+        data = {'address': None, 'address_cascade': state}
+        address_cascade.finish(data)
+    assert data == {'address': None}
+    cascade_stats.reset()
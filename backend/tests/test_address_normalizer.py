@@ -14,6 +14,12 @@ class TestAddressNormalizer:
         assert AddressNormalizer._translate_full_string("Магнитогорская") == "Якова Гніздовського"
         assert AddressNormalizer._translate_full_string("площадь Победы") == "площа Победы" 
 
+    def test_translate_full_string_single_pass(self):
+        # A marker before a key whose value carries its own marker is consumed with the key
+        assert AddressNormalizer._translate_full_string("переулок Ленина") == "вулиця Соборна"
+        # Longest key wins, and replaced text is not translated again
+        assert AddressNormalizer._translate_full_string("ул. Московская 77") == "вулиця Князів Острозьких 77"
+
     def test_process_street_part(self):
         # Initial inversion
         assert AddressNormalizer._process_street_part("Шевченко Т.") == "Т. Шевченко"
@@ -38,3 +44,21 @@ class TestAddressNormalizer:
         text2 = "Чудова квартира на пр-т Перемоги 10/1"
         extracted2 = AddressNormalizer.extract_from_text(text2)
         assert extracted2 == "пр-т Перемоги 10/1"
+
+    def test_normalize_many_dedupes_and_memoizes(self):
+        AddressNormalizer.clear_cache()
+        addresses = ["Київ, вул. Магнитогорская, 1а", "Харків, ул. Сумская 25", "Київ, вул. Магнитогорская, 1а"]
+        results = AddressNormalizer.normalize_many(addresses)
+
+        assert results == [AddressNormalizer._normalize(a) for a in addresses]
+        assert AddressNormalizer.cache_stats()['normalize']['misses'] == 2
+        # Callers get their own lists, the memo is not shared state
+        results[0].append('changed')
+        assert 'changed' not in AddressNormalizer.normalize(addresses[0])
+        assert AddressNormalizer.cache_stats()['normalize']['hits'] == 1
+
+    def test_extract_from_text_memoized(self):
+        AddressNormalizer.clear_cache()
+        text = "Продам квартиру, вул. Хрещатик 25, центр."
+        assert AddressNormalizer.extract_from_text(text) == AddressNormalizer.extract_from_text(text)
+        assert AddressNormalizer.cache_stats()['extract_from_text']['hits'] == 1
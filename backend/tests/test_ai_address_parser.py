@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from app.models import AddressExtraction
+from app.services import ai_address_parser
+from app.services.ai_address_parser import AIAddressParser
+from benchmarks.replay_server import ReplayServer
+
+LISTINGS = [
+    ("Продам 2к квартиру", "Київ, вул. Хрещатик 25, центр.", ""),
+    ("Продам 1к квартиру", "Харків, вул. Сумська 61, біля парку.", ""),
+    ("Квартира у Львові", "Львів, вул. Городоцька 120.", ""),
+    ("Квартира без адреси", "Гарний ремонт, поруч школа.", ""),
+]
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    AIAddressParser.reset()
+    with ReplayServer(None) as server:
+        monkeypatch.setattr(ai_address_parser, 'OLLAMA_HOST', server.url)
+        yield server
+    AIAddressParser.reset()
+
+
+def test_parse_many_batches_dedupes_and_caches(app_ctx, ollama):
+    listings = LISTINGS + [LISTINGS[0], LISTINGS[1]]
+    results = AIAddressParser.parse_many(listings, batch_size=4)
+
+    assert [r and r['city'] for r in results] == ['Київ', 'Харків', 'Львів', None, 'Київ', 'Харків']
+    assert results[0]['street'] == 'вул. Хрещатик' and results[0]['number'] == '25'
+    assert ollama.counts['ollama'] == 1                     # four distinct listings, one prompt
+    assert AddressExtraction.query.count() == 4
+    assert AddressExtraction.query.filter_by(outcome='empty').count() == 1
+
+    # Second pass: all answers, including the empty one, come from the cache
+    again = AIAddressParser.parse_many(listings)
+    assert again == results
+    assert ollama.counts['ollama'] == 1
+    assert AIAddressParser.stats()['cache_hits'] == 6
+
+
+def test_parse_single_listing(app_ctx, ollama):
+    data = AIAddressParser.parse(*LISTINGS[2])
+    assert data['city'] == 'Львів'
+    assert ollama.counts['ollama_tags'] == 1
+    assert AIAddressParser.parse(*LISTINGS[2]) == data
+    assert ollama.counts['ollama'] == 1
+
+
+def test_failures_open_the_circuit(ollama):
+    ollama.error_rate = 1.0                                 # every response is a 503
+    assert AIAddressParser.parse_many(LISTINGS[:1]) == [None]
+    assert AIAddressParser.parse_many(LISTINGS[1:2]) == [None]
+    assert AIAddressParser.parse_many(LISTINGS[2:3]) == [None]
+    assert AIAddressParser.limiter.circuit(ollama.url) == 'open'
+    probes = ollama.counts['ollama_tags']
+
+    # While open, nothing reaches the server, not even the availability probe
+    assert AIAddressParser.parse_many(LISTINGS) == [None] * 4
+    assert ollama.counts['ollama_tags'] == probes
+    assert ollama.counts['ollama'] == 0
+
+
+def test_unreachable_ollama_is_not_reprobed_every_call(monkeypatch):
+    AIAddressParser.reset()
+    server = ReplayServer(None).start()
+    url = server.url
+    server.stop()
+    monkeypatch.setattr(ai_address_parser, 'OLLAMA_HOST', url)
+
+    for listing in LISTINGS * 3:
+        assert AIAddressParser.parse(*listing) is None
+    assert AIAddressParser.limiter.circuit(url) == 'open'
+    assert AIAddressParser.limiter.snapshot()[url.split('://', 1)[1]]['errors'] == 3
+    AIAddressParser.reset()
+
+
+def test_unparseable_answer_is_not_cached(app_ctx, ollama, monkeypatch):
+    answer = {'model': 'gemma3:4b', 'response': '{"city": "Київ", "street"', 'done': True}
+    monkeypatch.setattr(ollama, '_ollama', lambda request: json.dumps(answer).encode('utf-8'))
+    assert AIAddressParser.parse(*LISTINGS[0]) is None
+    assert AddressExtraction.query.count() == 0
+    assert AIAddressParser.limiter.circuit(ollama.url) == 'closed'
+
+    # Once the model answers properly, the listing is asked about again
+    monkeypatch.undo()
+    monkeypatch.setattr(ai_address_parser, 'OLLAMA_HOST', ollama.url)
+    assert AIAddressParser.parse(*LISTINGS[0])['city'] == 'Київ'
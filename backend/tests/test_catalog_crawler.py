@@ -0,0 +1,35 @@
+from app.services.catalog_crawler import iter_catalog
+
+
+def _catalog(pages):
+    calls = []
+
+    def get_listing_urls(page=1):
+        calls.append(page)
+        return pages.get(page, [])
+    return get_listing_urls, calls
+
+
+def test_incremental_stops_at_page_without_unseen_urls():
+    get_urls, calls = _catalog({1: ['a', 'b'], 2: ['c', 'd'], 3: ['e'], 4: ['f']})
+    known = {'c', 'd', 'e'}
+
+    urls = list(iter_catalog(get_urls, 4, known_filter=lambda batch: known & set(batch)))
+
+    assert calls == [1, 2]
+    assert urls == ['a', 'b', 'c', 'd']
+
+
+def test_incremental_stops_on_empty_page():
+    get_urls, calls = _catalog({1: ['a']})
+    assert list(iter_catalog(get_urls, 5, known_filter=lambda batch: set())) == ['a']
+    assert calls == [1, 2]
+
+
+def test_full_walks_all_pages():
+    get_urls, calls = _catalog({1: ['a', 'b'], 2: ['b', 'c'], 4: ['d']})
+
+    urls = list(iter_catalog(get_urls, 4, known_filter=lambda batch: set(batch), full=True))
+
+    assert calls == [1, 2, 3, 4]
+    assert urls == ['a', 'b', 'c', 'd']
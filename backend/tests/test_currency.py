@@ -0,0 +1,132 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from app import db
+from app.models import ExchangeRate, Property
+from app.services import currency
+from benchmarks.replay_server import ReplayServer
+
+NBU = {'USD': 41.25, 'EUR': 44.9}           # what replay_server.NBU_RATES answers
+
+
+@pytest.fixture
+def app_ctx(app_ctx):
+    currency.reset()
+    yield app_ctx
+    currency.reset()
+
+
+@pytest.fixture
+def nbu(monkeypatch):
+    with ReplayServer(None) as server:
+        monkeypatch.setattr(currency, 'NBU_RATES_URL', f"{server.url}/NBUStatService/v1/statdirectory/exchange?json")
+        yield server
+
+
+def _wait_for_refresh():
+    if currency._refresh_thread is not None:
+        currency._refresh_thread.join(timeout=10)
+
+
+def _store(usd, eur, age):
+    fetched_at = datetime.utcnow() - age
+    db.session.add_all([
+        ExchangeRate(currency='USD', rate=usd, rate_date=date(2025, 12, 31), fetched_at=fetched_at),
+        ExchangeRate(currency='EUR', rate=eur, rate_date=date(2025, 12, 31), fetched_at=fetched_at),
+    ])
+    db.session.commit()
+
+
+def test_cold_start_fetches_once_and_stores(app_ctx, nbu):
+    assert currency.get_nbu_rates() == NBU
+    assert currency.convert_to_usd(41250, 'UAH') == pytest.approx(1000.0)
+    assert currency.convert_to_usd(1000, 'EUR') == pytest.approx(1000 * 44.9 / 41.25)
+    assert nbu.counts['rates'] == 1
+
+    rows = ExchangeRate.query.order_by(ExchangeRate.currency).all()
+    assert [(r.currency, r.rate, r.rate_date) for r in rows] == [
+        ('EUR', 44.9, date(2026, 1, 1)), ('USD', 41.25, date(2026, 1, 1))]
+
+    # A new process (no rates in memory) reads the stored rates instead of calling NBU
+    currency.reset()
+    assert currency.get_nbu_rates() == NBU
+    assert nbu.counts['rates'] == 1
+
+
+def test_stale_rates_are_served_while_refreshing(app_ctx, nbu):
+    _store(40.0, 43.0, age=timedelta(days=1))
+    assert currency.get_nbu_rates() == {'USD': 40.0, 'EUR': 43.0}      # at once, without waiting for NBU
+    _wait_for_refresh()
+    assert nbu.counts['rates'] == 1
+    assert currency.get_nbu_rates() == NBU
+    assert ExchangeRate.query.filter_by(rate_date=date(2026, 1, 1)).count() == 2
+
+
+def test_nbu_outage_keeps_last_known_rates(app_ctx, nbu):
+    nbu.error_rate = 1.0
+    _store(40.0, 43.0, age=timedelta(days=3))
+    assert currency.get_nbu_rates() == {'USD': 40.0, 'EUR': 43.0}
+    _wait_for_refresh()
+    assert nbu.counts['status_503'] == 1
+
+    # The failed refresh is not retried on every lookup
+    assert currency.get_nbu_rates() == {'USD': 40.0, 'EUR': 43.0}
+    _wait_for_refresh()
+    assert nbu.counts['status_503'] == 1
+
+
+def test_fallback_only_without_any_stored_rate(app_ctx, nbu):
+    nbu.error_rate = 1.0
+    assert currency.get_nbu_rates() == currency.FALLBACK_RATES
+    assert currency.get_nbu_rates() == currency.FALLBACK_RATES
+    assert nbu.counts['status_503'] == 1
+    assert ExchangeRate.query.count() == 0
+
+
+def _rate_day(day, usd, eur):
+    db.session.add_all([ExchangeRate(currency='USD', rate=usd, rate_date=day),
+                        ExchangeRate(currency='EUR', rate=eur, rate_date=day)])
+
+
+def _listing(n, price, currency, created_at, **kwargs):
+    return Property(title=f'Listing {n}', source_url=f'u{n}', price=price, currency=currency,
+                    created_at=created_at, **kwargs)
+
+
+def test_to_usd_reports_the_rate_date(app_ctx, nbu):
+    assert currency.to_usd(41250, 'UAH') == (pytest.approx(1000.0), date(2026, 1, 1))
+    assert currency.to_usd(1000, 'USD') == (1000.0, None)
+
+
+def test_reconvert_prices_joins_rates_by_date(app_ctx, nbu):
+    _rate_day(date(2025, 3, 1), 40.0, 44.0)
+    _rate_day(date(2025, 6, 1), 42.0, 46.2)
+    db.session.add_all([
+        # Legacy rows, never converted: dated by when they were scraped
+        _listing(1, 400000, 'UAH', datetime(2025, 4, 10)),
+        _listing(2, 50000, 'EUR', datetime(2025, 6, 2)),
+        _listing(3, 840000, 'UAH', datetime(2024, 1, 1)),          # before any stored rate: the oldest one
+        # Converted by the pipeline: the stored date is kept
+        _listing(4, 500.0, 'USD', datetime(2025, 7, 1), price_original=21000, currency_original='UAH',
+                 fx_rate_date=date(2025, 6, 1)),
+        _listing(5, 70000, 'USD', datetime(2025, 7, 1), price_original=70000, currency_original='USD'),
+    ])
+    db.session.commit()
+
+    assert currency.reconvert_prices() == {'backfilled': 3, 'dated': 3, 'converted': 4, 'unconverted': 0}
+    rows = {p.source_url: p for p in Property.query.all()}
+    assert (rows['u1'].price, rows['u1'].currency, rows['u1'].fx_rate_date) == (10000.0, 'USD', date(2025, 3, 1))
+    assert (rows['u1'].price_original, rows['u1'].currency_original) == (400000, 'UAH')
+    assert rows['u2'].price == pytest.approx(50000 * 46.2 / 42.0)
+    assert (rows['u3'].price, rows['u3'].fx_rate_date) == (21000.0, date(2025, 3, 1))
+    assert rows['u4'].price == 500.0
+    assert (rows['u5'].price, rows['u5'].fx_rate_date) == (70000, None)
+
+    # Replaying gives the same prices
+    assert currency.reconvert_prices()['converted'] == 4
+    assert Property.query.filter_by(source_url='u1').one().price == 10000.0
+
+    # --latest: everything at the newest stored rates
+    currency.reconvert_prices(latest=True)
+    u1 = Property.query.filter_by(source_url='u1').one()
+    assert (u1.price, u1.fx_rate_date) == (pytest.approx(400000 / 42.0), date(2025, 6, 1))
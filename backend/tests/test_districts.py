@@ -0,0 +1,96 @@
+from pathlib import Path
+
+import pytest
+from app import db
+from app.models import Property
+from app.services import geocode_queue
+from app.services.districts import DistrictIndex, assign_district
+
+GEOJSON = Path(__file__).parent / 'fixtures' / 'districts.geojson'
+
+
+@pytest.fixture
+def app_ctx(app_ctx):
+    app_ctx.config['DISTRICTS_PATH'] = str(GEOJSON)
+    return app_ctx
+
+
+@pytest.mark.parametrize('lat, lng, expected', [
+    (50.4500, 30.5100, 'Шевченківський р-н'),
+    (50.4100, 30.5600, 'Печерський р-н'),
+    (50.4250, 30.5450, None),                   # hole in Печерський
+    (50.3700, 30.5000, 'Голосіївський р-н'),
+    (50.3550, 30.6100, 'Голосіївський р-н'),    # second part of the MultiPolygon
+    (50.3690, 30.6010, None),                   # inside the triangle's bounding box only
+    (49.8397, 24.0297, None),
+    (None, None, None),
+])
+def test_lookup(lat, lng, expected):
+    index = DistrictIndex.from_geojson(GEOJSON)
+    assert len(index) == 3
+    district = index.lookup(lat, lng)
+    assert (district.name if district else None) == expected
+
+
+def test_grid_only_holds_nearby_districts():
+    index = DistrictIndex.from_geojson(GEOJSON, cell=0.05)
+    assert max(len(ids) for ids in index._grid.values()) <= 2
+    assert all(len(ids) == 1 for cell, ids in index._grid.items() if cell[0] >= 612)
+
+
+def test_assign_keeps_district_from_listing(app_ctx):
+    prop = Property(title='t', source_url='u', latitude=50.41, longitude=30.56, geocode_precision='exact',
+                    district='Печерский р-н')
+    assert assign_district(prop) is False
+    assert assign_district(prop, overwrite=True) is True
+    assert prop.district == 'Печерський р-н'
+
+
+def test_backfill_districts_command(app_ctx):
+    db.session.add_all([
+        Property(title='a', source_url='a', latitude=50.45, longitude=30.51, geocode_precision='exact'),
+        Property(title='b', source_url='b', latitude=50.41, longitude=30.56, geocode_precision='street',
+                 district='Old р-н'),
+        Property(title='c', source_url='c', latitude=49.84, longitude=24.03, geocode_precision='exact'),
+        Property(title='d', source_url='d'),
+        # Kyiv's centre as a city fallback: no district to be had from it
+        Property(title='e', source_url='e', latitude=50.45, longitude=30.51, geocode_precision='city'),
+    ])
+    db.session.commit()
+
+    runner = app_ctx.test_cli_runner()
+    result = runner.invoke(args=['backfill-districts', '--batch', '1'])
+    assert 'Updated 1/2' in result.output, result.output
+    assert [p.district for p in Property.query.order_by(Property.id)] == [
+        'Шевченківський р-н', 'Old р-н', None, None, None,
+    ]
+
+    result = runner.invoke(args=['backfill-districts', '--overwrite'])
+    assert 'Updated 1/3' in result.output, result.output
+    assert db.session.get(Property, 2).district == 'Печерський р-н'
+
+
+def test_geocode_worker_fills_district(app_ctx):
+    prop = Property(title='t', source_url='u', address='Київ, Хрещатик 1')
+    db.session.add(prop)
+    db.session.flush()
+    geocode_queue.enqueue(prop, prop.address)
+    db.session.commit()
+
+    claimed = geocode_queue.claim('test-worker')
+    assert geocode_queue.complete(claimed[0], (50.45, 30.51, None, 'exact')) == 'found'
+    assert db.session.get(Property, prop.id).district == 'Шевченківський р-н'
+
+
+def test_city_fallback_gets_no_district(app_ctx):
+    prop = Property(title='t', source_url='u', address='Київ', latitude=50.45, longitude=30.51,
+                    geocode_precision='city')
+    assert assign_district(prop) is False and prop.district is None
+
+    db.session.add(prop)
+    db.session.flush()
+    geocode_queue.enqueue(prop, prop.address)
+    db.session.commit()
+    claimed = geocode_queue.claim('test-worker')
+    assert geocode_queue.complete(claimed[0], (50.45, 30.51, 'Київ, Україна', 'city')) == 'found'
+    assert db.session.get(Property, prop.id).district is None
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+from app.services.address_normalizer import AddressNormalizer
+from app.services.cities import match_city, normalize_city
+from app.services.fuzzy import TrigramIndex, bounded_distance
+
+
+def test_bounded_distance():
+    assert bounded_distance('kiyv', 'kyiv', 1) == 1          # transposition is one edit
+    assert bounded_distance('харьков', 'харків', 2) == 2
+    assert bounded_distance('харьков', 'харків', 1) is None
+    assert bounded_distance('львів', 'тернопіль', 3) is None
+
+
+def test_index_scores_and_limits():
+    index = TrigramIndex({'Одеса': 'Одеса', 'Одесса': 'Одеса', 'Суми': 'Суми'})
+    assert index.lookup('одеса') == ('Одеса', 'одеса', 0, 1.0)
+    match = index.lookup('Одессса')
+    assert match.value == 'Одеса' and match.distance == 1 and 0.8 < match.score < 1
+    assert index.lookup('Сума') is not None
+    assert index.lookup('Сум') is None                      # too short for any edits
+    assert index.lookup('Одессса', min_score=0.9) is None
+
+
+def test_city_typos_and_variants():
+    assert normalize_city('Kiyv', fuzzy=True) == 'Київ'
+    assert normalize_city('Днепропетровськ', fuzzy=True) == 'Дніпро'
+    assert normalize_city('Харькв', fuzzy=True) == 'Харків'
+    assert normalize_city('Продажа квартир', fuzzy=True) is None
+    # Typo matching is opt-in, and free-text guessing stays exact
+    assert normalize_city('Kiyv') is None
+    assert normalize_city('Kiyv', settlements=False, fuzzy=True) is None
+    assert match_city('Запорожя').score < match_city('Запорожье').score == 1.0
+
+
+@pytest.mark.parametrize('name', ['Полтавка', 'Херсонес', 'Одесская'])
+def test_places_named_after_cities_are_not_typos(name):
+    assert normalize_city(name) is None
+    assert normalize_city(name, fuzzy=True) is None
+
+
+def test_misspelt_city_in_address():
+    assert AddressNormalizer.normalize('Kiyv, вул. Хрещатик, 1')[0].startswith('Київ, ')
+
+
+def test_misspelt_renamed_street():
+    candidates = AddressNormalizer.normalize('Київ, ул. Магнитогорска, 1')
+    assert 'Київ, вулиця Якова Гніздовського, 1' in candidates
+    candidates = AddressNormalizer.normalize('Харьков, ул. Газеты Правди, 3')
+    assert 'Харків, Слобожанський проспект, 3' in candidates
+    assert AddressNormalizer._correct_renamed_streets('вул. Хрещатик, 1') == 'вул. Хрещатик, 1'
+
+
+def test_lookup_speed():
+    match_city.cache_clear()
+    names = ['Kiyv', 'Днепропетровськ', 'Харькв', 'Лвов', 'Продажа квартир', 'Запорожя'] * 20
+    started = time.perf_counter()
+    for name in names:
+        match_city.__wrapped__(name)
+    assert (time.perf_counter() - started) / len(names) < 0.001
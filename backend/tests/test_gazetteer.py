@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+from app.services import gazetteer, geocode_cache, geocoding
+
+CSV = Path(__file__).parent / 'fixtures' / 'gazetteer.csv'
+
+
+@pytest.fixture
+def gazetteer_path(tmp_path):
+    path = str(tmp_path / 'gazetteer.sqlite')
+    stats = gazetteer.load_csv([CSV], path)
+    assert stats == {'rows': 14, 'skipped': 2, 'streets': 9, 'houses': 11}
+    return path
+
+
+@pytest.fixture
+def app_ctx(app_ctx, gazetteer_path):
+    app_ctx.config['GAZETTEER_PATH'] = gazetteer_path
+    geocode_cache.stats.reset()
+    return app_ctx
+
+
+def test_keys_ignore_street_type_case_and_order():
+    assert gazetteer.street_key('вул. Хрещатик') == gazetteer.street_key('Хрещатик вулиця') == 'хрещатик'
+    assert gazetteer.token_key('Шевченка Тараса бульв.') == gazetteer.token_key('бульвар Тараса Шевченка')
+    assert gazetteer.normalize_house('буд. 45 A') == gazetteer.normalize_house('45а') == '45а'
+    assert gazetteer.split_address('Киев, ул. Крещатик, 22') == ('Київ', 'ул. Крещатик', '22')
+    assert gazetteer.split_address('Львів, Городоцька 45а') == ('Львів', 'Городоцька', '45а')
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('Київ, вул. Хрещатик, 1', (50.4476, 30.5229, 'Київ, вулиця Хрещатик, 1', 'exact')),
+    ('Киев, Хрещатик 22', (50.4478, 30.5226, 'Київ, вулиця Хрещатик, 22', 'exact')),
+    ('Київ, Шевченка Тараса бульвар, 14', (50.4432, 30.5116, 'Київ, бульвар Тараса Шевченка, 14', 'exact')),
+    ('Київ, Лесі Укр, 7А', (50.4298, 30.5400, 'Київ, вулиця Лесі Українки, 7а', 'exact')),
+    # Old Russian name, renamed by AddressNormalizer's candidates
+    ('Киев, ул. Челябинская, 13', (50.4142, 30.5161, 'Київ, вулиця Пантелеймона Куліша, 13', 'exact')),
+    ('Kyiv, Велика Васильківська 100', (50.4279, 30.5170, 'Київ, вулиця Велика Васильківська, 100', 'exact')),
+    ('Харьков, пр. Науки 9', (50.0137, 36.2281, 'Харків, проспект Науки, 9', 'exact')),
+    ('Львів, Городоцька, 45a', (49.8364, 24.0128, 'Львів, Городоцька вулиця, 45а', 'exact')),
+])
+def test_resolve_houses(gazetteer_path, address, expected):
+    assert gazetteer.Gazetteer(gazetteer_path).resolve(address) == expected
+
+
+def test_unknown_house_falls_back_to_street_centre(gazetteer_path):
+    lat, lng, canonical, precision = gazetteer.Gazetteer(gazetteer_path).resolve('Київ, вулиця Хрещатик, 99')
+    assert (canonical, precision) == ('Київ, вулиця Хрещатик', 'street')
+    assert lat == pytest.approx((50.4476 + 50.4478 + 50.4460) / 3)
+    assert gazetteer.Gazetteer(gazetteer_path).resolve('Одеса, Дерибасівська 1') is None
+
+
+def test_get_lat_long_answers_known_houses_offline(app_ctx, monkeypatch):
+    def no_network():
+        raise AssertionError("Photon must not be called")
+
+    monkeypatch.setattr(geocoding, '_get_geolocator', no_network)
+    assert geocoding.get_lat_long('Харків, Сумська, 25')[3] == 'exact'
+    assert geocode_cache.stats.snapshot() == {'gazetteer': 1}
+
+
+def test_street_match_beats_city_fallback(app_ctx, monkeypatch):
+    class NothingFound:
+        def geocode(self, query, timeout=None):
+            return None
+
+    monkeypatch.setattr(geocoding, '_get_geolocator', lambda: NothingFound())
+    assert geocoding.get_lat_long('Київ, вулиця Хрещатик, 99')[2:] == ('Київ, вулиця Хрещатик', 'street')
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from geopy.exc import GeocoderTimedOut
+from app import db
+from app.models import GeocodeCache
+from app.services import geocode_cache, geocoding
+
+
+@pytest.fixture
+def app_ctx(app_ctx):
+    geocode_cache.stats.reset()
+    return app_ctx
+
+
+class FakePhoton:
+    """Photon stand-in: answers from `answers` by query substring, or raises `error`."""
+
+    def __init__(self, answers=None, error=None):
+        self.answers = answers or {}
+        self.error = error
+        self.queries = []
+
+    def geocode(self, query, timeout=None):
+        self.queries.append(query)
+        if self.error:
+            raise self.error
+        for needle, (lat, lng) in self.answers.items():
+            if needle in query:
+                return SimpleNamespace(latitude=lat, longitude=lng, address=f"{needle}, Київ, Україна")
+        return None
+
+
+@pytest.fixture
+def photon(monkeypatch):
+    fake = FakePhoton({'Хрещатик': (50.4474, 30.5225)})
+    monkeypatch.setattr(geocoding, '_get_geolocator', lambda: fake)
+    return fake
+
+
+def test_cache_key_ignores_case_and_spacing():
+    assert geocode_cache.cache_key('Київ,  вул. Хрещатик 1') == geocode_cache.cache_key(' київ, вул. хрещатик 1 ')
+    assert geocode_cache.cache_key('Київ , вул. Хрещатик 1') == geocode_cache.cache_key('Київ, вул. Хрещатик 1')
+    assert geocode_cache.cache_key('Київ, вул. Хрещатик 1') != geocode_cache.cache_key('Київ, вул. Хрещатик 1', 'Київська')
+
+
+def test_repeated_address_costs_no_requests(app_ctx, photon):
+    first = geocoding.get_lat_long('Київ, вул. Хрещатик 1')
+    sent = len(photon.queries)
+    assert first[3] == 'exact' and sent > 0
+
+    assert geocoding.get_lat_long('київ,  вул. Хрещатик 1') == first
+    assert len(photon.queries) == sent
+    assert GeocodeCache.query.one().hits == 1
+
+    s = geocode_cache.stats.snapshot()
+    assert (s['hits'], s['misses'], s['requests']) == (1, 1, sent)
+
+
+def test_refresh_bypasses_cache(app_ctx, photon):
+    geocoding.get_lat_long('Київ, вул. Хрещатик 1')
+    sent = len(photon.queries)
+    geocoding.get_lat_long('Київ, вул. Хрещатик 1', refresh=True)
+    assert len(photon.queries) == 2 * sent
+    assert GeocodeCache.query.count() == 1
+
+
+def test_miss_is_cached_with_shorter_ttl(app_ctx, photon):
+    assert geocoding.get_lat_long('Київ, вул. Неіснуюча 99') == (None, None, None, None)
+    sent = len(photon.queries)
+    assert geocoding.get_lat_long('Київ, вул. Неіснуюча 99') == (None, None, None, None)
+    assert len(photon.queries) == sent
+    assert geocode_cache.stats.snapshot()['negative_hits'] == 1
+
+    row = GeocodeCache.query.one()
+    assert row.outcome == 'miss'
+    assert row.expires_at - row.created_at == timedelta(days=app_ctx.config['GEOCODE_MISS_TTL_DAYS'])
+
+    # Once expired, the address is looked up again
+    row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    geocoding.get_lat_long('Київ, вул. Неіснуюча 99')
+    assert len(photon.queries) == 2 * sent
+
+
+def test_photon_errors_are_not_cached(app_ctx, monkeypatch):
+    monkeypatch.setattr(geocoding, '_get_geolocator', lambda: FakePhoton(error=GeocoderTimedOut('slow')))
+    with pytest.raises(geocoding.GeocodingUnavailable):
+        geocoding.get_lat_long('Київ, вул. Хрещатик 1')
+    # Nor is a region-centre fallback passed off as the answer
+    with pytest.raises(geocoding.GeocodingUnavailable):
+        geocoding.get_lat_long('вул. Хрещатик 1', region='Київська область')
+    assert GeocodeCache.query.count() == 0
+
+
+def test_cache_bypassed_without_app_context():
+    assert geocode_cache.lookup('Київ, вул. Хрещатик 1') is None
+    geocode_cache.store('Київ, вул. Хрещатик 1', None, (50.0, 30.0, 'x', 'exact'))
@@ -0,0 +1,124 @@
+from app import db
+from app.models import GeocodeJob, Property
+from geopy.geocoders import Photon
+from app.services import geocode_queue, geocoding
+from app.services.http_cache import FetchResult
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.scrape_pipeline import ScrapeRun, ScraperSite
+from benchmarks.replay_server import ReplayServer
+
+URL = 'https://example.com/listing/1'
+LISTING = {
+    'title': 'Продам 2-кімнатну квартиру', 'price': 60000.0, 'currency': 'USD', 'area': 50, 'rooms': 2,
+    'address': 'Київ, вул. Хрещатик 1', 'city': 'Київ', 'source_url': URL, 'source_website': 'example',
+    'images': [],
+}
+KYIV = (50.4474, 30.5225, 'Хрещатик 1, Київ, Україна', 'exact')
+
+
+def _scrape(listing=LISTING, **run_kwargs):
+    page = FetchResult(200, f"<html>{listing['address']}</html>")
+    site = ScraperSite('example', lambda url, validators: page, lambda body, url: dict(listing), None)
+    run = ScrapeRun(site, **run_kwargs)
+    task = run.fetch(URL)
+    for stage in (run.parse, run.validate):
+        task = stage(task)
+    if run.geocode_func:
+        task = run.geocode(task)
+    return run.write(task)
+
+
+def _drain(app, geocode):
+    pipeline = geocode_queue.build_geocode_pipeline(workers=2, geocode=geocode, app=app)
+    return list(pipeline.run(geocode_queue.claim('test-worker')))
+
+
+def _map_ids(app):
+    return [p['id'] for p in app.test_client().get('/api/v1/properties/map').get_json()['data']]
+
+
+def test_new_listing_is_written_pending_then_geocoded(app_ctx):
+    assert 'geocode' not in [stage.name for stage in ScrapeRun().stages(4)]
+    assert _scrape()['status'] == 'new'
+    prop = Property.query.one()
+    assert (prop.latitude, prop.geocode_precision) == (None, geocode_queue.PENDING)
+    assert GeocodeJob.query.one().address == LISTING['address']
+
+    # Coordinates a stale row still carried must not reach the map while pending
+    prop.latitude, prop.longitude = 1.0, 2.0
+    db.session.commit()
+    assert _map_ids(app_ctx) == []
+
+    results = _drain(app_ctx, lambda address, region=None: KYIV)
+    assert [r['status'] for r in results] == ['found']
+    prop = db.session.get(Property, prop.id)
+    assert (prop.latitude, prop.longitude, prop.address, prop.geocode_precision) == KYIV
+    assert GeocodeJob.query.one().status == 'done'
+    assert _map_ids(app_ctx) == [prop.id]
+
+
+def test_not_found_clears_pending(app_ctx):
+    _scrape()
+    assert [r['status'] for r in _drain(app_ctx, lambda address, region=None: (None,) * 4)] == ['not_found']
+    prop = Property.query.one()
+    assert prop.latitude is None and prop.geocode_precision is None
+
+
+def test_address_change_while_geocoding_requeues(app_ctx):
+    _scrape()
+    claimed = geocode_queue.claim('test-worker')
+    _scrape(dict(LISTING, address='Київ, вул. Басейна 5'))
+
+    assert geocode_queue.complete(claimed[0], KYIV) == 'requeued'
+    job = GeocodeJob.query.one()
+    assert (job.status, job.address) == ('pending', 'Київ, вул. Басейна 5')
+    assert Property.query.one().geocode_precision == geocode_queue.PENDING
+
+
+def test_errors_retry_then_give_up(app_ctx):
+    _scrape()
+
+    def broken(address, region=None):
+        raise RuntimeError('photon down')
+
+    for _ in range(3):
+        results = _drain(app_ctx, broken)
+        assert [r['status'] for r in results] == ['error']
+        geocode_queue.fail(results[0]['job_id'], results[0]['msg'], backoff_seconds=0)
+
+    assert GeocodeJob.query.one().status == 'failed'
+    assert Property.query.one().geocode_precision is None
+
+
+def test_inline_geocoding_still_available(app_ctx):
+    assert _scrape(geocode=lambda address, region=None: KYIV)['status'] == 'new'
+    prop = Property.query.one()
+    assert (prop.latitude, prop.geocode_precision) == (KYIV[0], 'exact')
+    assert GeocodeJob.query.count() == 0
+
+
+def test_photon_outage_retries_jobs(app_ctx, monkeypatch):
+    monkeypatch.setattr(geocoding, 'rate_limiter', AdaptiveRateLimiter(initial_rate=1000, min_rate=1000, burst=100))
+    _scrape(dict(LISTING, region='Київська область'))
+    with ReplayServer(error_rate=1.0) as server:
+        host = server.url.split('://', 1)[1]
+        monkeypatch.setattr(geocoding, '_get_geolocator', lambda: Photon(scheme='http', domain=host))
+        results = _drain(app_ctx, geocoding.get_lat_long)
+        assert server.counts['status_503'] > 0
+
+    # Not a final miss, nor the oblast centre: the job goes back to the queue
+    assert [r['status'] for r in results] == ['error']
+    geocode_queue.fail(results[0]['job_id'], results[0]['msg'])
+    job = GeocodeJob.query.one()
+    assert (job.status, job.attempts) == ('pending', 1) and 'Photon' in job.last_error
+    prop = Property.query.one()
+    assert (prop.latitude, prop.geocode_precision) == (None, geocode_queue.PENDING)
+
+
+def test_inline_geocoding_defers_to_the_queue_when_unavailable(app_ctx):
+    def unavailable(address, region=None):
+        raise geocoding.GeocodingUnavailable('photon down')
+
+    assert _scrape(geocode=unavailable)['status'] == 'new'
+    assert Property.query.one().geocode_precision == geocode_queue.PENDING
+    assert GeocodeJob.query.one().status == 'pending'
@@ -0,0 +1,133 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from app import db
+from app.models import Property
+from app.services import html_archive
+from app.services.html_archive import HtmlArchive
+from app.services.http_cache import FetchResult
+from app.services.reparse import apply_reparsed, iter_reparsed
+from app.services.scrape_pipeline import ScrapeRun, ScraperSite
+
+PAGES = Path(__file__).parent / 'fixtures' / 'pages'
+
+
+@pytest.fixture
+def archive(tmp_path):
+    store = HtmlArchive(str(tmp_path / 'archive'))
+    yield store
+    store.close()
+
+
+def test_round_trip_keeps_bytes_and_text(archive):
+    raw = (PAGES / 'meget_cp1251.html').read_bytes()
+    text = (PAGES / 'bon_ua_0.html').read_text(encoding='utf-8')
+    archive.put('https://meget/1', raw, site='meget')
+    archive.put('https://bon/1', text, site='bon_ua')
+
+    assert archive.latest('https://meget/1').body == raw
+    assert archive.latest('https://bon/1').body == text
+    assert archive.has('https://bon/1') and not archive.has('https://bon/2')
+    assert archive.latest('https://bon/2') is None
+
+
+def test_identical_bodies_are_stored_once(archive):
+    body = (PAGES / 'bon_ua_1.html').read_text(encoding='utf-8')
+    for n in range(3):
+        archive.put(f'https://bon/{n}', body, site='bon_ua')
+
+    stats = archive.stats()
+    assert (stats['urls'], stats['fetches'], stats['blobs']) == (3, 3, 1)
+    assert stats['stored_bytes'] < stats['raw_bytes']
+
+
+def test_latest_fetch_wins_and_filters(archive):
+    archive.put('https://bon/1', 'old', site='bon_ua', fetched_at=datetime(2026, 1, 1))
+    archive.put('https://bon/1', 'new', site='bon_ua', fetched_at=datetime(2026, 3, 1))
+    archive.put('https://meget/1', b'm', site='meget', fetched_at=datetime(2026, 2, 1))
+
+    assert archive.latest('https://bon/1').body == 'new'
+    assert [p.body for p in archive.iter_latest()] == ['new', b'm']
+    assert [p.source_url for p in archive.iter_latest(site='meget')] == ['https://meget/1']
+    assert [p.body for p in archive.iter_latest(since=datetime(2026, 2, 15))] == ['new']
+
+
+def test_packs_roll_over_and_stay_readable(tmp_path):
+    store = HtmlArchive(str(tmp_path / 'small'), max_pack_bytes=200)
+    bodies = [f"<html>{n}{'x' * n * 50}</html>" for n in range(10)]
+    for n, body in enumerate(bodies):
+        store.put(f'https://bon/{n}', body, site='bon_ua')
+
+    assert len(list((tmp_path / 'small' / 'packs').iterdir())) > 1
+    assert [store.latest(f'https://bon/{n}').body for n in range(10)] == bodies
+
+
+def test_zlib_fallback_is_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_archive, 'ZSTD_AVAILABLE', False)
+    store = HtmlArchive(str(tmp_path / 'zlib'))
+    store.put('https://bon/1', 'привіт', site='bon_ua')
+    assert store.codec == 'zlib'
+    assert store.latest('https://bon/1').body == 'привіт'
+
+
+def test_iter_reparsed_matches_parser_output(archive):
+    for name in ('bon_ua_0.html', 'bon_ua_expired.html'):
+        archive.put(f'https://example.com/{name}', (PAGES / name).read_text(encoding='utf-8'), site='bon_ua')
+    archive.put('https://example.com/other', '<html></html>', site='unknown')
+
+    results = {page.source_url: data for page, data in iter_reparsed(archive.iter_latest(), batch_size=2)}
+    assert results['https://example.com/bon_ua_0.html']['price'] == 86000.0
+    assert results['https://example.com/bon_ua_expired.html'] is None
+    assert results['https://example.com/other'] is None
+
+
+def test_apply_reparsed_only_touches_selected_non_empty_fields(app_ctx):
+    prop = Property(title='Old title of the listing', source_url='u', price=50000, currency='USD',
+                    address='Київ, вулиця Хрещатик, 1', area=40, rooms=2, images=[])
+    db.session.add(prop)
+    db.session.commit()
+
+    data = {'title': 'New title of the listing', 'price': 60000.0, 'currency': 'USD', 'area': 40,
+            'rooms': None, 'images': ['a.jpg'], 'address': 'Київ, Хрещатик 1'}
+    assert apply_reparsed(prop, data) == ['title', 'images']
+    assert prop.price == 50000 and prop.rooms == 2
+    assert prop.address == 'Київ, вулиця Хрещатик, 1'
+
+    assert apply_reparsed(prop, data, fields=('price',)) == ['price']
+    assert prop.price == 60000.0
+    assert (prop.price_original, prop.currency_original, prop.fx_rate_date) == (60000.0, 'USD', None)
+    assert apply_reparsed(prop, data, fields=('price',)) == []
+
+
+def test_reparse_command_updates_rows_from_archive(app_ctx, tmp_path):
+    app_ctx.config['HTML_ARCHIVE_DIR'] = str(tmp_path / 'cli')
+    store = html_archive.open_archive(app_ctx.config['HTML_ARCHIVE_DIR'])
+    url = 'https://example.com/bon_ua_0.html'
+    store.put(url, (PAGES / 'bon_ua_0.html').read_text(encoding='utf-8'), site='bon_ua')
+    db.session.add(Property(title='Broken title', source_url=url, price=86000.0, currency='USD', images=[]))
+    db.session.commit()
+
+    runner = app_ctx.test_cli_runner()
+    dry = runner.invoke(args=['reparse', '--processes', '1', '--dry-run'])
+    assert 'Would update 1' in dry.output
+    assert Property.query.one().title == 'Broken title'
+
+    result = runner.invoke(args=['reparse', '--processes', '1'])
+    assert result.exit_code == 0, result.output
+    prop = Property.query.one()
+    assert prop.title.startswith('Продам 4-кімнатну')
+    assert len(prop.images) == 10
+
+    bad = runner.invoke(args=['reparse', '--fields', 'address'])
+    assert bad.exit_code != 0
+
+
+def test_scrape_run_archives_fetched_pages(app_ctx, archive):
+    body = (PAGES / 'bon_ua_1.html').read_text(encoding='utf-8')
+    site = ScraperSite('bon_ua', lambda url, validators: FetchResult(200, body), None, None)
+    run = ScrapeRun(site, archive=archive)
+
+    task = run.fetch('https://example.com/bon_ua_1.html')
+    assert task.page is not None
+    assert archive.latest('https://example.com/bon_ua_1.html').body == body
@@ -0,0 +1,71 @@
+from app import db
+from app.models import Property
+from app.services.http_cache import (
+    FetchResult, PageValidators, check_unchanged, conditional_headers, content_hash,
+)
+from app.services.meget import network as meget_network
+from app.services.rate_limiter import AdaptiveRateLimiter
+from app.services.scrape_pipeline import SITES, ScrapeRun
+from benchmarks.replay_server import ReplayServer
+
+
+def test_conditional_headers():
+    assert conditional_headers(None) == {}
+    headers = conditional_headers(PageValidators(etag='"abc"', last_modified='Mon, 01 Jan 2026 00:00:00 GMT'))
+    assert headers == {'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 01 Jan 2026 00:00:00 GMT'}
+
+
+def test_content_hash_ignores_volatile_markup():
+    a = "<html><script>var t=1;</script><h1>Квартира</h1>\n<!-- 12ms --></html>"
+    b = "<html><script>var t=2;</script>  <h1>Квартира</h1><!-- 40ms --></html>"
+    assert content_hash(a) == content_hash(b)
+    assert content_hash(a) == content_hash(a.encode('utf-8'))
+    assert content_hash(a) != content_hash("<html><h1>Інша квартира</h1></html>")
+
+
+def test_check_unchanged_on_304_keeps_stored_hash():
+    stored = PageValidators(etag='"v1"', content_hash='deadbeef')
+    marker = check_unchanged(FetchResult(304, etag='"v1"'), stored)
+    assert marker['not_modified'] == 'etag'
+    assert marker['content_hash'] == 'deadbeef'
+
+
+def test_check_unchanged_on_hash_match():
+    body = "<html><h1>Квартира</h1></html>"
+    page = FetchResult(200, body=body, etag='"v2"')
+    assert check_unchanged(page, None) is None
+
+    marker = check_unchanged(page, PageValidators(etag='"v1"', content_hash=content_hash(body)))
+    assert marker['not_modified'] == 'hash'
+    assert marker['etag'] == '"v2"'
+
+
+def test_gone_and_failed_fetches():
+    assert FetchResult(404).gone and FetchResult(410).gone and not FetchResult(404).failed
+    for page in (FetchResult(503), FetchResult(429), FetchResult(403), FetchResult(0, error='timed out')):
+        assert page.failed and not page.gone
+    assert not FetchResult(200, body='x').failed and not FetchResult(304).failed
+
+
+def test_open_circuit_keeps_known_listings_active(app_ctx, monkeypatch):
+    # Fast limiter, so the five 503s that open the circuit don't wait on backoff
+    limiter = AdaptiveRateLimiter(initial_rate=1000, min_rate=1000, burst=100, failure_threshold=5)
+    monkeypatch.setattr(meget_network, 'rate_limiter', limiter)
+    with ReplayServer('meget', listings=20, error_rate=1.0) as server:
+        urls = [f"{server.url}/prodazha-kvartir/details/{i}/" for i in range(10)]
+        gone = f"{server.url}/prodazha-kvartir/details/500/"
+        db.session.add_all([Property(title=f'Listing {n}', source_url=url) for n, url in enumerate(urls + [gone])])
+        db.session.commit()
+
+        run = ScrapeRun(SITES['meget'])
+        results = [run.write(run.fetch(url)) for url in urls]
+        assert server.counts['status_503'] == 5          # the rest were never requested
+        assert all(r['status'] == 'error' and r['msg'].startswith('Fetch failed') for r in results)
+        assert 'Circuit open' in results[-1]['msg']
+
+        server.error_rate = 0.0
+        limiter.reset()
+        assert run.write(run.fetch(gone)) == {'status': 'expired', 'url': gone, 'msg': 'Listing expired - marked inactive'}
+
+    assert Property.query.filter_by(is_active=True).count() == 10
+    assert not Property.query.filter_by(source_url=gone).one().is_active
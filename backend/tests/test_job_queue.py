@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Property, ScrapeJob
+from app.services import job_queue
+from benchmarks.replay_server import ReplayServer
+
+
+def test_enqueue_is_idempotent(app_ctx):
+    assert job_queue.enqueue(iter(['u1', 'u2', 'u2']), 'meget') == 2
+    assert job_queue.enqueue(['u1', 'u3'], 'meget') == 1
+    assert job_queue.queue_stats() == {'pending': 3}
+
+
+def test_claim_leases_jobs_once(app_ctx):
+    job_queue.enqueue(['u1', 'u2', 'u3'], 'meget')
+
+    first = job_queue.claim('w1', batch_size=2)
+    second = job_queue.claim('w2', batch_size=2)
+
+    assert [j.url for j in first] == ['u1', 'u2']
+    assert [j.url for j in second] == ['u3']
+    assert job_queue.claim('w3') == []
+
+
+def test_expired_lease_is_reclaimed(app_ctx):
+    job_queue.enqueue(['u1'], 'meget')
+    [job] = job_queue.claim('dead-worker', lease_seconds=60)
+
+    db.session.get(ScrapeJob, job.id).lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    [reclaimed] = job_queue.claim('w2')
+    assert reclaimed.id == job.id
+    assert reclaimed.attempts == 2
+
+
+def test_fail_retries_with_backoff_then_gives_up(app_ctx):
+    job_queue.enqueue(['u1'], 'meget', max_attempts=2)
+
+    [job] = job_queue.claim('w1')
+    job_queue.fail(job.id, 'timeout', backoff_seconds=0)
+    assert db.session.get(ScrapeJob, job.id).status == 'pending'
+
+    [job] = job_queue.claim('w1')
+    job_queue.fail(job.id, 'timeout')
+    assert db.session.get(ScrapeJob, job.id).status == 'failed'
+
+
+def test_release_and_complete(app_ctx):
+    job_queue.enqueue(['u1', 'u2'], 'bon_ua')
+    a, b = job_queue.claim('w1')
+
+    job_queue.complete(a.id, 'new')
+    assert job_queue.release('w1') == 1
+    assert job_queue.queue_stats('bon_ua') == {'done': 1, 'pending': 1}
+    assert db.session.get(ScrapeJob, b.id).attempts == 0
+
+
+def test_worker_completes_jobs_of_expired_listings(app_ctx):
+    with ReplayServer('meget', listings=1) as server:
+        gone = f"{server.url}/prodazha-kvartir/details/7/"
+        db.session.add(Property(title='Expired listing', source_url=gone))
+        db.session.commit()
+        job_queue.enqueue([gone], 'meget')
+
+        result = app_ctx.test_cli_runner().invoke(args=['scrape-worker', '--workers', '1'])
+        assert '1 expired' in result.output
+        assert server.counts['detail'] == 1
+
+    job = ScrapeJob.query.one()
+    assert (job.status, job.last_result) == ('done', 'expired')
+    assert not Property.query.one().is_active
@@ -0,0 +1,64 @@
+from app import db
+from app.models import Property
+from app.services import listing_validator
+from app.services.listing_validator import ListingValidator
+
+TITLE = 'Продам 2-кімнатну квартиру'
+
+LISTINGS = [
+    {'title': TITLE, 'price': 60000.0, 'area': 50.0, 'description': None},
+    {'title': 'short', 'price': 1.0, 'area': None, 'description': ''},
+    {'title': 'test квартира у центрі міста', 'price': 60000.0, 'area': 50.0, 'description': ''},
+    {'title': TITLE, 'price': None, 'area': 50.0, 'description': ''},
+    {'title': TITLE, 'price': 1500.0, 'area': None, 'description': ''},
+    {'title': TITLE, 'price': 3000.0, 'area': 50.0, 'description': ''},
+    {'title': TITLE, 'price': 9e6, 'area': 50.0, 'description': ''},
+    {'title': TITLE, 'price': 60000.0, 'area': 50.0, 'description': 'lorem ipsum dolor sit amet'},
+    {'title': TITLE, 'price': 60000.0, 'area': 5.0, 'description': ''},
+    {'title': TITLE, 'price': 600000.0, 'area': 600.0, 'description': ''},
+    {'title': TITLE, 'price': 60000.0, 'area': 0.0, 'description': 'qwerty'},     # too short to check
+]
+
+
+def test_validate_many_matches_validate():
+    expected = [ListingValidator.validate(listing)[1] for listing in LISTINGS]
+    assert expected.count(None) == 2
+    columns = {name: [listing[name] for listing in LISTINGS] for name in LISTINGS[0]}
+    assert ListingValidator.validate_many(columns).tolist() == expected
+
+
+def test_validate_many_without_optional_columns():
+    reasons = ListingValidator.validate_many({'title': [TITLE, TITLE], 'price': [60000.0, 0.0]})
+    assert reasons.tolist() == [None, 'No price']
+
+
+def test_revalidate_flags_after_threshold_change(app_ctx, monkeypatch):
+    for i, listing in enumerate(LISTINGS):
+        db.session.add(Property(source_url=f'u{i}', **listing))
+    db.session.add(Property(source_url='cheap', title=TITLE, price=6000.0, area=50.0))     # $120/m²
+    db.session.commit()
+    runner = app_ctx.test_cli_runner()
+
+    dry = runner.invoke(args=['revalidate', '--chunk-size', '4', '--dry-run'])
+    assert 'Would flag 9 newly' in dry.output
+    assert Property.query.filter(Property.validation_error.isnot(None)).count() == 0
+
+    result = runner.invoke(args=['revalidate', '--chunk-size', '4'])
+    assert '12 listings' in result.output and '9 failing' in result.output
+    assert Property.query.filter_by(source_url='u5').one().validation_error.startswith('Price/m² too low')
+    assert Property.query.filter_by(source_url='cheap').one().validation_error is None
+
+    # Stricter threshold: the cheap listing fails too; nothing else changes
+    monkeypatch.setattr(listing_validator, 'MIN_PRICE_PER_SQM_USD', 200)
+    result = runner.invoke(args=['revalidate', '--deactivate'])
+    assert 'Flagged 1 newly, cleared 0, deactivated 10' in result.output
+    cheap = Property.query.filter_by(source_url='cheap').one()
+    assert cheap.validation_error == 'Price/m² too low: $120/m² (min $200)'
+    assert not cheap.is_active
+    assert Property.query.filter_by(is_active=True).count() == 2
+
+    # Back to the old threshold: the flag is cleared (deactivation is not undone)
+    monkeypatch.setattr(listing_validator, 'MIN_PRICE_PER_SQM_USD', 100)
+    result = runner.invoke(args=['revalidate'])
+    assert 'cleared 1' in result.output
+    assert Property.query.filter_by(source_url='cheap').one().validation_error is None
@@ -0,0 +1,52 @@
+"""
+Parsers on every HTML backend, over the synthetic pages in fixtures/pages (see its
+README: they imitate the sites' markup and are not saved real pages).
+"""
+import json
+from pathlib import Path
+
+import pytest
+from app.services import meget, bon_ua
+from app.services.html_backend import LXML_AVAILABLE
+
+PAGES = Path(__file__).parent / 'fixtures' / 'pages'
+# Snapshot of the parsers' own output: catches changes, not parsing mistakes
+EXPECTED = json.loads((PAGES / 'expected.json').read_text(encoding='utf-8'))
+# Read off the markup by hand, independently of the snapshot
+HAND_CHECKED = {
+    'meget_0.html': {'price': 8761000.0, 'currency': 'UAH', 'area': 58.0, 'address': 'Київ, ул. Московская, 6'},
+    'meget_cp1251.html': {'title': 'Продам 1-комн. квартиру', 'price': 3100000.0, 'area': 42.0},
+    'bon_ua_0.html': {'price': 86000.0, 'currency': 'USD', 'area': 30.0, 'address': 'Київ, ул. Московская 77'},
+}
+
+BACKENDS = ['html.parser'] + (['lxml'] if LXML_AVAILABLE else [])
+
+
+def _parse(name, **kwargs):
+    body = (PAGES / name).read_bytes()
+    url = f"https://example.com/{name}"
+    if name.startswith('meget'):
+        return meget.parse_listing_page(body, url, **kwargs)
+    return bon_ua.parse_listing_page(body.decode('utf-8'), url, **kwargs)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name', sorted(EXPECTED))
+def test_backend_output_matches_snapshot(name, backend):
+    assert _parse(name, backend=backend) == EXPECTED[name]
+
+
+@pytest.mark.parametrize('name', sorted(HAND_CHECKED))
+def test_fields_match_the_markup(name):
+    data = _parse(name)
+    assert {field: data[field] for field in HAND_CHECKED[name]} == HAND_CHECKED[name]
+
+
+def test_expired_page_parses_to_none():
+    assert _parse('bon_ua_expired.html') is None
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name', sorted(n for n in EXPECTED if n.startswith('bon_ua')))
+def test_targeted_parse_matches_full_document(name, backend):
+    assert _parse(name, backend=backend, targeted=True) == _parse(name, backend=backend, targeted=False)
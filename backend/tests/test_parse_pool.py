@@ -0,0 +1,18 @@
+from app.services.parse_pool import ParsePool, SITE_PARSERS
+
+MEGET_HTML = """
+<html>
+    <h1>Продам 2-к квартиру, вул. Київська 10</h1>
+    <span id="price_uah">2 500 000 грн</span>
+    <div class="breadcrumbs"><a href="#">Главная</a><a href="#">Київ</a></div>
+    <div>Площадь: 50 м2</div>
+</html>
+""".encode('utf-8')
+
+
+def test_pool_returns_same_dict_as_inline_parse():
+    url = "http://example.com/listing/1"
+    with ParsePool(processes=1) as pool:
+        assert pool.warm() == 1
+        assert pool.parse('meget', MEGET_HTML, url) == SITE_PARSERS['meget'](MEGET_HTML, url)
+        assert pool.map('meget', [(MEGET_HTML, url)] * 3) == [SITE_PARSERS['meget'](MEGET_HTML, url)] * 3
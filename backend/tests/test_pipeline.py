@@ -0,0 +1,84 @@
+import threading
+from app.services.pipeline import Done, Pipeline, Stage
+
+
+def test_items_flow_through_all_stages():
+    pipeline = Pipeline([
+        Stage('double', lambda x: x * 2, workers=3),
+        Stage('filter', lambda x: Done(('odd', x)) if x % 4 else x, workers=2),
+        Stage('emit', lambda x: ('even', x), workers=1),
+    ], queue_size=2)
+
+    results = list(pipeline.run(range(10)))
+
+    assert sorted(results) == sorted(
+        [('odd', x * 2) for x in range(10) if (x * 2) % 4] + [('even', x * 2) for x in range(10) if not (x * 2) % 4]
+    )
+    assert pipeline.stats['double'].count == 10
+    assert pipeline.stats['emit'].count == 5
+
+
+def test_stage_errors_become_results():
+    def explode(x):
+        if x == 3:
+            raise ValueError("boom")
+        return x
+
+    pipeline = Pipeline(
+        [Stage('explode', explode, workers=2)],
+        on_error=lambda item, exc, stage: f"{stage}:{item}:{exc}",
+    )
+    results = list(pipeline.run(range(5)))
+
+    assert "explode:3:boom" in results
+    assert len(results) == 5
+    assert pipeline.stats['explode'].errors == 1
+
+
+def test_discovery_overlaps_with_processing():
+    first_processed = threading.Event()
+
+    def source():
+        yield 1
+        # The second item is only produced once the first one went through the stage
+        assert first_processed.wait(timeout=5)
+        yield 2
+
+    def stage(x):
+        first_processed.set()
+        return x
+
+    assert sorted(Pipeline([Stage('s', stage)]).run(source())) == [1, 2]
+
+
+def test_batch_stage_takes_what_is_waiting():
+    last_passed = threading.Event()
+    batches = []
+
+    def feed(x):
+        if x == 9:
+            last_passed.set()
+        return x
+
+    def take(items):
+        if not batches:
+            # Hold the first batch until items 1..8 are waiting in the queue
+            assert last_passed.wait(timeout=5)
+        batches.append(list(items))
+        if 5 in items:
+            raise ValueError("boom")
+        return [Done(x) if x % 2 else x for x in items]
+
+    pipeline = Pipeline([
+        Stage('feed', feed),
+        Stage('batch', take, workers=1, batch=4),
+        Stage('emit', lambda x: x),
+    ], on_error=lambda item, exc, stage: f"{stage}:{item}")
+    results = list(pipeline.run(range(10)))
+
+    assert [x for batch in batches for x in batch] == list(range(10))
+    assert len(batches[1]) == 4 and all(len(batch) <= 4 for batch in batches)
+    failed = next(batch for batch in batches if 5 in batch)
+    assert sorted(map(str, results)) == sorted(
+        [f"batch:{x}" for x in failed] + [str(x) for x in range(10) if x not in failed])
+    assert pipeline.stats['batch'].count == 10
@@ -0,0 +1,137 @@
+import random
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app import db
+from app.models import PriceSketch, Property
+from app.services import price_bounds
+from app.services.listing_validator import ListingValidator
+from app.services.quantile_sketch import QuantileSketch
+from app.services.scrape_pipeline import ScrapeRun, ScrapeTask
+
+TITLE = 'Продам 2-кімнатну квартиру'
+
+
+def _observe_market(city, rooms, low, high, n=60, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        area = rng.uniform(40, 80)
+        price_bounds.observe({'city': city, 'rooms': rooms, 'price': rng.uniform(low, high) * area, 'area': area})
+
+
+def _listing(city, price_per_sqm, rooms=2, area=50.0):
+    return {'title': TITLE, 'price': price_per_sqm * area, 'area': area, 'description': '', 'city': city,
+            'rooms': rooms}
+
+
+def test_sketch_quantiles_are_within_alpha():
+    rng = random.Random(1)
+    values = sorted(rng.lognormvariate(7, 0.6) for _ in range(5000))
+    sketch = QuantileSketch(alpha=0.01)
+    for v in values:
+        sketch.add(v)
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+
+    # Merging two halves is the same as sketching everything; serialization keeps it
+    a, b = QuantileSketch(), QuantileSketch()
+    for i, v in enumerate(values):
+        (a if i % 2 else b).add(v)
+    a.merge(QuantileSketch.from_dict(b.to_dict()))
+    assert (a.count, a.bins) == (sketch.count, sketch.bins)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_bounds_adapt_to_each_market(app_ctx):
+    _observe_market('Київ', 2, 1500, 2500)
+    _observe_market('Гнідин', 3, 60, 120)
+
+    # $300/m² passes the fixed bounds but not Kyiv's
+    valid, reason = ListingValidator.validate(_listing('Київ', 300))
+    assert not valid
+    assert reason.startswith('Price/m² too low: $300/m² (min $') and reason.endswith(' in Київ, 2 rooms)')
+    assert ListingValidator.validate(_listing('Київ', 2100))[0]
+
+    # $70/m² is below the fixed minimum of $100, but normal for the village
+    assert ListingValidator.validate(_listing('Гнідин', 70, rooms=3))[0]
+    # Other rooms fall back to the whole city
+    assert price_bounds.lookup('Гнідин', 1).market == 'Гнідин'
+
+    # Too few listings: the fixed bounds
+    _observe_market('Ірпінь', 2, 900, 1200, n=10)
+    assert price_bounds.lookup('Ірпінь', 2) is None
+    assert ListingValidator.validate(_listing('Ірпінь', 90))[1] == 'Price/m² too low: $90/m² (min $100)'
+
+    listings = [_listing(city, ppsqm, rooms) for city, ppsqm, rooms in (
+        ('Київ', 300, 2), ('Київ', 2100, 2), ('Київ', 90_000, None), ('Гнідин', 70, 3), ('Гнідин', 20, 3),
+        ('Ірпінь', 90, 2), (None, 90, 2), ('Львів', 1500, None))]
+    columns = {name: [listing[name] for listing in listings] for name in listings[0]}
+    expected = [ListingValidator.validate(listing)[1] for listing in listings]
+    assert expected.count(None) == 3
+    assert ListingValidator.validate_many(columns).tolist() == expected
+
+
+def test_sketches_persist_and_merge_across_processes(app_ctx):
+    _observe_market('Київ', 2, 1500, 2500, n=40)
+    assert price_bounds.save() == 40
+    assert price_bounds.save() == 0
+    assert {(s.city, s.rooms, s.count) for s in PriceSketch.query} == {('Київ', 2, 40), ('Київ', 0, 40)}
+
+    # A second process saves its own listings: counts add up rather than overwrite
+    other = price_bounds.PriceBoundsStore()
+    for _ in range(5):
+        other.observe('Київ', 2, 2000.0)
+    other.save()
+
+    # A new process starts from the stored sketches
+    app_ctx.extensions.pop('price_bounds')
+    assert price_bounds.lookup('Київ', 2) is not None
+    assert app_ctx.extensions['price_bounds'].sketches[('Київ', 2)].count == 45
+
+
+def test_failed_save_keeps_pending_counts(app_ctx, monkeypatch):
+    _observe_market('Київ', 2, 1500, 2500, n=40)
+
+    def commit_fails(session):
+        # Another listing comes in while the save is under way, then the database goes away
+        price_bounds.observe({'city': 'Київ', 'rooms': 2, 'price': 100_000, 'area': 50})
+        raise OperationalError('COMMIT', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(Session, 'commit', commit_fails)
+    assert price_bounds.save() == 0
+    monkeypatch.undo()
+
+    store = app_ctx.extensions['price_bounds']
+    assert {key: sketch.count for key, sketch in store.pending.items()} == {('Київ', 2): 41, ('Київ', 0): 41}
+    assert price_bounds.save() == 41
+    assert {(s.city, s.rooms, s.count) for s in PriceSketch.query} == {('Київ', 2, 41), ('Київ', 0, 41)}
+
+
+def test_pipeline_learns_from_new_valid_listings(app_ctx):
+    pipeline = ScrapeRun()
+    for i in range(35):
+        data = _listing('Київ', 2000 + i, rooms=1) | {'currency': 'USD'}
+        pipeline.validate(ScrapeTask(url=f'u{i}', data=data))
+    rejected = pipeline.validate(ScrapeTask(url='cheap', data=_listing('Київ', 400, rooms=1) | {'currency': 'USD'}))
+    assert rejected.result['status'] == 'rejected'
+    assert rejected.result['msg'].endswith('in Київ, 1 room)')
+    assert price_bounds.lookup('Київ', 1).low > 400
+
+
+def test_build_price_bounds_command(app_ctx):
+    rng = random.Random(2)
+    db.session.add_all([
+        Property(source_url=f'u{i}', title=TITLE, city='Київ', rooms=2, area=50.0, price=rng.uniform(1500, 2500) * 50)
+        for i in range(40)
+    ] + [Property(source_url='cheap', title=TITLE, city='Київ', rooms=2, area=50.0, price=15000.0)])
+    db.session.commit()
+
+    result = app_ctx.test_cli_runner().invoke(args=['build-price-bounds'])
+    assert 'Built price/m² sketches for 2 markets' in result.output
+    assert 'Київ: 41 listings' in result.output
+
+    result = app_ctx.test_cli_runner().invoke(args=['revalidate'])
+    assert 'Flagged 1 newly' in result.output
+    assert Property.query.filter_by(source_url='cheap').one().validation_error.startswith('Price/m² too low: $300/m²')
@@ -0,0 +1,93 @@
+import pytest
+from app.services.rate_limiter import AdaptiveRateLimiter, CircuitOpenError
+
+URL = "https://example.com/listing/1"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_limiter(clock, **kwargs):
+    return AdaptiveRateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_token_bucket_paces_requests(clock):
+    limiter = make_limiter(clock, initial_rate=2.0, burst=1)
+    limiter.acquire(URL)
+    limiter.acquire(URL)
+    assert clock.slept == [pytest.approx(0.5)]
+
+
+def test_aimd_adjusts_rate(clock):
+    limiter = make_limiter(clock, initial_rate=2.0, increase=0.5, decrease=0.5)
+    limiter.record(URL, 200, latency=0.1)
+    assert limiter.snapshot()['example.com']['rate'] == 2.5
+
+    limiter.record(URL, 429, latency=0.1)
+    assert limiter.snapshot()['example.com']['rate'] == 1.25
+
+    limiter.record(URL, 503, latency=0.1)
+    assert limiter.snapshot()['example.com']['rate'] == 0.62
+
+
+def test_retry_after_blocks_host(clock):
+    limiter = make_limiter(clock, burst=5)
+    limiter.record(URL, 429, retry_after=10)
+    limiter.acquire(URL)
+    assert clock.now >= 10
+
+
+def test_circuit_breaker_opens_and_recovers(clock):
+    limiter = make_limiter(clock, failure_threshold=2, cooldown=30)
+    limiter.record(URL, None)
+    limiter.record(URL, None)
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(URL)
+
+    clock.now += 31
+    limiter.acquire(URL)  # half-open probe
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(URL)
+
+    limiter.record(URL, 200, latency=0.1)
+    assert limiter.snapshot()['example.com']['circuit'] == 'closed'
+    limiter.acquire(URL)
+
+
+def test_trip_opens_circuit_for_max_cooldown(clock):
+    limiter = make_limiter(clock, cooldown=30, max_cooldown=600)
+    limiter.acquire(URL)
+    limiter.trip(URL)
+    assert limiter.circuit(URL) == 'open'
+    clock.now += 31
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(URL)
+
+    clock.now += 600
+    limiter.acquire(URL)  # half-open probe
+    assert limiter.circuit(URL) == 'half_open'
+    limiter.record(URL, 200, latency=0.1)
+    assert limiter.circuit(URL) == 'closed'
+
+
+def test_hosts_are_independent(clock):
+    limiter = make_limiter(clock, failure_threshold=1)
+    limiter.record(URL, None)
+    limiter.acquire("https://other.example.org/page")
+    with pytest.raises(CircuitOpenError):
+        limiter.acquire(URL)
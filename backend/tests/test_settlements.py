@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from app.services import cities, settlements
+from app.services.settlements import SettlementIndex, region_key
+
+FIXTURE = Path(__file__).parent / 'fixtures' / 'settlements.csv'
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    output = tmp_path / 'settlements.tsv.gz'
+    stats = settlements.build([FIXTURE], output)
+    assert stats == {'rows': 17, 'skipped': 2, 'settlements': 15}
+    settlements.configure(str(output))
+    yield output
+    settlements.configure('')
+
+
+def test_exact_and_alias_lookup(data_file):
+    index = SettlementIndex.from_file(data_file)
+    assert len(index) == 15
+    assert index.resolve('Бровари').oblast == 'Київська'
+    assert index.resolve('бровары').name == 'Бровари'
+    assert index.resolve('Днепродзержинск').name == "Кам'янське"
+    assert index.resolve('Нікополь') is None
+
+
+def test_shared_names_need_the_region(data_file):
+    index = SettlementIndex.from_file(data_file)
+    assert len(index.find('Петрівка')) == 2
+    assert index.resolve('Петрівка') is None
+    assert index.resolve('Петровка', region='Одеська область').lat == pytest.approx(46.93)
+    assert index.canonical_name('Петровка') == 'Петрівка'
+
+
+def test_prefix_lookup(data_file):
+    index = SettlementIndex.from_file(data_file)
+    assert [s.name for s in index.complete('бі')] == ['Біла Церква']
+    assert [s.name for s in index.complete('Б')] == ['Біла Церква', 'Бровари', 'Буча']
+    assert index.complete('') == []
+
+
+def test_region_lookup(data_file):
+    index = SettlementIndex.from_file(data_file)
+    assert region_key('Київська обл.') == 'київ'
+    assert index.region_center('Київська область').name == 'Біла Церква'
+    assert index.region_center('Дніпропетровська').name == 'Дніпро'
+    assert index.region_center('Запорізька область').name == 'Запоріжжя'
+    assert index.region_center('Волинська область') is None
+
+
+def test_cities_fall_back_to_settlements(data_file):
+    assert cities.normalize_city('Южный') == 'Південне'
+    assert cities.normalize_city('Южный', settlements=False) is None
+    assert cities.normalize_city('Киев') == 'Київ'
+    assert cities.get_center('Южный') == pytest.approx((46.6222, 31.1010))
+    assert cities.get_center('Петрівка') is None
+    assert cities.get_center('Петрівка', 'Київська область') == pytest.approx((50.12, 30.93))
+    assert cities.get_region_center('Одеська область') == ((46.4825, 30.7233), 'Одеса')
+
+
+def test_without_data_file():
+    settlements.configure('')
+    assert settlements.open_settlements() is None
+    assert cities.normalize_city('Южный') is None
+    assert cities.get_center('Харьков') == (49.9935, 36.2304)
@@ -0,0 +1,155 @@
+import gzip
+import threading
+from datetime import datetime, timezone
+
+from app import db
+from app.models import SitemapState
+from app.services.base_sitemap import BaseSitemapFetcher, iter_entries, parse_lastmod
+from app.commands import _scrape_discovered
+from app.services.http_cache import FetchResult
+from app.services.scrape_pipeline import ScraperSite
+from app.services.sitemap_discovery import SitemapWalk
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _urlset(*entries):
+    body = "".join(
+        f"<url><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{body}</urlset>'.encode('utf-8')
+
+
+def _index(*entries):
+    body = "".join(
+        f"<sitemap><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</sitemap>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex {NS}>{body}</sitemapindex>'.encode('utf-8')
+
+
+SITE = {
+    'https://s/sitemap.xml': _index(
+        ('https://s/a.xml.gz', '2026-03-01'),
+        ('https://s/b.xml', '2026-01-01T10:00:00+02:00'),
+        ('https://s/nested.xml', None),
+    ),
+    'https://s/a.xml.gz': gzip.compress(_urlset(
+        ('https://s/obyavlenie/1', '2026-03-01T12:00:00Z'),
+        ('https://s/obyavlenie/2', '2026-02-01'),
+        ('https://s/about', '2026-03-01'),
+    )),
+    'https://s/b.xml': _urlset(('https://s/obyavlenie/3', '2026-01-01')),
+    'https://s/nested.xml': _index(('https://s/c.xml', None)),
+    'https://s/c.xml': _urlset(('https://s/obyavlenie/4', None), ('https://s/obyavlenie/1', '2026-03-01')),
+}
+
+
+def _fetcher(pages=SITE, **kwargs):
+    calls = []
+    lock = threading.Lock()
+
+    def fetch(url):
+        with lock:
+            calls.append(url)
+        return pages.get(url)
+    fetcher = BaseSitemapFetcher(fetch, sitemap_url='https://s/sitemap.xml', url_filter='/obyavlenie/', **kwargs)
+    return fetcher, calls
+
+
+def test_parse_lastmod_formats():
+    assert parse_lastmod('2026-03-01') == datetime(2026, 3, 1, tzinfo=timezone.utc)
+    assert parse_lastmod('2026-03-01T12:00:00Z') == datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+    assert parse_lastmod('2026-03-01T12:00:00+02:00') == datetime(2026, 3, 1, 10, tzinfo=timezone.utc)
+    assert parse_lastmod('yesterday') is None
+
+
+def test_iter_entries_reads_gzip_by_magic_bytes():
+    entries = list(iter_entries(SITE['https://s/a.xml.gz']))
+    assert [e.loc for e in entries] == ['https://s/obyavlenie/1', 'https://s/obyavlenie/2', 'https://s/about']
+    assert all(e.kind == 'url' for e in entries)
+
+
+def test_walks_nested_indexes_and_filters():
+    fetcher, calls = _fetcher()
+    urls = list(fetcher.iter_urls())
+
+    assert urls == ['https://s/obyavlenie/1', 'https://s/obyavlenie/2', 'https://s/obyavlenie/3',
+                    'https://s/obyavlenie/4', 'https://s/obyavlenie/1']
+    assert sorted(calls) == sorted(SITE)
+    assert fetcher.failed == [] and fetcher.sitemaps_read == 5
+
+
+def test_since_skips_unchanged_sitemaps_and_urls():
+    fetcher, calls = _fetcher()
+    urls = list(fetcher.iter_urls(since=datetime(2026, 2, 15)))
+
+    assert urls == ['https://s/obyavlenie/1', 'https://s/obyavlenie/4', 'https://s/obyavlenie/1']
+    assert 'https://s/b.xml' not in calls
+
+
+def test_workers_keep_only_matching_entries():
+    fetcher, _ = _fetcher()
+    loaded = fetcher._load('https://s/a.xml.gz', datetime(2026, 2, 15, tzinfo=timezone.utc), ('/obyavlenie/',))
+    assert loaded == ('https://s/a.xml.gz', [], ['https://s/obyavlenie/1'])
+    assert fetcher._load('https://s/missing.xml', None, None) == ('https://s/missing.xml', None, None)
+
+def test_failed_and_broken_sitemaps_are_reported():
+    pages = dict(SITE)
+    del pages['https://s/b.xml']
+    pages['https://s/c.xml'] = b'<urlset><url><loc>broken'
+    fetcher, _ = _fetcher(pages)
+
+    urls = list(fetcher.iter_urls())
+    assert urls == ['https://s/obyavlenie/1', 'https://s/obyavlenie/2']
+    assert sorted(fetcher.failed) == ['https://s/b.xml', 'https://s/c.xml']
+
+
+def test_consumer_stopping_early_does_not_fetch_everything():
+    pages = {'https://s/sitemap.xml': _index(*((f'https://s/{n}.xml', None) for n in range(50)))}
+    pages.update({f'https://s/{n}.xml': _urlset((f'https://s/obyavlenie/{n}', None)) for n in range(50)})
+    fetcher, calls = _fetcher(pages, workers=2)
+
+    urls = fetcher.iter_urls()
+    assert next(urls) == 'https://s/obyavlenie/0'
+    urls.close()
+    assert len(calls) < 10
+
+
+def test_sitemap_walk_checkpoints_complete_walks(app_ctx):
+    walk = SitemapWalk('bon_ua', _fetcher()[0])
+    assert list(walk) == [
+        'https://s/obyavlenie/1', 'https://s/obyavlenie/2', 'https://s/obyavlenie/3', 'https://s/obyavlenie/4',
+    ]
+    # Only once the caller has dealt with the URLs
+    assert db.session.get(SitemapState, 'bon_ua') is None
+    assert walk.checkpoint()
+    assert db.session.get(SitemapState, 'bon_ua').last_url_count == 4
+
+    # Everything in the fixture predates the checkpoint; only undated URLs come back
+    assert list(SitemapWalk('bon_ua', _fetcher()[0])) == ['https://s/obyavlenie/4']
+    assert len(list(SitemapWalk('bon_ua', _fetcher()[0], full=True))) == 4
+
+
+def test_sitemap_walk_keeps_checkpoint_after_failures(app_ctx):
+    pages = dict(SITE)
+    del pages['https://s/b.xml']
+    walk = SitemapWalk('meget', _fetcher(pages)[0])
+    list(walk)
+    assert not walk.checkpoint()
+    assert db.session.get(SitemapState, 'meget') is None
+
+
+def test_failed_listing_fetch_keeps_checkpoint(app_ctx):
+    def fetch_page(url, validators):
+        return FetchResult(503) if url.endswith('/3') else FetchResult(404)
+    site = ScraperSite('bon_ua', fetch_page, None, None)
+
+    _scrape_discovered(site, SitemapWalk('bon_ua', _fetcher()[0]), 2, True, False, None)
+    assert db.session.get(SitemapState, 'bon_ua') is None
+
+    # Every listing dealt with (here: expired), so the walk is checkpointed
+    site = site._replace(fetch_page=lambda url, validators: FetchResult(404))
+    _scrape_discovered(site, SitemapWalk('bon_ua', _fetcher()[0]), 2, True, False, None)
+    assert db.session.get(SitemapState, 'bon_ua').last_url_count == 4
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from app.services import bon_ua
+from app.services.structured_data import FastPathStats, extract_structured
+
+PAGES = Path(__file__).parent / 'fixtures' / 'pages'      # synthetic pages, see the README there
+
+
+def _page(name):
+    return (PAGES / name).read_text(encoding='utf-8')
+
+
+def test_extracts_json_ld_graph_and_opengraph_from_raw_html():
+    listing = extract_structured(_page('bon_ua_structured.html'))
+    assert (listing.price, listing.currency) == (120000.0, 'USD')
+    assert listing.street_address == 'вул. Хрещатик 22'
+    assert listing.locality == 'Київ'
+    assert (listing.rooms, listing.area) == (3, 78.5)
+    assert listing.images[0] == 'https://bon.ua/upload/777/1.jpg'
+    assert listing.og_image == 'https://bon.ua/upload/og/777.jpg'
+
+
+def test_spaced_offer_price_and_unknown_currency():
+    html = ('<script type="application/ld+json">{"offers": [{"price": "1 200 000", "priceCurrency": "PLN"}]}</script>')
+    listing = extract_structured(html)
+    assert (listing.price, listing.currency) == (1200000.0, 'UAH')
+
+
+def test_malformed_json_ld_is_skipped_and_opengraph_price_used():
+    html = (
+        '<script type="application/ld+json">{"offers": {"price": </script>'
+        "<meta property='product:price:amount' content='55000'>"
+        '<meta property="product:price:currency" content="usd">'
+    )
+    listing = extract_structured(html.encode('utf-8'))
+    assert (listing.price, listing.currency) == (55000.0, 'USD')
+    assert listing.images == []
+
+
+def test_page_without_structured_data():
+    listing = extract_structured(_page('bon_ua_0.html'))
+    assert listing.price is None and listing.street_address is None
+
+
+def test_fast_path_matches_dom_for_every_field_it_supplies():
+    url = 'https://example.com/bon_ua_structured.html'
+    fast = bon_ua.parse_listing_page(_page('bon_ua_structured.html'), url)
+    dom = bon_ua.parse_listing_page(_page('bon_ua_structured.html'), url, fast_path=False)
+
+    assert fast['structured_fields'] == ['address', 'area', 'images', 'price', 'rooms']
+    assert 'structured_fields' not in dom
+    for key in ('title', 'price', 'currency', 'address', 'city', 'district', 'region', 'area', 'rooms'):
+        assert fast[key] == dom[key]
+
+
+def test_fast_path_still_detects_expired_listing():
+    page = _page('bon_ua_expired.html').replace(
+        '</head>', '<script type="application/ld+json">{"offers": {"price": "45000", "priceCurrency": "USD"}}</script></head>'
+    )
+    assert bon_ua.parse_listing_page(page, 'https://example.com/expired') is None
+
+
+def test_fast_path_stats():
+    stats = FastPathStats()
+    stats.record('bon_ua', ['price', 'address'])
+    stats.record('bon_ua', [])
+    stats.record('bon_ua', ['price'])
+    assert stats.snapshot() == {
+        'bon_ua': {'pages': 3, 'fast_path': 2, 'fields': {'price': 2, 'address': 1}},
+    }
+    stats.reset()
+    assert stats.snapshot() == {}